@@ -0,0 +1,95 @@
+"""Microbenchmark comparing the single-pass link extractor with the legacy scan.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_extract_links
+"""
+
+import argparse
+import random
+import re
+import string
+import timeit
+from typing import List
+
+from validators.link_validator import LinkValidator
+
+# The five patterns previously scanned one after another by extract_links
+LEGACY_PATTERNS = {
+    'username': r'@([a-zA-Z]\w{3,30}[a-zA-Z\d])',
+    't_me': r't\.me/([a-zA-Z]\w{3,30}[a-zA-Z\d])',
+    'telegram_me': r'telegram\.me/([a-zA-Z]\w{3,30}[a-zA-Z\d])',
+    'https_t_me': r'https://t\.me/([a-zA-Z]\w{3,30}[a-zA-Z\d])',
+    'https_telegram_me': r'https://telegram\.me/([a-zA-Z]\w{3,30}[a-zA-Z\d])'
+}
+LEGACY_COMPILED = [re.compile(pattern) for pattern in LEGACY_PATTERNS.values()]
+
+def legacy_extract_and_normalize(text: str) -> List[str]:
+    """Reproduce the old extract -> format check -> normalize pipeline."""
+    links = []
+    for pattern in LEGACY_COMPILED:
+        links.extend(
+            f"@{match}" if not match.startswith(('@', 't', 'h')) else match
+            for match in pattern.findall(text)
+        )
+    
+    normalized = []
+    for link in set(links):
+        if not any(pattern.fullmatch(link) for pattern in LEGACY_COMPILED):
+            continue
+        for pattern in LEGACY_COMPILED:
+            match = pattern.search(link)
+            if match:
+                normalized.append(f"https://t.me/{match.group(1)}")
+                break
+    return normalized
+
+def single_pass_extract_and_normalize(validator: LinkValidator, text: str) -> List[str]:
+    """Run the combined extractor and build canonical links from its spans."""
+    return [
+        f"https://t.me/{username}"
+        for _, username in validator.extract_link_spans(text)
+    ]
+
+def make_forwarded_text(links: int, filler_words: int, seed: int = 42) -> str:
+    """Build a large forwarded-message style text with mixed link formats."""
+    rng = random.Random(seed)
+    formats = [
+        "@{}", "t.me/{}", "telegram.me/{}", "https://t.me/{}", "https://telegram.me/{}"
+    ]
+    words = []
+    for _ in range(filler_words):
+        words.append("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))))
+    for i in range(links):
+        name = "proxy_" + "".join(rng.choices(string.ascii_lowercase, k=6)) + str(i)
+        words.insert(rng.randrange(len(words) + 1), rng.choice(formats).format(name))
+    return " ".join(words)
+
+def main():
+    """Run the benchmark and print per-call timings and the speedup."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=500)
+    parser.add_argument("--filler-words", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+    
+    validator = LinkValidator()
+    text = make_forwarded_text(args.links, args.filler_words)
+    print(f"Text size: {len(text)} chars, {args.links} links")
+    
+    legacy = min(timeit.repeat(
+        lambda: legacy_extract_and_normalize(text),
+        repeat=args.repeat, number=args.number
+    )) / args.number
+    single = min(timeit.repeat(
+        lambda: single_pass_extract_and_normalize(validator, text),
+        repeat=args.repeat, number=args.number
+    )) / args.number
+    
+    print(f"legacy five-pattern scan: {legacy * 1000:.2f} ms/message")
+    print(f"single-pass extractor:    {single * 1000:.2f} ms/message")
+    print(f"speedup:                  {legacy / single:.1f}x")
+
+if __name__ == '__main__':
+    main()
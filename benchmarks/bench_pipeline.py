@@ -0,0 +1,356 @@
+"""Benchmark suite for the extract -> validate -> store pipeline.
+
+Probes go to a local t.me stand-in (see benchmarks/fake_tme.py), so results
+do not depend on the network. Run from the repository root:
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --users 1000 100000 1000000 --backend sqlite
+    python -m benchmarks.bench_pipeline --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --compare benchmarks/baseline.json
+
+Every benchmark reports throughput and p50/p99 latency. With --compare the
+run exits non-zero when a benchmark got slower than the baseline by more than
+--tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.bench_extract_links import make_forwarded_text
+from benchmarks.fake_tme import FakeTmeServer
+from storage.storage_manager import StorageManager
+from validators.link_validator import LinkValidator
+
+# Users are preloaded in chunks of this many per backend write
+PRELOAD_CHUNK = 10000
+
+def summarize(name: str, latencies: List[float], elapsed: float,
+              items: Optional[int] = None) -> Dict:
+    """Build one result row from per-operation latencies in seconds."""
+    ordered = sorted(latencies)
+    
+    def percentile(p: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+    
+    operations = len(ordered)
+    return {
+        "name": name,
+        "operations": operations,
+        "throughput": (items if items is not None else operations) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(50) * 1000,
+        "p99_ms": percentile(99) * 1000,
+        "mean_ms": sum(ordered) / operations * 1000 if operations else 0.0
+    }
+
+def measure(name: str, operation: Callable[[int], object], count: int,
+            items_per_op: int = 1) -> Dict:
+    """Time a synchronous operation called with 0..count-1."""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(count):
+        op_started = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - op_started)
+    return summarize(name, latencies, time.perf_counter() - started, count * items_per_op)
+
+async def ameasure(name: str, operation: Callable[[int], object], count: int,
+                   concurrency: int, items_per_op: int = 1) -> Dict:
+    """Time an async operation called with 0..count-1, `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    
+    async def run(i: int):
+        async with semaphore:
+            op_started = time.perf_counter()
+            await operation(i)
+            latencies.append(time.perf_counter() - op_started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(run(i) for i in range(count)))
+    return summarize(name, latencies, time.perf_counter() - started, count * items_per_op)
+
+def make_message(links: int, seed: int) -> str:
+    """Build a chat-sized message with unique link targets."""
+    return make_forwarded_text(links, filler_words=links * 10, seed=seed)
+
+def bench_extract(args) -> List[Dict]:
+    """Benchmark link extraction on chat-sized and forwarded-dump-sized texts."""
+    validator = LinkValidator()
+    small = [make_message(args.links_per_message, seed) for seed in range(100)]
+    large = make_forwarded_text(500, 20000)
+    return [
+        measure("extract_links[message]",
+                lambda i: validator.extract_links(small[i % len(small)]),
+                args.iterations * 10),
+        measure("extract_links[forward_dump]",
+                lambda i: validator.extract_links(large),
+                max(1, args.iterations // 10))
+    ]
+
+def bench_validate(args, fake: FakeTmeServer) -> List[Dict]:
+    """Benchmark sequential and concurrent validation against the fake t.me."""
+    messages = [
+        make_message(args.links_per_message, seed)
+        for seed in range(1000, 1000 + args.iterations)
+    ]
+    validator = LinkValidator(timeout=args.timeout, probe_base_url=fake.base_url)
+    results = [measure(
+        "validate_links[sync]",
+        lambda i: validator.validate_links(messages[i]),
+        min(args.iterations, 50),
+        args.links_per_message
+    )]
+    
+    async def run_async() -> Dict:
+        # Fresh usernames so every probe reaches the server
+        async_messages = [
+            make_message(args.links_per_message, seed)
+            for seed in range(5000, 5000 + args.iterations)
+        ]
+        async_validator = LinkValidator(
+            timeout=args.timeout,
+            max_global_probes=args.concurrency * args.links_per_message,
+            probe_base_url=fake.base_url
+        )
+        try:
+            return await ameasure(
+                "avalidate_links",
+                lambda i: async_validator.avalidate_links(async_messages[i]),
+                args.iterations,
+                args.concurrency,
+                args.links_per_message
+            )
+        finally:
+            await async_validator.aclose()
+    
+    results.append(asyncio.run(run_async()))
+    return results
+
+def random_links(rng: random.Random, count: int) -> List[str]:
+    """Build random canonical links."""
+    return [
+        "https://t.me/" + "".join(rng.choices(string.ascii_lowercase, k=10))
+        for _ in range(count)
+    ]
+
+def preload_users(manager: StorageManager, users: int, rng: random.Random):
+    """Fill storage with `users` users holding a few links each."""
+    for start in range(0, users, PRELOAD_CHUNK):
+        manager.backend.store_links_batch([
+            (str(user_id), f"user{user_id}", random_links(rng, 3))
+            for user_id in range(start, min(users, start + PRELOAD_CHUNK))
+        ])
+
+def bench_store(args, workdir: str) -> List[Dict]:
+    """Benchmark store_links against storage preloaded with increasing user counts."""
+    results = []
+    for users in args.users:
+        directory = tempfile.mkdtemp(prefix=f"store-{users}-", dir=workdir)
+        manager = StorageManager(
+            user_storage_path=os.path.join(directory, "user_links.json"),
+            global_storage_path=os.path.join(directory, "proxy_channels.json"),
+            backend=args.backend,
+            db_path=os.path.join(directory, "bot.db")
+        )
+        try:
+            rng = random.Random(users)
+            preload_users(manager, users, rng)
+            submissions = [
+                (str(rng.randrange(users * 2)), "bench", random_links(rng, args.links_per_message))
+                for _ in range(args.iterations)
+            ]
+            results.append(measure(
+                f"store_links[{args.backend},{users}_users]",
+                lambda i: manager.store_links(*submissions[i]),
+                args.iterations,
+                args.links_per_message
+            ))
+        finally:
+            manager.close()
+    return results
+
+class FakeMessage:
+    """Just enough of telegram.Message for the message handler."""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.replies: List[str] = []
+    
+    async def reply_text(self, text: str, **kwargs):
+        self.replies.append(text)
+
+def make_fake_update(user_id: int, text: str) -> SimpleNamespace:
+    """Build an object shaped like the Update the message handler reads."""
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=user_id, username=f"user{user_id}"),
+        message=FakeMessage(text)
+    )
+
+def bench_handle_message(args, fake: FakeTmeServer, workdir: str) -> List[Dict]:
+    """Benchmark the full message handler: extract, validate, buffered store, reply."""
+    # Imported lazily so the other benchmarks run without python-telegram-bot
+    from bot.bot_handler import BotHandler
+    from bot.rate_limiter import RateLimitConfig
+    from validators.prober import ProbeConfig
+    
+    unlimited = RateLimitConfig(
+        message_rate=1e9, message_burst=10 ** 9,
+        link_rate=1e9, link_burst=10 ** 9,
+        probe_rate=1e9, probe_burst=10 ** 9
+    )
+    previous_cwd = os.getcwd()
+    # The handler keeps its data files relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="handler-", dir=workdir))
+    try:
+        probe = ProbeConfig(
+            initial_timeout=args.timeout,
+            max_connections=args.concurrency * args.links_per_message
+        )
+        handler = BotHandler("123456:benchmark", storage_backend=args.backend,
+                             rate_limits=unlimited, probe=probe)
+        handler.link_validator.probe_base_url = fake.base_url
+        handler.link_validator.max_global_probes = args.concurrency * args.links_per_message
+        updates = [
+            make_fake_update(i % 1000, make_message(args.links_per_message, 9000 + i))
+            for i in range(args.iterations)
+        ]
+        
+        async def run() -> Dict:
+            try:
+                return await ameasure(
+                    "handle_message",
+                    lambda i: handler._handle_message(updates[i], None),
+                    args.iterations,
+                    args.concurrency
+                )
+            finally:
+                await handler.link_validator.aclose()
+                await handler.write_buffer.close()
+        
+        result = asyncio.run(run())
+        handler.storage_manager.close()
+        return [result]
+    finally:
+        os.chdir(previous_cwd)
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Return descriptions of benchmarks that regressed against the baseline."""
+    with open(baseline_path, 'r') as f:
+        baseline = {row["name"]: row for row in json.load(f)["results"]}
+    
+    regressions = []
+    for row in results:
+        previous = baseline.get(row["name"])
+        if previous is None:
+            continue
+        if row["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{row['name']}: throughput {row['throughput']:.1f}/s "
+                f"vs baseline {previous['throughput']:.1f}/s"
+            )
+        if row["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{row['name']}: p99 {row['p99_ms']:.2f} ms "
+                f"vs baseline {previous['p99_ms']:.2f} ms"
+            )
+    return regressions
+
+def print_results(results: List[Dict]):
+    """Print results as an aligned table."""
+    print(f"{'benchmark':<40} {'ops':>7} {'items/s':>12} {'p50 ms':>9} {'p99 ms':>9}")
+    for row in results:
+        print(
+            f"{row['name']:<40} {row['operations']:>7} {row['throughput']:>12.1f} "
+            f"{row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}"
+        )
+
+def parse_args(argv=None):
+    """Parse benchmark options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+",
+                        choices=["extract", "validate", "store", "handle"],
+                        help="Run only these benchmarks")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--links-per-message", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Stored user counts for the store_links benchmark")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--latency", type=float, default=0.005,
+                        help="Simulated t.me response latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Share of probes the fake t.me answers with a 500")
+    parser.add_argument("--missing-rate", type=float, default=0.2,
+                        help="Share of usernames the fake t.me reports as missing")
+    parser.add_argument("--timeout", type=float, default=2.0,
+                        help="Probe timeout used by the validators")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown before --compare fails")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Run the selected benchmarks, print them and save or compare baselines."""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    # Per-request logs would dominate the probe timings
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    selected = set(args.only or ["extract", "validate", "store", "handle"])
+    
+    fake = FakeTmeServer(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        missing_rate=args.missing_rate
+    )
+    fake.start()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+            if "extract" in selected:
+                results += bench_extract(args)
+            if "validate" in selected:
+                results += bench_validate(args, fake)
+            if "store" in selected:
+                results += bench_store(args, workdir)
+            if "handle" in selected:
+                results += bench_handle_message(args, fake, workdir)
+    finally:
+        fake.stop()
+    
+    print_results(results)
+    
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({
+                "created": time.time(),
+                "python": sys.version.split()[0],
+                "args": {k: v for k, v in vars(args).items()
+                         if k not in ("save_baseline", "compare")},
+                "results": results
+            }, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+    
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Local stand-in for t.me channel pages with configurable latency and failures.
+
+Point a validator at it with ``LinkValidator(probe_base_url=server.base_url)``.
+Whether a username exists is derived from its hash, so runs are reproducible.
+The server runs its own event loop on a background thread; simulated latency
+is an asyncio sleep, so it never becomes the bottleneck it would be with one
+thread per connection.
+"""
+
+import asyncio
+import logging
+import random
+import socket
+import threading
+import zlib
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PAGE_TEMPLATE = (
+    '<html><head><meta property="og:title" content="{0}"></head>'
+    '<body><div class="tgme_page_title"><span>{0}</span></div></body></html>'
+)
+
+REASONS = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+class FakeTmeServer:
+    """Answers HEAD/GET /<username> like t.me, with simulated latency and errors."""
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 missing_rate: float = 0.2,
+                 seed: int = 42):
+        """Initialize server address and the simulated network behaviour.
+
+        latency is added to every response, error_rate is the share of
+        requests answered with a 500 and missing_rate the share of usernames
+        that do not exist (answered with a 404).
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.missing_rate = missing_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        # Bind now so base_url is known before start()
+        self._socket = socket.create_server((host, port), backlog=1024)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        """URL to pass as the validator's probe_base_url."""
+        host, port = self._socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._run, name="fake-tme", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        """Shut the server down."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def _run(self):
+        """Run the server's event loop until stop() is called."""
+        loop = asyncio.new_event_loop()
+        self._server = loop.run_until_complete(
+            asyncio.start_server(self._handle_connection, sock=self._socket)
+        )
+        self._loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            loop.close()
+
+    def exists(self, username: str) -> bool:
+        """Return whether a username is simulated as an existing channel."""
+        bucket = zlib.crc32(username.lower().encode()) % 10000
+        return bucket >= self.missing_rate * 10000
+
+    def status_for(self, method: str, username: str) -> int:
+        """Pick the HTTP status for one request."""
+        self.requests += 1
+        if method not in ("HEAD", "GET"):
+            return 405
+        if self.error_rate and self._random.random() < self.error_rate:
+            return 500
+        return 200 if self.exists(username) else 404
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        """Serve keep-alive HTTP/1.1 requests on one connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                keep_alive = True
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    if name.lower() == "connection" and value.strip().lower() == "close":
+                        keep_alive = False
+
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                username = path.strip("/").split("?", 1)[0]
+                status = self.status_for(method, username)
+                payload = PAGE_TEMPLATE.format(username).encode() if status == 200 else b""
+                head = (
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: text/html; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                )
+                # One write: a separate small body segment would wait for the
+                # client's delayed ACK (Nagle), adding ~40ms to every GET
+                writer.write(head if method == "HEAD" else head + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError) as e:
+            logger.debug(f"Fake t.me connection error: {e}")
+        finally:
+            writer.close()
@@ -1,10 +1,19 @@
 """Core bot handler implementation."""
 
+import asyncio
+import functools
 import logging
+import os
+import signal
+import tempfile
+import time
+from typing import Iterable, Optional
 from telegram import Update
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
     MessageHandler,
     ContextTypes,
@@ -17,42 +26,178 @@ from .message_templates import (
     LINK_VALIDATION_SUCCESS,
     LINK_VALIDATION_PARTIAL,
     NO_LINKS_FOUND,
+    LINKS_ALREADY_KNOWN,
+    LINKS_KNOWN_NOTE,
     LIST_LINKS_EMPTY,
-    LIST_LINKS_HEADER,
     ERROR_STORAGE,
-    ERROR_GENERIC
+    ERROR_GENERIC,
+    CHANNELS_RELOADED,
+    NOT_AUTHORIZED,
+    RATE_LIMITED,
+    LINKS_TRUNCATED,
+    IMPORT_STARTED,
+    IMPORT_PROGRESS,
+    IMPORT_DONE,
+    IMPORT_FAILED,
+    IMPORT_UNSUPPORTED,
+    EXPORT_USAGE,
+    EXPORT_EMPTY
 )
-from validators.link_validator import LinkValidator
+from .bulk_import import BulkImporter, MAX_IMPORT_FILE_SIZE
+from .list_pages import ChannelListPages, LIST_PAGE_CALLBACK_PREFIX
+from .webhook import WebhookConfig
+from .update_processor import PerUserUpdateProcessor
+from .rate_limiter import InboundRateLimiter, RateLimitConfig, TelegramRateLimiter
+from .revalidation import RevalidationConfig, RevalidationScheduler
+from validators.link_validator import EXTRACT_SECONDS, LinkValidator, extract_link_spans
+from validators.prober import ProbeConfig
+from validators.verdict_cache import VerdictCache
+from coordination.base import CoordinationBackend, Lease
+from coordination.verdicts import SharedVerdictCache
+from storage.export import EXPORT_FORMATS, export_to_file
+from storage.replication import ReplicationConfig
 from storage.storage_manager import StorageManager
+from storage.write_behind import WriteBehindBuffer
+from utils.offload import OffloadConfig, Offloader
+from utils.rate_limit import KeyedRateLimiter
+from utils.startup import STARTUP
+from monitoring.metrics import REGISTRY, monitor_event_loop_lag
+from monitoring.log_pipeline import sampled
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between progress edits of an import status message
+IMPORT_PROGRESS_INTERVAL = 2.0
+
+LIST_COMMAND_SECONDS = REGISTRY.histogram(
+    "list_command_seconds", "Time spent answering /list"
+)
+HANDLE_MESSAGE_SECONDS = REGISTRY.histogram(
+    "handle_message_seconds", "Time spent handling one message with links"
+)
+UPDATES = REGISTRY.gauge(
+    "updates", "Updates in the processor by state", ("state",)
+)
+VERDICT_CACHE = REGISTRY.gauge(
+    "verdict_cache", "Verdict cache counters and size", ("stat",)
+)
+
 class BotHandler:
     """Handles all bot operations and message routing."""
     
-    def __init__(self, token: str):
-        """Initialize bot with token."""
-        self.application = Application.builder().token(token).build()
-        self.link_validator = LinkValidator()
-        self.storage_manager = StorageManager()
+    def __init__(self,
+                 token: str,
+                 storage_backend: str = "json",
+                 admin_user_ids: Optional[Iterable[int]] = None,
+                 max_concurrent_updates: int = 16,
+                 api_base_url: Optional[str] = None,
+                 rate_limits: Optional[RateLimitConfig] = None,
+                 revalidation: Optional[RevalidationConfig] = None,
+                 coordination: Optional[CoordinationBackend] = None,
+                 offload: Optional[OffloadConfig] = None,
+                 probe: Optional[ProbeConfig] = None,
+                 fast_start: bool = False,
+                 bloom_capacity: Optional[int] = None,
+                 replication: Optional[ReplicationConfig] = None):
+        """Initialize bot with token, storage, admins and update concurrency.
+        
+        api_base_url points the bot at an alternative Bot API server, such as
+        a local stand-in used for testing. A coordination backend lets several
+        worker processes share verdicts, dead links and the revalidation role.
+        offload sizes the executors that keep parsing and storage off the loop.
+        probe sets the timeouts, retries and connections of existence probes.
+        With fast_start, storage files are read on a background thread while
+        the bot connects to Telegram. bloom_capacity keeps the links already
+        collected in a Bloom filter instead of a set, for very large datasets.
+        With replication, the bot keeps a standby copy of another instance's
+        storage and only starts serving once it has taken over as primary.
+        """
+        self.admin_user_ids = set(admin_user_ids or ())
+        self.rate_limits = rate_limits or RateLimitConfig()
+        self.inbound_limiter = InboundRateLimiter(self.rate_limits)
+        # Updates run concurrently, but each user's updates stay in order
+        self.update_processor = PerUserUpdateProcessor(max_concurrent_updates)
+        builder = (
+            Application.builder()
+            .token(token)
+            .concurrent_updates(self.update_processor)
+            .rate_limiter(TelegramRateLimiter(self.rate_limits))
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+        )
+        if api_base_url:
+            base = api_base_url.rstrip("/")
+            builder = builder.base_url(f"{base}/bot").base_file_url(f"{base}/file/bot")
+        self.application = builder.build()
+        self.coordination = coordination
+        if coordination is None:
+            self.verdict_cache = VerdictCache(persist_path="data/verdict_cache.json")
+        else:
+            self.verdict_cache = SharedVerdictCache(
+                coordination, persist_path="data/verdict_cache.json"
+            )
+        self.link_validator = LinkValidator(
+            cache=self.verdict_cache,
+            host_limiter=KeyedRateLimiter(
+                self.rate_limits.probe_rate, self.rate_limits.probe_burst
+            ),
+            probe=probe
+        )
+        self.storage_manager = StorageManager(
+            backend=storage_backend,
+            coordination=coordination,
+            lazy=fast_start,
+            bloom_capacity=bloom_capacity,
+            replication=replication
+        )
+        if fast_start:
+            self.storage_manager.start_warm_up()
+        self.offloader = Offloader(offload)
+        self.write_buffer = WriteBehindBuffer(self.storage_manager, offloader=self.offloader)
+        self.list_pages = ChannelListPages()
+        self.bulk_importer = BulkImporter(self.link_validator, offloader=self.offloader)
+        self.revalidator = RevalidationScheduler(
+            self.storage_manager,
+            self.link_validator,
+            revalidation,
+            lease=Lease(coordination, "revalidation", ttl=60) if coordination else None
+        )
+        self._lag_monitor: Optional[asyncio.Task] = None
+        self._register_metrics()
         self._register_handlers()
     
+    def _register_metrics(self):
+        """Expose processor and cache statistics, read at scrape time."""
+        stats = self.update_processor.stats
+        UPDATES.labels("queued").callback = lambda: stats.queued
+        UPDATES.labels("in_progress").callback = lambda: stats.in_progress
+        UPDATES.labels("processed").callback = lambda: stats.processed
+        for stat in ("hits", "misses", "evictions", "expirations", "size"):
+            VERDICT_CACHE.labels(stat).callback = (
+                lambda stat=stat: self.verdict_cache.get_stats()[stat]
+            )
+    
     def _register_handlers(self):
         """Register message and command handlers."""
         # Command handlers
         self.application.add_handler(CommandHandler("start", self._start_command))
         self.application.add_handler(CommandHandler("help", self._help_command))
         self.application.add_handler(CommandHandler("list", self._list_command))
+        self.application.add_handler(CommandHandler("reload", self._reload_command))
+        self.application.add_handler(CommandHandler("export", self._export_command))
+        self.application.add_handler(CallbackQueryHandler(
+            self._list_page_callback,
+            pattern=rf"^{LIST_PAGE_CALLBACK_PREFIX}\d+$"
+        ))
         
         # Message handler for links
         self.application.add_handler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, self._handle_message)
         )
+        # Uploaded channel lists
+        self.application.add_handler(
+            MessageHandler(filters.Document.ALL, self._handle_document)
+        )
         
         # Error handler
         self.application.add_error_handler(self._error_handler)
@@ -60,7 +205,7 @@ class BotHandler:
     async def _start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command."""
         user = update.effective_user
-        logger.info(f"User {user.id} ({user.username}) started the bot")
+        logger.info("User started the bot", extra=sampled(username=user.username))
         await update.message.reply_text(
             START_MESSAGE,
             parse_mode=ParseMode.MARKDOWN_V2
@@ -69,18 +214,20 @@ class BotHandler:
     async def _help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command."""
         user = update.effective_user
-        logger.info(f"User {user.id} ({user.username}) requested help")
+        logger.info("User requested help", extra=sampled(username=user.username))
         await update.message.reply_text(
             HELP_MESSAGE,
             parse_mode=ParseMode.MARKDOWN_V2
         )
     
+    @LIST_COMMAND_SECONDS.time()
     async def _list_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /list command."""
         user = update.effective_user
-        logger.info(f"User {user.id} ({user.username}) requested channel list")
+        logger.info("User requested channel list", extra=sampled(username=user.username))
         
         # Get all available channels
+        await self.storage_manager.wait_until_warm()
         channels = self.storage_manager.get_all_channels()
         
         if not channels:
@@ -90,54 +237,181 @@ class BotHandler:
             )
             return
         
-        # Format channels list
-        links_text = LIST_LINKS_HEADER
-        for i, link in enumerate(channels, 1):
-            # Escape special characters for Markdown
-            escaped_link = link.replace(".", "\\.").replace("-", "\\-")
-            links_text += f"\n{i}\\. `{escaped_link}`"
+        pages = self.list_pages.get_pages(channels)
+        await update.message.reply_text(
+            pages[0],
+            parse_mode=ParseMode.MARKDOWN_V2,
+            reply_markup=self.list_pages.keyboard(0, len(pages))
+        )
+    
+    async def _list_page_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /list page navigation by editing the message in place."""
+        query = update.callback_query
+        await query.answer()
         
+        await self.storage_manager.wait_until_warm()
+        pages = self.list_pages.get_pages(self.storage_manager.get_all_channels())
+        if not pages:
+            await query.edit_message_text(
+                LIST_LINKS_EMPTY,
+                parse_mode=ParseMode.MARKDOWN_V2
+            )
+            return
+        
+        # The list may have shrunk since the buttons were sent
+        page = min(int(query.data[len(LIST_PAGE_CALLBACK_PREFIX):]), len(pages) - 1)
+        try:
+            await query.edit_message_text(
+                pages[page],
+                parse_mode=ParseMode.MARKDOWN_V2,
+                reply_markup=self.list_pages.keyboard(page, len(pages))
+            )
+        except BadRequest as e:
+            # A stale button pointing at the page already shown is harmless
+            if "not modified" not in str(e).lower():
+                raise
+    
+    async def _reload_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /reload command (admins only): re-read the global channel list."""
+        user = update.effective_user
+        if user.id not in self.admin_user_ids:
+            logger.warning("User %s (%s) attempted /reload", user.id, user.username)
+            await update.message.reply_text(
+                NOT_AUTHORIZED,
+                parse_mode=ParseMode.MARKDOWN_V2
+            )
+            return
+        
+        await self.storage_manager.wait_until_warm()
+        count = self.storage_manager.reload_channels()
+        logger.info("Admin %s reloaded channel list (%d channels)", user.id, count)
         await update.message.reply_text(
-            links_text,
+            CHANNELS_RELOADED.format(count),
             parse_mode=ParseMode.MARKDOWN_V2
         )
     
+    async def _export_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /export [jsonl|csv]: send stored links as a compressed file."""
+        user = update.effective_user
+        args = context.args or []
+        fmt = args[0].lower() if args else "jsonl"
+        if fmt not in EXPORT_FORMATS or len(args) > 1:
+            await update.message.reply_text(
+                EXPORT_USAGE,
+                parse_mode=ParseMode.MARKDOWN_V2
+            )
+            return
+        
+        # Admins export the whole dataset, everyone else only their own links
+        is_admin = user.id in self.admin_user_ids
+        user_id = None if is_admin else str(user.id)
+        logger.info("User requested an export", extra=sampled(username=user.username, format=fmt))
+        
+        file_name = f"links.{fmt}.gz"
+        fd, path = tempfile.mkstemp(suffix=".gz")
+        os.close(fd)
+        try:
+            # Rows are streamed from storage straight into the gzip file
+            count = await self.offloader.run_io(
+                export_to_file, self.storage_manager, path, fmt, user_id, True
+            )
+            if count == 0:
+                await update.message.reply_text(
+                    EXPORT_EMPTY,
+                    parse_mode=ParseMode.MARKDOWN_V2
+                )
+                return
+            with open(path, 'rb') as f:
+                await update.message.reply_document(f, filename=file_name)
+        finally:
+            os.remove(path)
+    
+    async def _reply_rate_limited(self, update: Update, retry_after: int):
+        """Tell a throttled user to slow down, at most once per notice interval."""
+        if self.inbound_limiter.should_notify(update.effective_user.id):
+            await update.message.reply_text(
+                RATE_LIMITED.format(retry_after),
+                parse_mode=ParseMode.MARKDOWN_V2
+            )
+    
+    @HANDLE_MESSAGE_SECONDS.time()
     async def _handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle incoming messages with potential links."""
         user = update.effective_user
         message_text = update.message.text
         
-        logger.info(f"Received message from user {user.id} ({user.username})")
+        logger.info("Received message", extra=sampled(username=user.username))
+        
+        if not self.inbound_limiter.allow_message(user.id):
+            logger.info("Throttled message", extra=sampled())
+            await self._reply_rate_limited(
+                update, self.inbound_limiter.retry_after(user.id)
+            )
+            return
         
         try:
+            # Timed here: extraction may run in a worker process with its own metrics
+            with EXTRACT_SECONDS.time():
+                spans = await self.offloader.run_cpu(
+                    extract_link_spans, message_text, size=len(message_text)
+                )
+            
+            # Channels already collected need neither a probe nor link budget
+            links = [self.link_validator.canonical_link(username) for _, username in spans]
+            await self.storage_manager.wait_until_warm()
+            known = await self.storage_manager.afind_known_links(
+                links, self.offloader.run_io
+            )
+            known_links = [link for link in links if link in known]
+            new_spans = [span for span, link in zip(spans, links) if link not in known]
+            
+            # Only validate as many links as the user's link budget allows
+            granted = self.inbound_limiter.grant_links(user.id, len(new_spans))
+            if new_spans and granted == 0 and not known_links:
+                logger.info("User exhausted their link budget", extra=sampled())
+                await self._reply_rate_limited(
+                    update, self.inbound_limiter.links_retry_after(user.id)
+                )
+                return
+            truncated_note = (
+                LINKS_TRUNCATED.format(granted, len(new_spans))
+                if granted < len(new_spans) else ""
+            )
+            
             # Validate links
-            validation_results = self.link_validator.validate_links(message_text)
+            validation_results = await self.link_validator.avalidate_spans(
+                new_spans[:granted]
+            )
             
-            if not validation_results:
+            if not validation_results and not known_links:
                 await update.message.reply_text(
                     NO_LINKS_FOUND,
                     parse_mode=ParseMode.MARKDOWN_V2
                 )
                 return
             
-            # Count valid and invalid links
-            valid_links = [
+            # Count valid and invalid links; known ones are valid
+            valid_links = known_links + [
                 result.normalized_link
                 for result in validation_results.values()
                 if result.is_valid
             ]
-            total_links = len(validation_results)
+            total_links = len(validation_results) + len(known_links)
             valid_count = len(valid_links)
+            known_note = (
+                LINKS_KNOWN_NOTE.format(len(known_links))
+                if known_links and validation_results else ""
+            )
             
             # Store valid links
             if valid_links:
-                stored = self.storage_manager.store_links(
+                stored = await self.write_buffer.submit(
                     str(user.id),
                     user.username or "",
                     valid_links
                 )
                 if not stored:
-                    logger.error(f"Failed to store links for user {user.id}")
+                    logger.error("Failed to store links for user %s", user.id)
                     await update.message.reply_text(
                         ERROR_STORAGE,
                         parse_mode=ParseMode.MARKDOWN_V2
@@ -150,9 +424,14 @@ class BotHandler:
                     NO_LINKS_FOUND,
                     parse_mode=ParseMode.MARKDOWN_V2
                 )
+            elif not validation_results:
+                await update.message.reply_text(
+                    LINKS_ALREADY_KNOWN.format(len(known_links)) + truncated_note,
+                    parse_mode=ParseMode.MARKDOWN_V2
+                )
             elif valid_count == total_links:
                 await update.message.reply_text(
-                    LINK_VALIDATION_SUCCESS.format(valid_count),
+                    LINK_VALIDATION_SUCCESS.format(valid_count) + known_note + truncated_note,
                     parse_mode=ParseMode.MARKDOWN_V2
                 )
             else:
@@ -161,27 +440,221 @@ class BotHandler:
                         total_links,
                         valid_count,
                         total_links - valid_count
-                    ),
+                    ) + known_note + truncated_note,
                     parse_mode=ParseMode.MARKDOWN_V2
                 )
-                
+        
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
+            logger.error("Error processing message: %s", e)
             await update.message.reply_text(
                 ERROR_GENERIC,
                 parse_mode=ParseMode.MARKDOWN_V2
             )
     
+    async def _handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Import channel links from an uploaded .txt/.csv/.json file."""
+        user = update.effective_user
+        document = update.message.document
+        logger.info("Received file", extra=sampled(
+            username=user.username, file_name=document.file_name, file_size=document.file_size
+        ))
+        
+        if (not self.bulk_importer.is_supported(document.file_name)
+                or (document.file_size or 0) > MAX_IMPORT_FILE_SIZE):
+            await update.message.reply_text(
+                IMPORT_UNSUPPORTED.format(MAX_IMPORT_FILE_SIZE // (1024 * 1024)),
+                parse_mode=ParseMode.MARKDOWN_V2
+            )
+            return
+        
+        if not self.inbound_limiter.allow_message(user.id):
+            logger.info("Throttled file upload", extra=sampled())
+            await self._reply_rate_limited(
+                update, self.inbound_limiter.retry_after(user.id)
+            )
+            return
+        
+        status_message = await update.message.reply_text(
+            IMPORT_STARTED,
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+        last_edit = time.monotonic()
+        
+        async def show_progress(checked: int, total: int):
+            nonlocal last_edit
+            # Editing on every batch would hit Telegram's flood limits
+            if checked < total and time.monotonic() - last_edit < IMPORT_PROGRESS_INTERVAL:
+                return
+            last_edit = time.monotonic()
+            try:
+                await status_message.edit_text(
+                    IMPORT_PROGRESS.format(checked, total),
+                    parse_mode=ParseMode.MARKDOWN_V2
+                )
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    raise
+        
+        # Admins bootstrap the collection; everyone else spends their link budget
+        grant = (
+            None if user.id in self.admin_user_ids
+            else functools.partial(self.inbound_limiter.grant_links, user.id)
+        )
+        
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(document.file_name)[1])
+        os.close(fd)
+        try:
+            telegram_file = await document.get_file()
+            await telegram_file.download_to_drive(path)
+            await self.storage_manager.wait_until_warm()
+            existing = self.storage_manager.get_user_links(str(user.id))
+            result = await self.bulk_importer.import_file(
+                path,
+                known_links=existing["links"] if existing else (),
+                find_known=functools.partial(
+                    self.storage_manager.afind_known_links, run_io=self.offloader.run_io
+                ),
+                grant=grant,
+                progress=show_progress
+            )
+        except Exception as e:
+            # Don't leave the user looking at "Import started" forever
+            logger.error("Error importing %s for user %s: %s", document.file_name, user.id, e)
+            await status_message.edit_text(
+                IMPORT_FAILED,
+                parse_mode=ParseMode.MARKDOWN_V2
+            )
+            return
+        finally:
+            os.remove(path)
+        
+        # Every valid link of the file goes to storage in one transaction
+        if result.valid:
+            stored = await self.offloader.run_io(
+                self.storage_manager.store_links,
+                str(user.id),
+                user.username or "",
+                result.valid
+            )
+            if not stored:
+                logger.error("Failed to store imported links for user %s", user.id)
+                await status_message.edit_text(
+                    ERROR_STORAGE,
+                    parse_mode=ParseMode.MARKDOWN_V2
+                )
+                return
+        
+        await status_message.edit_text(
+            IMPORT_DONE.format(
+                result.found,
+                len(result.valid),
+                result.invalid,
+                result.already_stored,
+                result.skipped
+            ),
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+    
     async def _error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE):
         """Handle errors."""
-        logger.error(f"Error occurred: {context.error}")
+        logger.error("Error occurred: %s", context.error)
         if update and hasattr(update, 'effective_message'):
             await update.effective_message.reply_text(
                 ERROR_GENERIC,
                 parse_mode=ParseMode.MARKDOWN_V2
             )
     
-    def run(self):
-        """Run the bot."""
-        logger.info("Starting bot...")
-        self.application.run_polling() 
\ No newline at end of file
+    async def _post_init(self, application: Application):
+        """Start background revalidation and, if metrics are collected, lag monitoring."""
+        if self.revalidator.config.enabled:
+            self.revalidator.start()
+        if REGISTRY.enabled:
+            self._lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+        STARTUP.mark("ready for updates")
+        STARTUP.log_report("Startup timings")
+    
+    async def _post_shutdown(self, application: Application):
+        """Release network resources and persist caches once stopped."""
+        if self._lag_monitor is not None:
+            self._lag_monitor.cancel()
+            self._lag_monitor = None
+        await self.revalidator.stop()
+        await self.link_validator.aclose()
+        await self.write_buffer.close()
+        self.offloader.shutdown()
+        logger.info("Update processor stats: %s", self.update_processor.stats.snapshot())
+        logger.info("Verdict cache stats: %s", self.verdict_cache.get_stats())
+        self.verdict_cache.save()
+        self.storage_manager.close()
+        if self.coordination is not None:
+            self.coordination.close()
+    
+    def flush_pending_writes(self):
+        """Synchronously persist buffered submissions before the process exits."""
+        flushed = self.write_buffer.flush_sync()
+        self.storage_manager.close()
+        logger.info("Flushed %d buffered submissions", flushed)
+    
+    async def _serve_forwarded(self, webhook: WebhookConfig):
+        """Serve the updates a shard router forwards until SIGINT or SIGTERM.
+        
+        Unlike run_webhook() this never calls setWebhook: the router has
+        registered the public URL once for all workers.
+        """
+        from tornado.httpserver import HTTPServer
+        from .shard_router import make_worker_app
+        
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopped.set)
+        
+        server = HTTPServer(make_worker_app(self.application, webhook))
+        async with self.application:
+            await self._post_init(self.application)
+            await self.application.start()
+            server.listen(webhook.port, webhook.listen)
+            try:
+                await stopped.wait()
+            finally:
+                server.stop()
+                await self.application.stop()
+        await self._post_shutdown(self.application)
+    
+    def run(self, webhook: Optional[WebhookConfig] = None, register_webhook: bool = True):
+        """Run the bot with long polling, or with a webhook server if configured.
+        
+        Workers behind a shard router pass register_webhook=False so that
+        only the router tells Telegram where to send updates.
+        """
+        if not self.storage_manager.wait_until_primary(timeout=0):
+            # Two instances must never take updates at once
+            logger.info("Standing by until the primary instance goes away...")
+            self.storage_manager.wait_until_primary()
+            logger.info("Took over as primary")
+        
+        if webhook is None:
+            logger.info("Starting bot in polling mode...")
+            self.application.run_polling()
+            return
+        
+        if not register_webhook:
+            logger.info("Serving forwarded updates on %s:%d", webhook.listen, webhook.port)
+            asyncio.run(self._serve_forwarded(webhook))
+            return
+        
+        logger.info(
+            "Starting bot in webhook mode on %s:%d/%s",
+            webhook.listen, webhook.port, webhook.url_path
+        )
+        self.application.run_webhook(
+            listen=webhook.listen,
+            port=webhook.port,
+            url_path=webhook.url_path,
+            cert=webhook.cert,
+            key=webhook.key,
+            webhook_url=webhook.full_webhook_url(),
+            secret_token=webhook.secret_token,
+            max_connections=webhook.max_connections,
+            drop_pending_updates=webhook.drop_pending_updates
+        ) 
\ No newline at end of file
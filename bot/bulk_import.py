@@ -0,0 +1,154 @@
+"""Bulk import of channel links from uploaded files."""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, Iterator, List, Optional, Set
+from utils.offload import Offloader
+from validators.link_validator import LinkValidator
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".txt", ".csv", ".json")
+# Largest file the Bot API lets bots download
+MAX_IMPORT_FILE_SIZE = 20 * 1024 * 1024
+
+# Called with (checked, total) after every validated batch
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+def parse_import_file(path: str) -> List[str]:
+    """Extract distinct usernames from a file; module-level so a worker process can run it."""
+    return BulkImporter(LinkValidator()).parse_file(path)
+
+@dataclass
+class ImportResult:
+    """Outcome of one bulk import."""
+    found: int = 0            # Distinct links in the file
+    already_stored: int = 0   # Links the user had submitted before
+    skipped: int = 0          # Links beyond the import limit or link budget
+    valid: List[str] = field(default_factory=list)
+    invalid: int = 0
+
+class BulkImporter:
+    """Extracts links from large files and validates them in concurrent batches.
+    
+    Files are read line by line with the validator's extractor, so memory
+    use is bounded by the number of distinct links rather than the file size.
+    CSV and JSON need no real parsing: links never contain commas, and JSON
+    only needs its escaped slashes undone.
+    """
+    
+    def __init__(self,
+                 link_validator: LinkValidator,
+                 batch_size: int = 100,
+                 max_links: int = 10000,
+                 offloader: Optional[Offloader] = None):
+        """Initialize importer with its validator, batch size, per-file link cap and offloader.
+        
+        With an offloader, large files are parsed in a worker process.
+        """
+        self.link_validator = link_validator
+        self.batch_size = batch_size
+        self.max_links = max_links
+        self.offloader = offloader
+    
+    @staticmethod
+    def is_supported(file_name: Optional[str]) -> bool:
+        """Whether a file name has one of the supported extensions."""
+        return bool(file_name) and file_name.lower().endswith(SUPPORTED_EXTENSIONS)
+    
+    @staticmethod
+    def iter_lines(path: str) -> Iterator[str]:
+        """Yield the lines of a text file, decoding leniently."""
+        is_json = path.lower().endswith(".json")
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                # "https:\/\/t.me\/x" is a valid JSON spelling of a link
+                yield line.replace('\\/', '/') if is_json else line
+    
+    def extract_usernames(self, lines: Iterable[str]) -> List[str]:
+        """Extract distinct usernames from lines, in order of first appearance."""
+        seen = set()
+        usernames = []
+        for line in lines:
+            for _, username in self.link_validator.extract_link_spans(line):
+                key = username.lower()  # Telegram usernames are case-insensitive
+                if key not in seen:
+                    seen.add(key)
+                    usernames.append(username)
+        return usernames
+    
+    def parse_file(self, path: str) -> List[str]:
+        """Extract distinct usernames from an uploaded file."""
+        return self.extract_usernames(self.iter_lines(path))
+    
+    async def validate(self,
+                       usernames: List[str],
+                       progress: Optional[ProgressCallback] = None) -> ImportResult:
+        """Validate usernames batch by batch, reporting progress after each batch."""
+        result = ImportResult(found=len(usernames))
+        total = len(usernames)
+        for start in range(0, total, self.batch_size):
+            batch = usernames[start:start + self.batch_size]
+            results = await self.link_validator.avalidate_spans(
+                [(username, username) for username in batch]
+            )
+            for validation in results.values():
+                if validation.is_valid:
+                    result.valid.append(validation.normalized_link)
+                else:
+                    result.invalid += 1
+            if progress is not None:
+                await progress(min(start + len(batch), total), total)
+        return result
+    
+    async def import_file(self,
+                          path: str,
+                          known_links: Iterable[str] = (),
+                          find_known: Optional[Callable[[List[str]], Awaitable[Set[str]]]] = None,
+                          grant: Optional[Callable[[int], int]] = None,
+                          progress: Optional[ProgressCallback] = None) -> ImportResult:
+        """Parse a file, drop links already known and validate the rest.
+        
+        known_links are the user's own links. find_known is awaited for which
+        of the given normalized links other users collected; those count as valid
+        without a probe. grant is called with the number of links wanting validation and
+        returns how many may be validated (e.g. from a rate limiter); the
+        remainder is reported as skipped.
+        """
+        if self.offloader is not None:
+            usernames = await self.offloader.run_cpu(
+                parse_import_file, path, size=os.path.getsize(path)
+            )
+        else:
+            usernames = await asyncio.to_thread(self.parse_file, path)
+        found = len(usernames)
+        # Stored links are normalized, so their last path segment is the username
+        known = {link.rsplit("/", 1)[-1].lower() for link in known_links}
+        fresh = [username for username in usernames if username.lower() not in known]
+        already_stored = found - len(fresh)
+        # At most max_links links per file are stored, known ones included,
+        # so the rest is skipped before it costs a lookup
+        over_cap = max(0, len(fresh) - self.max_links)
+        fresh = fresh[:self.max_links]
+        collected: List[str] = []
+        if find_known is not None and fresh:
+            links = [self.link_validator.canonical_link(username) for username in fresh]
+            elsewhere = await find_known(links)
+            collected = [link for link in links if link in elsewhere]
+            fresh = [username for username, link in zip(fresh, links) if link not in elsewhere]
+        limit = len(fresh)
+        if grant is not None:
+            limit = grant(limit)
+        result = await self.validate(fresh[:limit], progress)
+        result.valid[:0] = collected
+        result.found = found
+        result.already_stored = already_stored
+        result.skipped = max(0, len(fresh) - limit) + over_cap
+        logger.info(
+            f"Imported {os.path.basename(path)}: {found} links, "
+            f"{len(result.valid)} valid ({len(collected)} known), {result.invalid} invalid, "
+            f"{result.already_stored} already stored, {result.skipped} skipped"
+        )
+        return result
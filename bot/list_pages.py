@@ -0,0 +1,93 @@
+"""Precomputed, paginated rendering of the /list channel list."""
+
+from threading import Lock
+from typing import List, Optional, Sequence, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from .message_templates import (
+    LIST_LINKS_HEADER,
+    LIST_LINKS_PAGE_FOOTER,
+    LIST_PAGE_PREVIOUS,
+    LIST_PAGE_NEXT,
+    escape_markdown_v2
+)
+
+# Telegram rejects messages longer than this many characters
+MAX_MESSAGE_LENGTH = 4096
+
+# Callback data prefix for the page navigation buttons
+LIST_PAGE_CALLBACK_PREFIX = "list:"
+
+class ChannelListPages:
+    """Renders the channel list into MarkdownV2 pages once per list version."""
+    
+    def __init__(self,
+                 max_length: int = MAX_MESSAGE_LENGTH,
+                 max_items_per_page: int = 50):
+        """Initialize page size limits."""
+        self.max_length = max_length
+        self.max_items_per_page = max_items_per_page
+        self._lock = Lock()
+        self._channels: Optional[Sequence[str]] = None
+        self._pages: Tuple[str, ...] = ()
+    
+    def get_pages(self, channels: Sequence[str]) -> Tuple[str, ...]:
+        """Return rendered pages, re-rendering only when the list object changed.
+        
+        The storage layer hands out the same immutable tuple until the list
+        is reloaded, so an identity check is enough to detect a new version.
+        """
+        if channels is not self._channels:
+            with self._lock:
+                if channels is not self._channels:
+                    self._pages = self._render(channels)
+                    self._channels = channels
+        return self._pages
+    
+    def _render(self, channels: Sequence[str]) -> Tuple[str, ...]:
+        """Split the escaped channel lines into pages that fit one message."""
+        # Reserve room for the footer of the largest possible page number
+        footer_room = len(LIST_LINKS_PAGE_FOOTER.format(len(channels), len(channels)))
+        budget = self.max_length - len(LIST_LINKS_HEADER) - footer_room
+        
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        current_length = 0
+        for i, link in enumerate(channels, 1):
+            line = f"\n{i}\\. `{escape_markdown_v2(link, 'code')}`"
+            if current and (
+                current_length + len(line) > budget
+                or len(current) >= self.max_items_per_page
+            ):
+                chunks.append(current)
+                current = []
+                current_length = 0
+            current.append(line)
+            current_length += len(line)
+        if current:
+            chunks.append(current)
+        
+        total = len(chunks)
+        return tuple(
+            LIST_LINKS_HEADER + "".join(lines)
+            + (LIST_LINKS_PAGE_FOOTER.format(number, total) if total > 1 else "")
+            for number, lines in enumerate(chunks, 1)
+        )
+    
+    @staticmethod
+    def keyboard(page: int, total: int) -> Optional[InlineKeyboardMarkup]:
+        """Build previous/next buttons for a zero-based page index."""
+        if total <= 1:
+            return None
+        
+        buttons = []
+        if page > 0:
+            buttons.append(InlineKeyboardButton(
+                LIST_PAGE_PREVIOUS,
+                callback_data=f"{LIST_PAGE_CALLBACK_PREFIX}{page - 1}"
+            ))
+        if page < total - 1:
+            buttons.append(InlineKeyboardButton(
+                LIST_PAGE_NEXT,
+                callback_data=f"{LIST_PAGE_CALLBACK_PREFIX}{page + 1}"
+            ))
+        return InlineKeyboardMarkup([buttons])
@@ -1,5 +1,23 @@
 """Message templates for bot responses."""
 
+from typing import Optional
+
+# Characters with special meaning in MarkdownV2, per the Bot API docs
+_MARKDOWN_V2_SPECIAL = '\\_*[]()~`>#+-=|{}.!'
+_MARKDOWN_V2_ESCAPES = str.maketrans({
+    char: f"\\{char}" for char in _MARKDOWN_V2_SPECIAL
+})
+# Inside pre/code entities only '`' and '\\' must be escaped
+_MARKDOWN_V2_CODE_ESCAPES = str.maketrans({
+    char: f"\\{char}" for char in '\\`'
+})
+
+def escape_markdown_v2(text: str, entity_type: Optional[str] = None) -> str:
+    """Escape text for MarkdownV2, either as plain text or inside a code/pre entity."""
+    if entity_type in ("code", "pre"):
+        return text.translate(_MARKDOWN_V2_CODE_ESCAPES)
+    return text.translate(_MARKDOWN_V2_ESCAPES)
+
 START_MESSAGE = """
 🤖 *Welcome to the Proxy Channel Collector Bot\!*
 
@@ -10,6 +28,7 @@ Send me links to proxy channels, and I'll validate and store them for the commun
 📝 /start \- Start the bot
 ❓ /help \- Show supported formats
 📋 /list \- Show all collected proxy channels
+📤 /export \- Download your links as JSONL or CSV
 
 _Send me some proxy channel links to get started\!_
 """
@@ -24,6 +43,7 @@ HELP_MESSAGE = """
 • `@proxy_channel`
 
 💡 You can send multiple channel links in a single message\!
+📎 To import many at once, upload a \.txt, \.csv or \.json file with them\.
 
 *Examples:*
 `t.me/proxy_example`
@@ -57,6 +77,17 @@ Processed {0} channel\(s\):
 _Use /list to see all available proxy channels\._
 """
 
+LINKS_ALREADY_KNOWN = """
+♻️ *Already Known*
+
+All {0} channel\(s\) you sent are already in the collection\.
+Use /list to see all available proxy channels\.
+"""
+
+LINKS_KNOWN_NOTE = """
+_{0} of them were already known and needed no check\._
+"""
+
 NO_LINKS_FOUND = """
 ❌ *No Valid Links Found*
 
@@ -89,4 +120,81 @@ ERROR_GENERIC = """
 
 Sorry, something went wrong\. Please try again\.
 If the problem persists, contact the bot administrator\.
-""" 
\ No newline at end of file
+"""
+
+CHANNELS_RELOADED = """
+🔄 *Channel List Reloaded*
+
+{0} proxy channel\(s\) are now available\.
+"""
+
+NOT_AUTHORIZED = """
+⛔ *Not Authorized*
+
+This command is only available to bot administrators\.
+"""
+
+LIST_LINKS_PAGE_FOOTER = """
+_Page {0} of {1}_"""
+
+LIST_PAGE_PREVIOUS = "◀️ Previous"
+
+LIST_PAGE_NEXT = "Next ▶️"
+
+RATE_LIMITED = """
+⏳ *Slow Down*
+
+You are sending messages too quickly\.
+Please wait about {0} second\(s\) and try again\.
+"""
+
+LINKS_TRUNCATED = """
+_Only the first {0} of {1} channel\(s\) were checked\. Send the rest a bit later\._
+"""
+
+IMPORT_STARTED = """
+📥 *Import Started*
+
+Reading your file\.\.\.
+"""
+
+IMPORT_PROGRESS = """
+📥 *Importing*
+
+Checked {0} of {1} channel\(s\)\.\.\.
+"""
+
+IMPORT_DONE = """
+📥 *Import Finished*
+
+Found {0} distinct channel\(s\):
+✅ Valid and stored: {1}
+❌ Invalid: {2}
+♻️ Already in your collection: {3}
+⏭ Skipped: {4}
+"""
+
+IMPORT_FAILED = """
+❌ *Import Failed*
+
+Your file could not be downloaded or read\. Please try again later\.
+"""
+
+IMPORT_UNSUPPORTED = """
+❌ *Unsupported File*
+
+Send channel lists as \.txt, \.csv or \.json files of at most {0} MB\.
+"""
+
+EXPORT_USAGE = """
+📤 *Export*
+
+Usage: /export \[jsonl\|csv\]
+Administrators get every stored link with its submitter; everyone else gets their own links\.
+"""
+
+EXPORT_EMPTY = """
+📤 *Export*
+
+There are no stored links to export yet\.
+"""
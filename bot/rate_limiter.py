@@ -0,0 +1,144 @@
+"""Rate limiting of inbound messages and outbound Bot API calls."""
+
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from utils.rate_limit import KeyedRateLimiter
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RateLimitConfig:
+    """Flood control settings; rates are per second, bursts are bucket sizes."""
+    # Inbound messages per user
+    message_rate: float = 0.2
+    message_burst: int = 5
+    # Links a single user may have validated
+    link_rate: float = 1.0
+    link_burst: int = 50
+    # At most one "slow down" reply per user per this many seconds
+    notice_interval: float = 30.0
+    # Outbound existence probes per target host
+    probe_rate: float = 20.0
+    probe_burst: int = 40
+    # Telegram's limits on messages sent by the bot
+    overall_send_rate: float = 30.0
+    chat_send_rate: float = 1.0
+    chat_send_burst: int = 3
+    group_send_rate: float = 20 / 60
+    group_send_burst: int = 20
+    max_retries: int = 3
+    
+    def split(self, workers: int) -> "RateLimitConfig":
+        """Return the share of one of several workers sending for the same bot.
+        
+        Telegram's overall limit is per bot, and a group's updates may be
+        handled by any worker, so both are divided; private chats belong to
+        exactly one worker and keep their full rate.
+        """
+        if workers <= 1:
+            return self
+        return replace(
+            self,
+            overall_send_rate=self.overall_send_rate / workers,
+            group_send_rate=self.group_send_rate / workers,
+            group_send_burst=max(1, self.group_send_burst // workers)
+        )
+
+class InboundRateLimiter:
+    """Per-user budgets for messages and submitted links."""
+    
+    def __init__(self, config: RateLimitConfig, clock: Callable[[], float] = time.monotonic):
+        """Initialize message, link and notice buckets from the config."""
+        self.config = config
+        self.messages = KeyedRateLimiter(config.message_rate, config.message_burst, clock=clock)
+        self.links = KeyedRateLimiter(config.link_rate, config.link_burst, clock=clock)
+        self.notices = KeyedRateLimiter(1 / config.notice_interval, 1, clock=clock)
+    
+    def allow_message(self, user_id: int) -> bool:
+        """Take one message token for the user."""
+        return self.messages.try_acquire(user_id)
+    
+    def grant_links(self, user_id: int, wanted: int) -> int:
+        """Return how many of the wanted links the user may have validated now."""
+        return self.links.acquire_up_to(user_id, wanted)
+    
+    def retry_after(self, user_id: int) -> int:
+        """Whole seconds until the user may send another message."""
+        return max(1, math.ceil(self.messages.retry_after(user_id)))
+    
+    def links_retry_after(self, user_id: int) -> int:
+        """Whole seconds until the user may have another link validated."""
+        return max(1, math.ceil(self.links.retry_after(user_id)))
+    
+    def should_notify(self, user_id: int) -> bool:
+        """Whether a throttled user should be told, so floods get one reply, not many."""
+        return self.notices.try_acquire(user_id)
+
+class TelegramRateLimiter(BaseRateLimiter):
+    """Queues outgoing Bot API requests to stay within Telegram's flood limits.
+    
+    Requests wait for a token from the overall bucket and from the target
+    chat's bucket (slower for groups and channels). A RetryAfter answer makes
+    the request sleep for the requested time and try again.
+    """
+    
+    OVERALL_KEY = "overall"
+    
+    def __init__(self, config: Optional[RateLimitConfig] = None):
+        """Initialize buckets from the config."""
+        self.config = config or RateLimitConfig()
+        self._overall = KeyedRateLimiter(
+            self.config.overall_send_rate, max(1, int(self.config.overall_send_rate))
+        )
+        self._private = KeyedRateLimiter(
+            self.config.chat_send_rate, self.config.chat_send_burst
+        )
+        self._groups = KeyedRateLimiter(
+            self.config.group_send_rate, self.config.group_send_burst
+        )
+    
+    async def initialize(self) -> None:
+        """Nothing to set up."""
+    
+    async def shutdown(self) -> None:
+        """Nothing to tear down."""
+    
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        """Wait for the applicable buckets, then perform the request."""
+        chat_id = data.get("chat_id")
+        if chat_id is not None:
+            await self._overall.acquire(self.OVERALL_KEY)
+            try:
+                chat_id = int(chat_id)
+            except ValueError:
+                pass  # @channelusername
+            if isinstance(chat_id, str) or chat_id < 0:
+                await self._groups.acquire(chat_id)
+            else:
+                await self._private.acquire(chat_id)
+        
+        max_retries = rate_limit_args if rate_limit_args is not None else self.config.max_retries
+        for attempt in range(max_retries + 1):
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == max_retries:
+                    raise
+                logger.warning(
+                    f"Hit flood limit on {endpoint}, retrying in {e.retry_after}s"
+                )
+                await asyncio.sleep(float(e.retry_after) + 0.1)
@@ -0,0 +1,192 @@
+"""Background revalidation of stored channels."""
+
+import asyncio
+import heapq
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from coordination.base import Lease
+from monitoring.metrics import REGISTRY
+from storage.base import LinkStatus, Verdict
+from storage.storage_manager import StorageManager
+from utils.rate_limit import KeyedRateLimiter
+from validators.link_validator import LinkValidator
+
+logger = logging.getLogger(__name__)
+
+REVALIDATIONS = REGISTRY.counter(
+    "revalidations", "Background link rechecks by outcome", ("result",)
+)
+REVALIDATED_ALIVE = REVALIDATIONS.labels("alive")
+REVALIDATED_DEAD = REVALIDATIONS.labels("dead")
+REVALIDATED_INCONCLUSIVE = REVALIDATIONS.labels("inconclusive")
+PRUNED_LINKS = REGISTRY.counter("pruned_links", "Dead links removed from user storage")
+
+@dataclass
+class RevalidationConfig:
+    """Revalidation settings; intervals are in seconds."""
+    enabled: bool = True
+    # Probe budget of the scheduler, on top of the per-host probe limit
+    probes_per_minute: float = 30.0
+    probe_burst: int = 5
+    # A link is due again this long after its last check
+    recheck_interval: float = 24 * 60 * 60
+    # Links dead for this long are removed from user storage (0 keeps them)
+    prune_after: float = 7 * 24 * 60 * 60
+    # Random delay before the first check so restarts cause no probe burst
+    start_jitter: float = 300.0
+    # How often the priority queue is rebuilt from storage
+    refresh_interval: float = 600.0
+    # Verdicts are written back in batches of this size
+    batch_size: int = 20
+    # How much popularity (submitter count) outweighs last-checked age
+    popularity_weight: float = 1.0
+
+class RevalidationScheduler:
+    """Rechecks stored channels gradually, most overdue and popular first.
+    
+    Verdicts are written back with their timestamps: dead channels are hidden
+    from /list right away and removed from user storage once they have been
+    dead for ``prune_after`` seconds. Inconclusive probes (timeouts, network
+    errors) change nothing. With several workers, only the one holding the
+    optional lease revalidates.
+    """
+    
+    def __init__(self,
+                 storage_manager: StorageManager,
+                 link_validator: LinkValidator,
+                 config: Optional[RevalidationConfig] = None,
+                 lease: Optional[Lease] = None):
+        """Initialize scheduler with storage, validator, settings and worker lease."""
+        self.storage_manager = storage_manager
+        self.link_validator = link_validator
+        self.config = config or RevalidationConfig()
+        self.lease = lease
+        self.budget = KeyedRateLimiter(
+            self.config.probes_per_minute / 60, self.config.probe_burst
+        )
+        self._queue: List[Tuple[float, str]] = []
+        self._statuses: Dict[str, LinkStatus] = {}
+        self._pending: List[Verdict] = []
+        self._next_refresh = 0.0
+        self._task: Optional[asyncio.Task] = None
+    
+    def priority(self, status: LinkStatus, now: float) -> Optional[float]:
+        """Return the link's priority (higher first), or None if it is not due."""
+        if status.checked_at is None:
+            # Never checked: as overdue as a link unchecked for ten intervals
+            age = 10 * self.config.recheck_interval
+        else:
+            age = now - status.checked_at
+            if age < self.config.recheck_interval:
+                return None
+        return age * (1 + self.config.popularity_weight * math.log1p(status.submitters))
+    
+    async def _refresh_queue(self):
+        """Rebuild the priority queue from the current link statuses."""
+        statuses = await asyncio.to_thread(self.storage_manager.get_link_statuses)
+        now = time.time()
+        queue = []
+        for status in statuses:
+            score = self.priority(status, now)
+            if score is not None:
+                queue.append((-score, status.link))
+        heapq.heapify(queue)
+        self._queue = queue
+        self._statuses = {status.link: status for status in statuses}
+        self._next_refresh = time.monotonic() + self.config.refresh_interval
+        logger.info(f"Revalidation queue rebuilt: {len(queue)} of {len(statuses)} links due")
+    
+    def start(self):
+        """Start revalidating in the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop revalidating and write back the verdicts collected so far."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self.lease is not None:
+            await asyncio.to_thread(self.lease.release)
+    
+    async def _run(self):
+        """Check one link at a time within the probe budget."""
+        await asyncio.sleep(random.uniform(0, self.config.start_jitter))
+        while True:
+            try:
+                if self.lease is not None and not await asyncio.to_thread(self.lease.hold):
+                    # Another worker revalidates; rebuild the queue once we take over
+                    await self.flush()
+                    self._queue = []
+                    await asyncio.sleep(self.lease.ttl)
+                    continue
+                if not self._queue or time.monotonic() >= self._next_refresh:
+                    await self.flush()
+                    await self._refresh_queue()
+                if not self._queue:
+                    await asyncio.sleep(self._idle_interval())
+                    continue
+                
+                _, link = heapq.heappop(self._queue)
+                await self.budget.acquire("revalidation")
+                await self.revalidate(link)
+                if len(self._pending) >= self.config.batch_size:
+                    await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error during revalidation: {e}")
+                await asyncio.sleep(self._idle_interval())
+    
+    def _idle_interval(self) -> float:
+        """How long to wait when idle; short enough to keep renewing the lease."""
+        if self.lease is None:
+            return self.config.refresh_interval
+        return min(self.config.refresh_interval, self.lease.ttl / 3)
+    
+    async def revalidate(self, link: str) -> Optional[bool]:
+        """Recheck one link, queueing its verdict; returns None if inconclusive."""
+        exists, error = await self.link_validator.arecheck_link(link)
+        if error:
+            REVALIDATED_INCONCLUSIVE.inc()
+            logger.debug(f"Revalidation of {link} inconclusive: {error}")
+            return None
+        
+        checked_at = time.time()
+        (REVALIDATED_ALIVE if exists else REVALIDATED_DEAD).inc()
+        self._pending.append((link, exists, checked_at))
+        if not exists:
+            logger.info(f"Revalidation found {link} dead")
+        return exists
+    
+    async def flush(self):
+        """Write collected verdicts back and prune links that stayed dead too long."""
+        if not self._pending:
+            return
+        verdicts, self._pending = self._pending, []
+        recorded = await asyncio.to_thread(
+            self.storage_manager.record_link_verdicts, verdicts
+        )
+        if not recorded:
+            return
+        
+        if not self.config.prune_after:
+            return
+        for link, exists, checked_at in verdicts:
+            status = self._statuses.get(link)
+            if (exists or status is None or status.dead_since is None
+                    or status.submitters == 0
+                    or checked_at - status.dead_since < self.config.prune_after):
+                continue
+            removed = await asyncio.to_thread(self.storage_manager.prune_link, link)
+            PRUNED_LINKS.inc()
+            logger.info(f"Pruned {link} from {removed} users after it stayed dead")
@@ -0,0 +1,177 @@
+"""Webhook front end that shards updates across bot worker processes."""
+
+import asyncio
+import json
+import logging
+import signal
+import ssl
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import httpx
+from telegram import Bot, Update
+from tornado.httpserver import HTTPServer
+from tornado.web import Application, RequestHandler
+from .webhook import WebhookConfig
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+def shard_key(update: Dict[str, Any]) -> Optional[int]:
+    """Return the sender's id, else the chat id, like the update processor's ordering key."""
+    chat_id = None
+    for name, value in update.items():
+        if name == "update_id" or not isinstance(value, dict):
+            continue
+        sender = value.get("from") or value.get("user")
+        if isinstance(sender, dict) and "id" in sender:
+            return int(sender["id"])
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat_id is None and isinstance(chat, dict) and "id" in chat:
+            chat_id = int(chat["id"])
+    return chat_id
+
+def shard_for(update: Dict[str, Any], shards: int) -> int:
+    """Pick the worker for an update; one user's updates always go to the same worker."""
+    key = shard_key(update)
+    if key is None:
+        key = int(update.get("update_id", 0))
+    return abs(key) % shards
+
+class _UpdateHandler(RequestHandler):
+    """Accepts one webhook POST and forwards it to its shard."""
+    
+    def initialize(self, router: "ShardRouter"):
+        """Receive the router from the application's URL spec."""
+        self.router = router
+    
+    async def post(self):
+        """Check the secret token, then relay the update and the worker's answer."""
+        if self.request.headers.get(SECRET_TOKEN_HEADER) != self.router.webhook.secret_token:
+            self.set_status(403)
+            return
+        try:
+            update = json.loads(self.request.body)
+        except ValueError:
+            self.set_status(400)
+            return
+        self.set_status(await self.router.forward(update, self.request.body))
+
+class _ForwardedUpdateHandler(RequestHandler):
+    """Accepts an update the router forwards and queues it for a worker's application."""
+    
+    def initialize(self, bot_application, secret_token: str):
+        """Receive the bot application and the shared secret token."""
+        self.bot_application = bot_application
+        self.secret_token = secret_token
+    
+    async def post(self):
+        """Check the secret token, then hand the update to the application."""
+        if self.request.headers.get(SECRET_TOKEN_HEADER) != self.secret_token:
+            self.set_status(403)
+            return
+        try:
+            data = json.loads(self.request.body)
+        except ValueError:
+            self.set_status(400)
+            return
+        update = Update.de_json(data, self.bot_application.bot)
+        await self.bot_application.update_queue.put(update)
+
+def make_worker_app(application, webhook: WebhookConfig) -> Application:
+    """Build the tornado application a worker serves the router's requests with."""
+    return Application([
+        (rf"/{webhook.url_path}/?", _ForwardedUpdateHandler, {
+            "bot_application": application,
+            "secret_token": webhook.secret_token
+        })
+    ])
+
+class ShardRouter:
+    """Receives Telegram's webhook requests and forwards each to a worker by user id.
+    
+    Every worker runs its own webhook server on a local port. Keeping a
+    user on one worker preserves per-user ordering and rate limits, while
+    different users are handled by different processes. A worker that
+    cannot be reached yields a 503 so Telegram redelivers the update later.
+    The router alone registers the webhook with Telegram; workers never do.
+    """
+    
+    def __init__(self,
+                 webhook: WebhookConfig,
+                 worker_urls: List[str],
+                 token: Optional[str] = None,
+                 timeout: float = 30.0):
+        """Initialize router with the public webhook settings, one URL per worker and the bot token."""
+        self.webhook = webhook
+        self.worker_urls = worker_urls
+        self.token = token
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_keepalive_connections=webhook.max_connections)
+        )
+        self.forwarded = [0] * len(worker_urls)
+    
+    async def forward(self, update: Dict[str, Any], body: bytes) -> int:
+        """Post an update to its worker, returning the status to answer Telegram with."""
+        shard = shard_for(update, len(self.worker_urls))
+        try:
+            response = await self.client.post(
+                self.worker_urls[shard],
+                content=body,
+                headers={
+                    "Content-Type": "application/json",
+                    SECRET_TOKEN_HEADER: self.webhook.secret_token
+                }
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Worker {shard} unreachable: {e}")
+            return 503
+        self.forwarded[shard] += 1
+        return response.status_code
+    
+    def make_app(self) -> Application:
+        """Build the tornado application serving the public webhook path."""
+        return Application([
+            (rf"/{self.webhook.url_path}/?", _UpdateHandler, {"router": self})
+        ])
+    
+    async def register_webhook(self):
+        """Point Telegram at the public webhook URL (once, for all workers)."""
+        certificate = Path(self.webhook.cert).read_bytes() if self.webhook.cert else None
+        async with Bot(self.token) as bot:
+            await bot.set_webhook(
+                url=self.webhook.full_webhook_url(),
+                certificate=certificate,
+                max_connections=self.webhook.max_connections,
+                drop_pending_updates=self.webhook.drop_pending_updates,
+                secret_token=self.webhook.secret_token
+            )
+        logger.info(f"Registered webhook {self.webhook.full_webhook_url()}")
+    
+    async def serve(self):
+        """Register the webhook if a token was given, then serve until SIGINT or SIGTERM."""
+        ssl_context = None
+        if self.webhook.cert:
+            ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ssl_context.load_cert_chain(self.webhook.cert, self.webhook.key)
+        
+        server = HTTPServer(self.make_app(), ssl_options=ssl_context)
+        server.listen(self.webhook.port, self.webhook.listen)
+        logger.info(
+            f"Routing updates from {self.webhook.listen}:{self.webhook.port}"
+            f"/{self.webhook.url_path} to {len(self.worker_urls)} workers"
+        )
+        
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopped.set)
+        try:
+            if self.token:
+                await self.register_webhook()
+            await stopped.wait()
+        finally:
+            server.stop()
+            await self.client.aclose()
+            logger.info(f"Updates forwarded per worker: {self.forwarded}")
@@ -0,0 +1,164 @@
+"""Concurrent update processing that keeps each user's updates in order."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, Hashable, List, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from monitoring.metrics import REGISTRY
+from monitoring.log_pipeline import log_context, sampled
+
+logger = logging.getLogger(__name__)
+
+UPDATE_WAIT_SECONDS = REGISTRY.histogram(
+    "update_wait_seconds", "Time updates wait for their user's turn and a free slot"
+)
+
+class UpdateProcessorStats:
+    """Queue depth and wait time measurements of the update processor."""
+    
+    def __init__(self, window: int = 1000):
+        """Initialize counters; percentiles cover the last `window` updates."""
+        self.queued = 0        # Updates waiting for their user's turn or a free slot
+        self.in_progress = 0   # Updates currently being handled
+        self.processed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=window)
+    
+    def record_wait(self, wait: float):
+        """Record how long one update waited before processing started."""
+        self.processed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._recent_waits.append(wait)
+        UPDATE_WAIT_SECONDS.observe(wait)
+    
+    def wait_percentile(self, percentile: float) -> float:
+        """Return a percentile (0-100) of recent wait times in seconds."""
+        if not self._recent_waits:
+            return 0.0
+        ordered = sorted(self._recent_waits)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+    
+    def snapshot(self) -> Dict[str, float]:
+        """Return the current measurements as a plain dict."""
+        return {
+            "queued": self.queued,
+            "in_progress": self.in_progress,
+            "processed": self.processed,
+            "avg_wait": self.total_wait / self.processed if self.processed else 0.0,
+            "p50_wait": self.wait_percentile(50),
+            "p99_wait": self.wait_percentile(99),
+            "max_wait": self.max_wait
+        }
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates concurrently while serializing updates of the same user.
+    
+    Updates first wait for their user's lock and only then for one of the
+    ``max_concurrent_updates`` global slots, so a user flooding the bot
+    queues behind themselves instead of occupying slots other users need.
+    """
+    
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: int = 10000):
+        """Initialize global concurrency and the cap on accepted in-flight updates."""
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        self._processing_limit = max_concurrent_updates
+        # The base class only caps accepted updates; the real processing
+        # limit is applied after the per-user lock has been acquired
+        super().__init__(max(max_pending_updates, max_concurrent_updates))
+        self._slots: Optional[asyncio.BoundedSemaphore] = None
+        # user key -> [lock, number of updates holding or waiting for it]
+        self._user_locks: Dict[Hashable, List[Any]] = {}
+        self.stats = UpdateProcessorStats()
+    
+    @property
+    def processing_limit(self) -> int:
+        """The maximum number of updates handled at the same time.
+        
+        max_concurrent_updates, checked by the base class, is the larger cap
+        on updates accepted and waiting for their user's turn or a slot.
+        """
+        return self._processing_limit
+    
+    @staticmethod
+    def ordering_key(update: object) -> Optional[Hashable]:
+        """Return the key whose updates must stay in order, or None if unordered."""
+        if isinstance(update, Update):
+            if update.effective_user is not None:
+                return ("user", update.effective_user.id)
+            if update.effective_chat is not None:
+                return ("chat", update.effective_chat.id)
+        return None
+    
+    @staticmethod
+    def log_fields(update: object) -> Dict[str, Any]:
+        """Return the fields identifying an update in the records logged while handling it."""
+        if not isinstance(update, Update):
+            return {}
+        fields = {"update_id": update.update_id}
+        if update.effective_user is not None:
+            fields["user_id"] = update.effective_user.id
+        return fields
+    
+    async def initialize(self) -> None:
+        """Create the processing slots inside the running event loop."""
+        self._slots = asyncio.BoundedSemaphore(self._processing_limit)
+    
+    async def shutdown(self) -> None:
+        """Nothing to release; pending updates finish on their own."""
+    
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Wait for the user's turn and a free slot, then process the update."""
+        if self._slots is None:
+            await self.initialize()
+        
+        enqueued = time.monotonic()
+        self.stats.queued += 1
+        key = self.ordering_key(update)
+        entry = None
+        if key is not None:
+            entry = self._user_locks.get(key)
+            if entry is None:
+                entry = self._user_locks[key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+        
+        started = False
+        holds_user_lock = False
+        try:
+            if entry is not None:
+                await entry[0].acquire()
+                holds_user_lock = True
+            async with self._slots:
+                started = True
+                self.stats.queued -= 1
+                begun = time.monotonic()
+                wait = begun - enqueued
+                self.stats.record_wait(wait)
+                self.stats.in_progress += 1
+                try:
+                    with log_context(**self.log_fields(update)):
+                        await coroutine
+                        logger.info("Processed update", extra=sampled(
+                            wait_ms=round(wait * 1000, 1),
+                            duration_ms=round((time.monotonic() - begun) * 1000, 1)
+                        ))
+                finally:
+                    self.stats.in_progress -= 1
+        finally:
+            if holds_user_lock:
+                entry[0].release()
+            if not started:
+                # Cancelled while waiting; the handler coroutine never ran
+                self.stats.queued -= 1
+                if asyncio.iscoroutine(coroutine):
+                    coroutine.close()
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._user_locks[key]
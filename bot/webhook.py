@@ -0,0 +1,32 @@
+"""Webhook serving configuration."""
+
+import secrets
+from dataclasses import dataclass, field
+from typing import Optional
+
+def generate_secret_token() -> str:
+    """Generate a secret token using only characters Telegram accepts (A-Z, a-z, 0-9, _ and -)."""
+    return secrets.token_urlsafe(32)
+
+@dataclass
+class WebhookConfig:
+    """Settings for serving updates through the built-in webhook server."""
+    # Public HTTPS URL Telegram posts updates to (usually a reverse proxy)
+    webhook_url: str
+    listen: str = "127.0.0.1"
+    port: int = 8443
+    url_path: str = "telegram"
+    # Checked against the X-Telegram-Bot-Api-Secret-Token header of every request
+    secret_token: str = field(default_factory=generate_secret_token)
+    # Maximum simultaneous HTTPS connections Telegram opens to the webhook
+    max_connections: int = 40
+    cert: Optional[str] = None
+    key: Optional[str] = None
+    drop_pending_updates: bool = False
+    
+    def full_webhook_url(self) -> str:
+        """Return the URL registered with Telegram, including the path."""
+        base = self.webhook_url.rstrip("/")
+        if self.url_path and not base.endswith(f"/{self.url_path}"):
+            return f"{base}/{self.url_path}"
+        return base
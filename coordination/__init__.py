@@ -0,0 +1 @@
+"""State shared between bot worker processes: leases, counters and cached verdicts."""
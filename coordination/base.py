@@ -0,0 +1,100 @@
+"""Coordination backend interface and the lease built on top of it."""
+
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class CoordinationError(Exception):
+    """Raised when the coordination backend cannot be reached or answers badly."""
+
+class CoordinationBackend(ABC):
+    """Key-value operations that worker processes use to share state.
+    
+    The operations mirror a small subset of Redis so that a Redis server (or
+    the bundled local broker) can back several workers on one or more hosts.
+    Values are strings; ttl is in seconds.
+    """
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Return the value of a key, or None if it is missing or expired."""
+    
+    @abstractmethod
+    def set(self,
+            key: str,
+            value: str,
+            ttl: Optional[float] = None,
+            only_if_absent: bool = False) -> bool:
+        """Set a key, returning False if only_if_absent and the key exists."""
+    
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove a key."""
+    
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically increment an integer counter, returning the new value."""
+    
+    @abstractmethod
+    def compare_and_set(self,
+                        key: str,
+                        expected: str,
+                        value: Optional[str],
+                        ttl: Optional[float] = None) -> bool:
+        """Set key to value (or delete it if value is None) only if it holds expected."""
+    
+    def close(self):
+        """Release connections."""
+
+class Lease:
+    """Time-limited ownership of a named role, e.g. "the worker that revalidates".
+    
+    The holder renews the lease well before it expires; if the holder dies
+    the key expires and another worker takes over after at most ``ttl``
+    seconds. Backend failures count as not holding the lease.
+    """
+    
+    def __init__(self, backend: CoordinationBackend, name: str, ttl: float = 30.0):
+        """Initialize lease name and expiry; the owner token is unique per instance."""
+        self.backend = backend
+        self.key = f"lease:{name}"
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+        self._renew_at = 0.0
+        self._held = False
+    
+    def hold(self) -> bool:
+        """Acquire or renew the lease as needed, returning whether it is held."""
+        now = time.monotonic()
+        if self._held and now < self._renew_at:
+            return True
+        
+        try:
+            if self._held:
+                held = self.backend.compare_and_set(self.key, self.token, self.token, self.ttl)
+            else:
+                held = self.backend.set(self.key, self.token, self.ttl, only_if_absent=True)
+        except CoordinationError as e:
+            logger.warning(f"Could not refresh {self.key}: {e}")
+            held = False
+        
+        if held != self._held:
+            logger.info(f"{'Acquired' if held else 'Lost'} {self.key}")
+        self._held = held
+        # Renew once a third of the lifetime has passed
+        self._renew_at = now + self.ttl / 3
+        return held
+    
+    def release(self):
+        """Give the lease up so another worker can take over immediately."""
+        if not self._held:
+            return
+        self._held = False
+        try:
+            self.backend.compare_and_set(self.key, self.token, None)
+        except CoordinationError as e:
+            logger.warning(f"Could not release {self.key}: {e}")
@@ -0,0 +1,304 @@
+"""Local broker speaking the subset of the Redis protocol the bot uses.
+
+Several bot workers on one host can share state through it without running
+Redis; it keeps everything in memory and is lost on restart, which is fine
+for leases, counters and cached verdicts. Run it standalone with:
+    
+    python -m coordination.broker [--host 127.0.0.1] [--port 6379]
+
+or embedded on a background thread via ``LocalBroker(...).start()``.
+Supported commands: PING, AUTH, SELECT, GET, SET (EX/PX/NX/XX), DEL, INCR,
+WATCH, UNWATCH, MULTI, EXEC, DISCARD and FLUSHALL.
+"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class _Error(Exception):
+    """Command error reported to the client as a RESP error."""
+
+class _Session:
+    """Per-connection transaction state."""
+    
+    def __init__(self):
+        """Start with no watched keys and no open transaction."""
+        self.watched: Dict[str, int] = {}
+        self.queued: Optional[List[List[bytes]]] = None  # Set inside MULTI
+
+class LocalBroker:
+    """Single-threaded in-memory key-value server with Redis wire compatibility."""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379):
+        """Bind the listening socket; port 0 picks a free port."""
+        self._socket = socket.create_server((host, port), backlog=128)
+        # key -> (value, expires_at on the monotonic clock or None)
+        self._entries: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        # key -> modification counter, for WATCH
+        self._versions: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._writers = set()
+    
+    @property
+    def url(self) -> str:
+        """redis:// URL clients connect to."""
+        host, port = self._socket.getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+    
+    def start(self):
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self._run, name="local-broker", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+    
+    def stop(self):
+        """Shut the broker down."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+    
+    def _run(self):
+        """Run the broker's event loop until stop() is called."""
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(
+            asyncio.start_server(self._handle_connection, sock=self._socket)
+        )
+        self._loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            # Close client connections so their handlers see EOF and finish
+            for writer in list(self._writers):
+                writer.close()
+            tasks = asyncio.all_tasks(loop)
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+    
+    async def serve_forever(self):
+        """Serve in the current event loop (standalone mode)."""
+        server = await asyncio.start_server(self._handle_connection, sock=self._socket)
+        logger.info(f"Local broker listening on {self.url}")
+        async with server:
+            await server.serve_forever()
+    
+    def _touch(self, key: str):
+        """Mark a key as modified so transactions watching it abort."""
+        self._versions[key] = self._versions.get(key, 0) + 1
+    
+    def _live(self, key: str) -> Optional[bytes]:
+        """Return an unexpired value, expiring it if its time has come."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self._touch(key)
+            return None
+        return value
+    
+    def _set(self, args: List[bytes]) -> Optional[str]:
+        """SET key value [EX seconds | PX milliseconds] [NX | XX]."""
+        if len(args) < 2:
+            raise _Error("ERR wrong number of arguments for 'set' command")
+        key, value = args[0].decode(), args[1]
+        expires_at = None
+        condition = None
+        options = [arg.upper() for arg in args[2:]]
+        index = 0
+        while index < len(options):
+            option = options[index]
+            if option in (b"EX", b"PX") and index + 1 < len(options):
+                amount = float(options[index + 1])
+                expires_at = time.monotonic() + (amount if option == b"EX" else amount / 1000)
+                index += 2
+            elif option in (b"NX", b"XX"):
+                condition = option
+                index += 1
+            else:
+                raise _Error("ERR syntax error")
+        
+        exists = self._live(key) is not None
+        if (condition == b"NX" and exists) or (condition == b"XX" and not exists):
+            return None
+        self._entries[key] = (value, expires_at)
+        self._touch(key)
+        return "OK"
+    
+    def _incr(self, key: str) -> int:
+        """INCR key, keeping any expiry."""
+        current = self._live(key)
+        try:
+            value = int(current or 0) + 1
+        except ValueError:
+            raise _Error("ERR value is not an integer or out of range")
+        expires_at = self._entries.get(key, (None, None))[1]
+        self._entries[key] = (str(value).encode(), expires_at)
+        self._touch(key)
+        return value
+    
+    def execute(self, command: List[bytes], session: _Session):
+        """Run one command and return its reply value."""
+        name = command[0].upper().decode()
+        args = command[1:]
+        
+        if session.queued is not None and name not in ("EXEC", "DISCARD", "MULTI", "WATCH"):
+            session.queued.append(command)
+            return "QUEUED"
+        
+        if name == "PING":
+            return args[0] if args else "PONG"
+        if name in ("AUTH", "SELECT"):
+            return "OK"  # Single open keyspace
+        if name == "GET":
+            return self._live(args[0].decode())
+        if name == "SET":
+            return self._set(args)
+        if name == "DEL":
+            removed = 0
+            for arg in args:
+                key = arg.decode()
+                if self._live(key) is not None:
+                    del self._entries[key]
+                    self._touch(key)
+                    removed += 1
+            return removed
+        if name == "INCR":
+            return self._incr(args[0].decode())
+        if name == "WATCH":
+            if session.queued is not None:
+                raise _Error("ERR WATCH inside MULTI is not allowed")
+            for arg in args:
+                key = arg.decode()
+                self._live(key)
+                session.watched[key] = self._versions.get(key, 0)
+            return "OK"
+        if name == "UNWATCH":
+            session.watched.clear()
+            return "OK"
+        if name == "MULTI":
+            if session.queued is not None:
+                raise _Error("ERR MULTI calls can not be nested")
+            session.queued = []
+            return "OK"
+        if name == "DISCARD":
+            if session.queued is None:
+                raise _Error("ERR DISCARD without MULTI")
+            session.queued = None
+            session.watched.clear()
+            return "OK"
+        if name == "EXEC":
+            if session.queued is None:
+                raise _Error("ERR EXEC without MULTI")
+            queued, session.queued = session.queued, None
+            watched, session.watched = session.watched, {}
+            for key, version in watched.items():
+                self._live(key)
+                if self._versions.get(key, 0) != version:
+                    return None  # Aborted: a watched key changed
+            replies = []
+            for queued_command in queued:
+                try:
+                    replies.append(self.execute(queued_command, session))
+                except _Error as e:
+                    replies.append(e)
+            return replies
+        if name == "FLUSHALL":
+            for key in list(self._entries):
+                self._touch(key)
+            self._entries.clear()
+            return "OK"
+        raise _Error(f"ERR unknown command '{name}'")
+    
+    @classmethod
+    def encode(cls, reply) -> bytes:
+        """Encode a reply value as RESP."""
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, _Error):
+            return f"-{reply}\r\n".encode()
+        if isinstance(reply, bool):
+            reply = int(reply)
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode()
+        if isinstance(reply, bytes):
+            return b"$%d\r\n%s\r\n" % (len(reply), reply)
+        return b"*%d\r\n" % len(reply) + b"".join(cls.encode(item) for item in reply)
+    
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        """Read one RESP array of bulk strings (or an inline command)."""
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # Inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:])):
+            header = await reader.readline()
+            length = int(header[1:])
+            data = await reader.readexactly(length + 2)
+            args.append(data[:-2])
+        return args
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        """Serve commands on one connection until the client disconnects."""
+        session = _Session()
+        self._writers.add(writer)
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command is None:
+                    break
+                if not command:
+                    continue
+                try:
+                    reply = self.execute(command, session)
+                except _Error as e:
+                    reply = e
+                except (ValueError, IndexError, UnicodeDecodeError):
+                    reply = _Error("ERR invalid arguments")
+                if reply is None and command[0].upper() == b"EXEC":
+                    writer.write(b"*-1\r\n")
+                else:
+                    writer.write(self.encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.debug(f"Broker connection error: {e}")
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+def main():
+    """Run the broker in the foreground."""
+    parser = argparse.ArgumentParser(description="Local coordination broker for bot workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    try:
+        asyncio.run(LocalBroker(args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""In-process coordination backend for a single worker."""
+
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple
+from .base import CoordinationBackend
+
+class InMemoryCoordinationBackend(CoordinationBackend):
+    """Keeps keys in a dict; shares nothing across processes.
+    
+    Used when the bot runs as a single process, so code paths that
+    coordinate workers behave the same without a broker.
+    """
+    
+    def __init__(self):
+        """Initialize an empty key space."""
+        self.lock = Lock()
+        # key -> (value, expires_at on the monotonic clock or None)
+        self._entries: Dict[str, Tuple[str, Optional[float]]] = {}
+    
+    def _live(self, key: str, now: float) -> Optional[str]:
+        """Return an unexpired value, dropping it if it has expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._entries[key]
+            return None
+        return value
+    
+    @staticmethod
+    def _expiry(ttl: Optional[float], now: float) -> Optional[float]:
+        return None if ttl is None else now + ttl
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the value of a live key."""
+        with self.lock:
+            return self._live(key, time.monotonic())
+    
+    def set(self,
+            key: str,
+            value: str,
+            ttl: Optional[float] = None,
+            only_if_absent: bool = False) -> bool:
+        """Set a key unless only_if_absent and it is live."""
+        now = time.monotonic()
+        with self.lock:
+            if only_if_absent and self._live(key, now) is not None:
+                return False
+            self._entries[key] = (value, self._expiry(ttl, now))
+            return True
+    
+    def delete(self, key: str):
+        """Remove a key."""
+        with self.lock:
+            self._entries.pop(key, None)
+    
+    def incr(self, key: str) -> int:
+        """Increment a counter, keeping its expiry."""
+        now = time.monotonic()
+        with self.lock:
+            value = int(self._live(key, now) or 0) + 1
+            expires_at = self._entries.get(key, (None, None))[1]
+            self._entries[key] = (str(value), expires_at)
+            return value
+    
+    def compare_and_set(self,
+                        key: str,
+                        expected: str,
+                        value: Optional[str],
+                        ttl: Optional[float] = None) -> bool:
+        """Replace or delete a key only if it holds expected."""
+        now = time.monotonic()
+        with self.lock:
+            if self._live(key, now) != expected:
+                return False
+            if value is None:
+                del self._entries[key]
+            else:
+                self._entries[key] = (value, self._expiry(ttl, now))
+            return True
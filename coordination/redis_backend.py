@@ -0,0 +1,192 @@
+"""Coordination backend speaking the Redis protocol."""
+
+import logging
+import socket
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator, List, Optional, Union
+from urllib.parse import urlparse
+from .base import CoordinationBackend, CoordinationError
+
+logger = logging.getLogger(__name__)
+
+Reply = Union[None, int, str, List["Reply"]]
+
+class _Connection:
+    """One blocking RESP connection."""
+    
+    def __init__(self, host: str, port: int, timeout: float):
+        """Connect with the given timeout for every later read and write."""
+        self.socket = socket.create_connection((host, port), timeout=timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.socket.makefile('rb')
+    
+    def command(self, *args) -> Reply:
+        """Send one command and return its decoded reply."""
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.socket.sendall(b"".join(parts))
+        return self._read_reply()
+    
+    def _read_reply(self) -> Reply:
+        """Parse one RESP reply."""
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise CoordinationError("Connection closed by coordination server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise CoordinationError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise CoordinationError(f"Unexpected reply from coordination server: {line!r}")
+    
+    def close(self):
+        """Close the socket, ignoring errors."""
+        try:
+            self.reader.close()
+            self.socket.close()
+        except OSError:
+            pass
+
+class RedisCoordinationBackend(CoordinationBackend):
+    """Shares state through a Redis server or the bundled local broker.
+    
+    Connections are pooled and used by one thread at a time; a connection
+    that fails mid-command is discarded. Commands block briefly, which is
+    acceptable for a broker on the same host or network.
+    """
+    
+    def __init__(self,
+                 url: str = "redis://127.0.0.1:6379/0",
+                 timeout: float = 1.0,
+                 max_idle_connections: int = 8):
+        """Initialize backend from a redis://[:password@]host[:port][/db] URL."""
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported coordination URL: {url}")
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.strip("/") or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self.max_idle_connections = max_idle_connections
+        self._idle: List[_Connection] = []
+        self._lock = Lock()
+    
+    def _connect(self) -> _Connection:
+        """Open and authenticate a new connection."""
+        conn = _Connection(self.host, self.port, self.timeout)
+        try:
+            if self.password:
+                conn.command("AUTH", self.password)
+            if self.db:
+                conn.command("SELECT", self.db)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+    
+    @contextmanager
+    def _connection(self) -> Iterator[_Connection]:
+        """Borrow a pooled connection, discarding it if anything goes wrong.
+        
+        After any exception the connection may hold an unread reply, so it
+        is closed rather than reused.
+        """
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        healthy = False
+        try:
+            if conn is None:
+                conn = self._connect()
+            yield conn
+            healthy = True
+        except OSError as e:
+            raise CoordinationError(f"Coordination server unreachable: {e}") from e
+        except ValueError as e:
+            raise CoordinationError(f"Malformed reply from coordination server: {e}") from e
+        finally:
+            if not healthy and conn is not None:
+                conn.close()
+        
+        with self._lock:
+            if len(self._idle) < self.max_idle_connections:
+                self._idle.append(conn)
+                return
+        conn.close()
+    
+    def _execute(self, *args) -> Reply:
+        """Run one command on a pooled connection."""
+        with self._connection() as conn:
+            return conn.command(*args)
+    
+    @staticmethod
+    def _set_args(key: str, value: str, ttl: Optional[float]) -> list:
+        """Build a SET command with an optional millisecond expiry."""
+        args = ["SET", key, value]
+        if ttl is not None:
+            args += ["PX", max(1, int(ttl * 1000))]
+        return args
+    
+    def get(self, key: str) -> Optional[str]:
+        """GET key."""
+        return self._execute("GET", key)
+    
+    def set(self,
+            key: str,
+            value: str,
+            ttl: Optional[float] = None,
+            only_if_absent: bool = False) -> bool:
+        """SET key value [PX ttl] [NX]."""
+        args = self._set_args(key, value, ttl)
+        if only_if_absent:
+            args.append("NX")
+        return self._execute(*args) is not None
+    
+    def delete(self, key: str):
+        """DEL key."""
+        self._execute("DEL", key)
+    
+    def incr(self, key: str) -> int:
+        """INCR key."""
+        return self._execute("INCR", key)
+    
+    def compare_and_set(self,
+                        key: str,
+                        expected: str,
+                        value: Optional[str],
+                        ttl: Optional[float] = None) -> bool:
+        """Optimistic WATCH/MULTI/EXEC transaction; EXEC aborts if key changed."""
+        with self._connection() as conn:
+            conn.command("WATCH", key)
+            if conn.command("GET", key) != expected:
+                conn.command("UNWATCH")
+                return False
+            conn.command("MULTI")
+            if value is None:
+                conn.command("DEL", key)
+            else:
+                conn.command(*self._set_args(key, value, ttl))
+            return conn.command("EXEC") is not None
+    
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
@@ -0,0 +1,123 @@
+"""Verdict cache shared between workers through a coordination backend."""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from validators.verdict_cache import VerdictCache
+from .base import CoordinationBackend, CoordinationError
+
+logger = logging.getLogger(__name__)
+
+class SharedVerdictCache(VerdictCache):
+    """Local LRU cache backed by verdicts other workers have already probed.
+    
+    Local misses fall through to the coordination backend, and every new
+    verdict is published there with its expiry, so a channel is probed once
+    for all workers rather than once per worker. The backend being down only
+    costs the shared hits: after a failure it is skipped for retry_after
+    seconds, doubling up to max_retry_after while failures continue. The
+    async methods run backend calls in a thread so they never block the loop.
+    """
+    
+    def __init__(self,
+                 backend: CoordinationBackend,
+                 prefix: str = "verdict:",
+                 retry_after: float = 1.0,
+                 max_retry_after: float = 30.0,
+                 **kwargs):
+        """Initialize the local cache (same options as VerdictCache), key prefix and backoff."""
+        super().__init__(**kwargs)
+        self.backend = backend
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self.shared_hits = 0
+        self._backoff = retry_after
+        self._skip_until = 0.0
+        self._publishes = set()
+    
+    def _backend_available(self) -> bool:
+        """Whether the backend is worth asking (not inside a backoff window)."""
+        return time.monotonic() >= self._skip_until
+    
+    def _backend_failed(self, e: CoordinationError):
+        """Skip the backend for a while, longer after every consecutive failure."""
+        if not self._backend_available():
+            return  # Another in-flight call already backed off
+        self._skip_until = time.monotonic() + self._backoff
+        logger.warning(f"Shared verdict cache unavailable, retrying in {self._backoff:.0f}s: {e}")
+        self._backoff = min(self._backoff * 2, self.max_retry_after)
+    
+    def _lookup_shared(self, key: str) -> Optional[bool]:
+        """Fetch a published verdict from the backend and cache it locally (blocking)."""
+        try:
+            value = self.backend.get(self.prefix + key)
+        except CoordinationError as e:
+            self._backend_failed(e)
+            return None
+        self._backoff = self.retry_after
+        if value is None:
+            return None
+        
+        flag, _, expires_at = value.partition(":")
+        try:
+            expires_at = float(expires_at)
+        except ValueError:
+            logger.warning(f"Ignoring malformed shared verdict for {key}: {value!r}")
+            return None
+        exists = flag == "1"
+        with self.lock:
+            # Keep the publisher's expiry so the verdict does not live longer here
+            self._entries[key] = (exists, expires_at)
+            self._evict()
+            self.shared_hits += 1
+        return exists
+    
+    def _publish(self, username: str, exists: bool):
+        """Publish a verdict with its expiry to the other workers (blocking)."""
+        ttl = self.positive_ttl if exists else self.negative_ttl
+        try:
+            self.backend.set(
+                self.prefix + self.make_key(username),
+                f"{int(exists)}:{time.time() + ttl}",
+                ttl
+            )
+        except CoordinationError as e:
+            self._backend_failed(e)
+            return
+        self._backoff = self.retry_after
+    
+    def get(self, username: str) -> Optional[bool]:
+        """Return the local verdict, or one another worker has published."""
+        exists = super().get(username)
+        if exists is not None or not self._backend_available():
+            return exists
+        return self._lookup_shared(self.make_key(username))
+    
+    async def aget(self, username: str) -> Optional[bool]:
+        """Like get(), asking the backend from a thread."""
+        exists = super().get(username)
+        if exists is not None or not self._backend_available():
+            return exists
+        return await asyncio.to_thread(self._lookup_shared, self.make_key(username))
+    
+    def set(self, username: str, exists: bool):
+        """Store a verdict locally and publish it to the other workers."""
+        super().set(username, exists)
+        if self._backend_available():
+            self._publish(username, exists)
+    
+    async def aset(self, username: str, exists: bool):
+        """Like set(), publishing in the background so the caller never waits."""
+        super().set(username, exists)
+        if self._backend_available():
+            task = asyncio.create_task(asyncio.to_thread(self._publish, username, exists))
+            self._publishes.add(task)
+            task.add_done_callback(self._publishes.discard)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Return local cache counters plus hits served from the shared cache."""
+        stats = super().get_stats()
+        stats["shared_hits"] = self.shared_hits
+        return stats
@@ -3,24 +3,68 @@
 import os
 import sys
 import signal
+import argparse
+import asyncio
 import logging
-from dotenv import load_dotenv
-from bot.bot_handler import BotHandler
-
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('bot.log')
-    ]
-)
+import multiprocessing
+from typing import TYPE_CHECKING, Optional
+from utils.startup import STARTUP
+from bot.webhook import WebhookConfig
+from utils.offload import OffloadConfig
+from storage.export import EXPORT_FORMATS
+from monitoring.server import MetricsServer
+from monitoring.log_pipeline import LogConfig, LogPipeline, start_logging
+
+# The bot pulls in python-telegram-bot, httpx and tornado, which dominate
+# startup; they are imported only on the paths that need them
+if TYPE_CHECKING:
+    from bot.bot_handler import BotHandler
+    from bot.revalidation import RevalidationConfig
+    from coordination.base import CoordinationBackend
+    from storage.replication import ReplicationConfig
+    from validators.prober import ProbeConfig
+
 logger = logging.getLogger(__name__)
 
+# Set once the bot is constructed so signal handlers can flush its buffers
+_bot: Optional["BotHandler"] = None
+
+def build_log_config() -> LogConfig:
+    """Build logging settings from the environment."""
+    return LogConfig(
+        level=os.getenv('LOG_LEVEL', 'INFO'),
+        path=os.getenv('LOG_FILE', 'bot.log'),
+        console=env_flag('LOG_CONSOLE', default=True),
+        console_format=os.getenv('LOG_FORMAT', 'text'),
+        max_bytes=int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+        rotate_interval=float(os.getenv('LOG_ROTATE_INTERVAL', 24 * 60 * 60)),
+        backup_count=int(os.getenv('LOG_BACKUP_COUNT', 7)),
+        sample_burst=int(os.getenv('LOG_SAMPLE_BURST', 20)),
+        sample_every=int(os.getenv('LOG_SAMPLE_EVERY', 100))
+    )
+
+def configure_logging(worker: Optional[int] = None) -> LogPipeline:
+    """Start logging (once per process, after the environment is loaded).
+    
+    Workers get their own file next to the main one: rotation renames the
+    file, which processes sharing it would race on.
+    """
+    config = build_log_config()
+    if worker is not None and config.path:
+        base, ext = os.path.splitext(config.path)
+        config.path = f"{base}-worker-{worker}{ext}"
+    return start_logging(config)
+
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully."""
     logger.info("Received shutdown signal. Cleaning up...")
+    # While the bot runs, python-telegram-bot handles the signals itself and
+    # flushes through post_shutdown; this covers signals outside that window
+    if _bot is not None:
+        try:
+            _bot.flush_pending_writes()
+        except Exception as e:
+            logger.error(f"Error flushing pending writes: {e}")
     sys.exit(0)
 
 def setup_signal_handlers():
@@ -37,27 +81,349 @@ def check_environment():
         sys.exit(1)
     return token
 
-def main():
+def parse_admin_ids():
+    """Parse the comma-separated ADMIN_USER_IDS environment variable."""
+    raw = os.getenv('ADMIN_USER_IDS', '')
+    admin_ids = set()
+    for part in raw.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            admin_ids.add(int(part))
+        except ValueError:
+            logger.warning(f"Ignoring invalid admin user id: {part}")
+    return admin_ids
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean environment variable ("1", "true", "yes" or "on")."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def parse_args(argv=None):
+    """Parse command line options; unset options fall back to environment variables."""
+    parser = argparse.ArgumentParser(description="Telegram Link Collector Bot")
+    parser.add_argument("command", nargs="?", choices=["run", "export"], default="run",
+                        help="Run the bot (default) or export stored links and exit")
+    parser.add_argument("--mode", choices=["polling", "webhook"],
+                        help="How to receive updates (env BOT_MODE, default polling)")
+    parser.add_argument("--webhook-url",
+                        help="Public URL Telegram posts updates to (env WEBHOOK_URL)")
+    parser.add_argument("--listen",
+                        help="Address the webhook server binds to (env WEBHOOK_LISTEN)")
+    parser.add_argument("--port", type=int,
+                        help="Port the webhook server binds to (env WEBHOOK_PORT)")
+    parser.add_argument("--url-path",
+                        help="Path the webhook server accepts updates on (env WEBHOOK_PATH)")
+    parser.add_argument("--secret-token",
+                        help="Webhook secret token (env WEBHOOK_SECRET_TOKEN, random if unset)")
+    parser.add_argument("--max-connections", type=int,
+                        help="Max connections Telegram opens to the webhook "
+                             "(env WEBHOOK_MAX_CONNECTIONS)")
+    parser.add_argument("--max-concurrent-updates", type=int,
+                        help="Max updates processed at once (env MAX_CONCURRENT_UPDATES)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Serve Prometheus metrics on this port (env METRICS_PORT, "
+                             "disabled if unset)")
+    parser.add_argument("--workers", type=int,
+                        help="Worker processes behind a webhook router that shards "
+                             "updates by user (env WORKERS, default 1)")
+    parser.add_argument("--fast-start", action="store_true",
+                        help="Read storage in the background while connecting to "
+                             "Telegram (env FAST_START=1)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Log how long each startup phase took (env PROFILE_STARTUP=1)")
+    export = parser.add_argument_group("export options")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="jsonl",
+                        help="Export format (default jsonl)")
+    export.add_argument("--output",
+                        help="Export file; a .gz suffix compresses it (default links.<format>)")
+    export.add_argument("--user-id", help="Export only this user's links")
+    return parser.parse_args(argv)
+
+def build_webhook_config(args) -> Optional[WebhookConfig]:
+    """Build the webhook configuration, or return None for polling mode."""
+    mode = args.mode or os.getenv('BOT_MODE', 'polling')
+    if mode == 'polling':
+        return None
+    if mode != 'webhook':
+        logger.error(f"Unknown BOT_MODE: {mode}")
+        sys.exit(1)
+    
+    webhook_url = args.webhook_url or os.getenv('WEBHOOK_URL')
+    if not webhook_url:
+        logger.error("Webhook mode requires --webhook-url or WEBHOOK_URL")
+        sys.exit(1)
+    
+    config = WebhookConfig(webhook_url=webhook_url)
+    config.listen = args.listen or os.getenv('WEBHOOK_LISTEN', config.listen)
+    config.port = args.port or int(os.getenv('WEBHOOK_PORT', config.port))
+    config.url_path = args.url_path or os.getenv('WEBHOOK_PATH', config.url_path)
+    config.secret_token = (
+        args.secret_token or os.getenv('WEBHOOK_SECRET_TOKEN') or config.secret_token
+    )
+    config.max_connections = args.max_connections or int(
+        os.getenv('WEBHOOK_MAX_CONNECTIONS', config.max_connections)
+    )
+    config.cert = os.getenv('WEBHOOK_CERT') or None
+    config.key = os.getenv('WEBHOOK_KEY') or None
+    return config
+
+def build_revalidation_config() -> "RevalidationConfig":
+    """Build background revalidation settings; REVALIDATION_PER_MINUTE=0 disables it."""
+    from bot.revalidation import RevalidationConfig
+    config = RevalidationConfig()
+    per_minute = float(os.getenv('REVALIDATION_PER_MINUTE', config.probes_per_minute))
+    if per_minute <= 0:
+        config.enabled = False
+    else:
+        config.probes_per_minute = per_minute
+    config.recheck_interval = float(
+        os.getenv('REVALIDATION_INTERVAL_HOURS', config.recheck_interval / 3600)
+    ) * 3600
+    config.prune_after = float(
+        os.getenv('PRUNE_DEAD_AFTER_DAYS', config.prune_after / 86400)
+    ) * 86400
+    return config
+
+def build_offload_config() -> OffloadConfig:
+    """Build executor settings; OFFLOAD_PROCESSES=0 keeps all parsing in threads."""
+    config = OffloadConfig()
+    if os.getenv('OFFLOAD_THREADS'):
+        config.thread_workers = int(os.getenv('OFFLOAD_THREADS'))
+    if os.getenv('OFFLOAD_PROCESSES'):
+        config.process_workers = int(os.getenv('OFFLOAD_PROCESSES'))
+    config.inline_max_size = int(os.getenv('OFFLOAD_INLINE_MAX_BYTES', config.inline_max_size))
+    config.process_min_size = int(
+        os.getenv('OFFLOAD_PROCESS_MIN_BYTES', config.process_min_size)
+    )
+    return config
+
+def build_probe_config() -> "ProbeConfig":
+    """Build existence probe settings; PROBE_HTTP2=1 needs httpx[http2]."""
+    from validators.prober import ProbeConfig
+    config = ProbeConfig()
+    config.initial_timeout = float(os.getenv('PROBE_TIMEOUT', config.initial_timeout))
+    config.max_timeout = float(os.getenv('PROBE_MAX_TIMEOUT', config.max_timeout))
+    config.attempts = max(1, int(os.getenv('PROBE_ATTEMPTS', config.attempts)))
+    config.max_connections = int(os.getenv('PROBE_MAX_CONNECTIONS', config.max_connections))
+    config.http2 = env_flag('PROBE_HTTP2')
+    return config
+
+def build_replication_config() -> Optional["ReplicationConfig"]:
+    """Build storage replication settings if REPLICATION_DIR names a shared directory."""
+    directory = os.getenv('REPLICATION_DIR')
+    if not directory:
+        return None
+    from storage.replication import ReplicationConfig
+    config = ReplicationConfig(directory)
+    config.snapshot_records = int(
+        os.getenv('REPLICATION_SNAPSHOT_RECORDS', config.snapshot_records)
+    )
+    config.snapshot_interval = float(
+        os.getenv('REPLICATION_SNAPSHOT_INTERVAL', config.snapshot_interval)
+    )
+    config.poll_interval = float(os.getenv('REPLICATION_POLL_INTERVAL', config.poll_interval))
+    config.fsync = env_flag('REPLICATION_FSYNC')
+    return config
+
+def build_coordination_backend(url: Optional[str]) -> Optional["CoordinationBackend"]:
+    """Build the backend named by COORDINATION_URL ("memory" or redis://...), if any."""
+    if not url:
+        return None
+    if url == "memory":
+        from coordination.memory import InMemoryCoordinationBackend
+        return InMemoryCoordinationBackend()
+    from coordination.redis_backend import RedisCoordinationBackend
+    return RedisCoordinationBackend(url)
+
+def start_metrics_server(args, offset: int = 0) -> Optional[MetricsServer]:
+    """Start the metrics endpoint if a port is configured (worker i uses port + i)."""
+    port = args.metrics_port or int(os.getenv('METRICS_PORT', 0))
+    if not port:
+        return None
+    port += offset
+    server = MetricsServer(port, host=os.getenv('METRICS_LISTEN', '127.0.0.1'))
+    server.start()
+    return server
+
+def run_export(args):
+    """Stream stored links to a file without starting the bot.
+    
+    Storage is opened read-only, so the export is safe while the bot runs:
+    it neither compacts nor rewrites the files the bot has open.
+    """
+    from storage.export import export_to_file
+    if os.getenv('STORAGE_BACKEND', 'json') == 'sqlite':
+        from storage.sqlite_backend import SQLiteStorageBackend
+        storage = SQLiteStorageBackend(read_only=True)
+    else:
+        from storage.json_backend import JsonStorageBackend
+        storage = JsonStorageBackend(read_only=True)
+    output = args.output or f"links.{args.format}"
+    try:
+        count = export_to_file(storage, output, args.format, args.user_id)
+    finally:
+        storage.close()
+    logger.info(f"Exported {count} links to {output}")
+
+def build_bot(args, token: str,
+              coordination: Optional["CoordinationBackend"] = None,
+              workers: int = 1) -> "BotHandler":
+    """Build the bot from command line options and the environment.
+    
+    workers is the number of processes sending for the bot, which share
+    Telegram's bot-wide flood limits.
+    """
+    with STARTUP.phase("import bot"):
+        from bot.bot_handler import BotHandler
+        from bot.rate_limiter import RateLimitConfig
+    with STARTUP.phase("build bot"):
+        return BotHandler(
+            token,
+            rate_limits=RateLimitConfig().split(workers),
+            storage_backend=os.getenv('STORAGE_BACKEND', 'json'),
+            admin_user_ids=parse_admin_ids(),
+            max_concurrent_updates=args.max_concurrent_updates or int(
+                os.getenv('MAX_CONCURRENT_UPDATES', 16)
+            ),
+            api_base_url=os.getenv('TELEGRAM_API_BASE_URL') or None,
+            revalidation=build_revalidation_config(),
+            coordination=coordination,
+            offload=build_offload_config(),
+            probe=build_probe_config(),
+            fast_start=args.fast_start or env_flag('FAST_START'),
+            bloom_capacity=int(os.getenv('KNOWN_LINKS_BLOOM_CAPACITY', 0)) or None,
+            replication=build_replication_config()
+        )
+
+def load_environment():
+    """Load variables from .env (imported here, so the import is timed at startup)."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+def run_worker(index: int, workers: int, args, port: int):
+    """Run one bot worker behind the shard router (in a child process)."""
+    global _bot
+    load_environment()
+    pipeline = configure_logging(worker=index)
+    try:
+        STARTUP.enabled = args.profile_startup or env_flag('PROFILE_STARTUP')
+        token = check_environment()
+        webhook = build_webhook_config(args)
+        # Telegram keeps posting to the router; workers only listen locally
+        webhook.listen = "127.0.0.1"
+        webhook.port = port
+        webhook.cert = webhook.key = None  # TLS ends at the router
+        start_metrics_server(args, offset=index)
+        
+        logger.info(f"Starting worker {index} on port {port}")
+        _bot = build_bot(
+            args, token, build_coordination_backend(os.environ['COORDINATION_URL']),
+            workers=workers
+        )
+        _bot.run(webhook, register_webhook=False)
+    finally:
+        # Child processes exit without running atexit hooks
+        pipeline.stop()
+
+def run_sharded(args, token: str, webhook: Optional[WebhookConfig], workers: int):
+    """Run worker processes behind a router that shards webhook updates by user."""
+    if webhook is None:
+        logger.error("Multiple workers require webhook mode")
+        sys.exit(1)
+    if os.getenv('STORAGE_BACKEND', 'json') != 'sqlite':
+        # JSON storage keeps its state in process memory; SQLite is shared
+        logger.error("Multiple workers require STORAGE_BACKEND=sqlite")
+        sys.exit(1)
+    if os.getenv('REPLICATION_DIR'):
+        # Only one process can hold the primary role
+        logger.error("Storage replication requires a single worker")
+        sys.exit(1)
+    from bot.shard_router import ShardRouter
+    from coordination.broker import LocalBroker
+    
+    broker = None
+    if not os.getenv('COORDINATION_URL'):
+        broker = LocalBroker(port=0)
+        broker.start()
+        os.environ['COORDINATION_URL'] = broker.url
+        logger.info(f"Started local coordination broker at {broker.url}")
+    
+    base_port = int(os.getenv('WORKER_BASE_PORT', webhook.port + 1))
+    # Workers share the router's secret token, so pin it before spawning them
+    os.environ['WEBHOOK_SECRET_TOKEN'] = webhook.secret_token
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(index, workers, args, base_port + index),
+            name=f"bot-worker-{index}"
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    
+    # The router registers the webhook; workers only serve what it forwards
+    router = ShardRouter(webhook, [
+        f"http://127.0.0.1:{base_port + index}/{webhook.url_path}"
+        for index in range(workers)
+    ], token=token)
+    try:
+        asyncio.run(router.serve())
+    finally:
+        for process in processes:
+            process.terminate()  # SIGTERM: each worker shuts down gracefully
+        for process in processes:
+            process.join(timeout=30)
+        if broker is not None:
+            broker.stop()
+
+def main(argv=None):
     """Initialize and run the bot."""
+    global _bot
+    # Logging settings may come from .env, so load it first
+    with STARTUP.phase("load environment"):
+        load_environment()
+    configure_logging()
     try:
+        args = parse_args(argv)
+        
+        if args.command == "export":
+            run_export(args)
+            return
+        
         # Setup signal handlers
         setup_signal_handlers()
         
-        # Load environment variables
-        logger.info("Loading environment variables...")
-        load_dotenv()
+        STARTUP.enabled = args.profile_startup or env_flag('PROFILE_STARTUP')
         
         # Check environment
         token = check_environment()
+        webhook = build_webhook_config(args)
+        
+        workers = args.workers or int(os.getenv('WORKERS', 1))
+        if workers > 1:
+            run_sharded(args, token, webhook, workers)
+            return
+        
+        # Metrics must be enabled before the bot starts so its hooks see it
+        start_metrics_server(args)
         
         # Initialize bot
         logger.info("Initializing bot...")
-        bot = BotHandler(token)
+        bot = build_bot(
+            args, token, build_coordination_backend(os.getenv('COORDINATION_URL'))
+        )
+        _bot = bot
         
         # Run bot
         logger.info("Starting bot...")
-        bot.run()
-        
+        bot.run(webhook)
+    
     except Exception as e:
         logger.error(f"Fatal error: {e}")
         sys.exit(1)
@@ -2,7 +2,10 @@
 
 # Configuration
 PID_FILE="bot.pid"
-LOG_FILE="bot.log"
+# Output outside the logging pipeline (crash tracebacks); the previous run's is kept
+# as bot.out.1. bot.log itself is written (and rotated) by the bot
+OUT_FILE="bot.out"
+LOG_FILE="${LOG_FILE:-bot.log}"
 PYTHON_SCRIPT="main.py"
 
 # Colors for status messages
@@ -31,15 +34,16 @@ start() {
         exit 1
     fi
     
-    # Start the bot with nohup
-    nohup python3 -u "$PYTHON_SCRIPT" > "$LOG_FILE" 2>&1 & echo $! > "$PID_FILE"
+    # Start the bot with nohup; records already go to the log file, so skip the console
+    [ -f "$OUT_FILE" ] && mv "$OUT_FILE" "$OUT_FILE.1"
+    LOG_CONSOLE=0 nohup python3 -u "$PYTHON_SCRIPT" > "$OUT_FILE" 2>&1 & echo $! > "$PID_FILE"
     
     # Wait a moment to check if process is still running
     sleep 2
     if is_running; then
         echo -e "${GREEN}Bot started successfully with PID $(cat $PID_FILE)${NC}"
     else
-        echo -e "${RED}Failed to start bot. Check $LOG_FILE for details${NC}"
+        echo -e "${RED}Failed to start bot. Check $OUT_FILE for details${NC}"
         rm -f "$PID_FILE"
         exit 1
     fi
@@ -76,7 +80,11 @@ status() {
         pid=$(cat "$PID_FILE")
         echo -e "${GREEN}Bot is running with PID $pid${NC}"
         echo "Recent logs:"
-        tail -n 5 "$LOG_FILE"
+        if [ -f "$LOG_FILE" ]; then
+            tail -n 5 "$LOG_FILE"
+        else
+            tail -n 5 "$OUT_FILE"
+        fi
     else
         echo -e "${RED}Bot is not running${NC}"
         [ -f "$PID_FILE" ] && rm -f "$PID_FILE"
@@ -0,0 +1 @@
+"""Metrics collection and the Prometheus scrape endpoint."""
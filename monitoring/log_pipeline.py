@@ -0,0 +1,260 @@
+"""Logging through a queue and a writer thread, with JSON records, rotation and sampling."""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List
+from .metrics import REGISTRY
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "log_records_dropped", "Log records not written", ("reason",)
+)
+DROPPED_QUEUE_FULL = LOG_RECORDS_DROPPED.labels("queue_full")
+DROPPED_SAMPLED = LOG_RECORDS_DROPPED.labels("sampled")
+
+# Fields of the update being handled, added to every record logged meanwhile
+LOG_CONTEXT: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context")
+
+# Attributes every LogRecord has; anything else on a record is an extra field
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "taskName", "sampled"
+}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """Add fields (e.g. user_id, update_id) to the records logged inside the block."""
+    token = LOG_CONTEXT.set({**LOG_CONTEXT.get({}), **fields})
+    try:
+        yield
+    finally:
+        LOG_CONTEXT.reset(token)
+
+def sampled(**fields) -> Dict[str, Any]:
+    """Build the extra of a per-update INFO record, which is sampled under load."""
+    return {"sampled": True, **fields}
+
+def record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """Return the extra fields of a record: context, timings and the like."""
+    return {
+        key: value for key, value in vars(record).items()
+        if key not in _RECORD_ATTRIBUTES
+    }
+
+@dataclass
+class LogConfig:
+    """Level, destinations, rotation and load shedding of the log pipeline."""
+    level: str = "INFO"
+    # File of JSON lines; empty disables the file
+    path: str = "bot.log"
+    # Also write to stdout; always on when there is no file
+    console: bool = True
+    # Console records as "text" lines or "json"
+    console_format: str = "text"
+    # The file rolls over at this size and at every interval boundary (UTC)
+    max_bytes: int = 10 * 1024 * 1024
+    rotate_interval: float = 24 * 60 * 60
+    backup_count: int = 7
+    # Records waiting for the writer thread; further ones are dropped
+    queue_size: int = 10000
+    # Sampled records pass freely up to this many per second, then one in sample_every
+    sample_burst: int = 20
+    sample_every: int = 100
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, extra fields at the top level."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        """Serialize a record."""
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                    + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update(record_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """The classic one-line format with extra fields appended as key=value."""
+    
+    def __init__(self):
+        """Use the format the bot has always logged in."""
+        super().__init__(TEXT_FORMAT)
+    
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        """Format the line, then append the extra fields."""
+        line = super().formatMessage(record)
+        fields = record_fields(record)
+        if fields:
+            line += " [" + " ".join(f"{key}={value}" for key, value in fields.items()) + "]"
+        return line
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Numbered rotation (bot.log.1, bot.log.2, ...) when the file is too big or too old."""
+    
+    def __init__(self, filename: str, max_bytes: int, interval: float, backup_count: int):
+        """Open the file; interval 0 disables rotation by time."""
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.interval = interval
+        self.next_rollover = self._next_boundary()
+    
+    def _next_boundary(self) -> float:
+        """Return the next multiple of the interval (midnight UTC for a day)."""
+        if not self.interval:
+            return float("inf")
+        return (time.time() // self.interval + 1) * self.interval
+    
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """Roll over at an interval boundary unless the file is still empty."""
+        if time.time() >= self.next_rollover:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.stream.tell() > 0:
+                return True
+            self.next_rollover = self._next_boundary()
+        return super().shouldRollover(record)
+    
+    def doRollover(self):
+        """Rotate the files and schedule the next time-based rollover."""
+        super().doRollover()
+        self.next_rollover = self._next_boundary()
+
+class SampleFilter(logging.Filter):
+    """Passes sampled records freely up to a burst per second, then one in N."""
+    
+    def __init__(self, burst: int, every: int):
+        """Initialize filter with the free burst and the sampling ratio beyond it."""
+        super().__init__()
+        self.burst = burst
+        self.every = max(1, every)
+        self._second = 0
+        self._count = 0
+        self._lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Decide whether a record is kept; kept samples carry their sample_rate."""
+        if not getattr(record, "sampled", False) or record.levelno > logging.INFO:
+            return True
+        second = int(record.created)
+        with self._lock:
+            # Records are logged from the event loop and worker threads alike
+            if second != self._second:
+                self._second = second
+                self._count = 0
+            self._count += 1
+            count = self._count
+        if count <= self.burst:
+            return True
+        if (count - self.burst) % self.every == 0:
+            record.sample_rate = self.every
+            return True
+        DROPPED_SAMPLED.inc()
+        return False
+
+class ContextFilter(logging.Filter):
+    """Copies the current log_context fields onto each record."""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Add context fields the record does not set itself."""
+        for key, value in LOG_CONTEXT.get({}).items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread, dropping them rather than blocking."""
+    
+    def enqueue(self, record: logging.LogRecord):
+        """Queue a record unless the writer has fallen too far behind."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_QUEUE_FULL.inc()
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Render the message while its arguments are current, keeping the traceback apart."""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class LogPipeline:
+    """Routes all logging through a bounded queue to one writer thread.
+    
+    Logging calls only format the message and enqueue it; console and file
+    writes, JSON encoding and rotation happen on the writer thread, so a
+    slow disk never stalls the event loop. Per-update INFO records marked
+    with sampled() are thinned out under load; warnings and errors never are.
+    """
+    
+    def __init__(self, config: LogConfig):
+        """Build the handlers; nothing is logged through them until start()."""
+        self.config = config
+        self.queue: "queue.Queue[logging.LogRecord]" = queue.Queue(config.queue_size)
+        self.handlers: List[logging.Handler] = []
+        
+        if config.console or not config.path:
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(
+                JsonFormatter() if config.console_format == "json" else TextFormatter()
+            )
+            self.handlers.append(console)
+        if config.path:
+            file_handler = SizeAndTimeRotatingFileHandler(
+                config.path, config.max_bytes, config.rotate_interval, config.backup_count
+            )
+            file_handler.setFormatter(JsonFormatter())
+            self.handlers.append(file_handler)
+        
+        self.handler = DroppingQueueHandler(self.queue)
+        self.handler.addFilter(SampleFilter(config.sample_burst, config.sample_every))
+        self.handler.addFilter(ContextFilter())
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers)
+        self._running = False
+    
+    def start(self):
+        """Replace the root logger's handlers with the queue and start the writer."""
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.config.level.upper())
+        self.listener.start()
+        self._running = True
+        atexit.register(self.stop)
+    
+    def stop(self):
+        """Write out queued records and close the files (safe to call twice)."""
+        if not self._running:
+            return
+        self._running = False
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+def start_logging(config: LogConfig) -> LogPipeline:
+    """Configure process-wide logging and return the running pipeline."""
+    pipeline = LogPipeline(config)
+    pipeline.start()
+    return pipeline
@@ -0,0 +1,265 @@
+"""Lightweight Prometheus-style metrics.
+
+Metrics are cheap no-ops until the registry is enabled, which happens when the
+metrics endpoint is started, so instrumentation can stay in the hot paths.
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond regex work to slow probes
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a Prometheus label set."""
+    pairs = [
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric(ABC):
+    """Base class handling names, help text and labelled children.
+    
+    Updates may come from the event loop and worker threads at once, so
+    each metric guards its values with its own lock.
+    """
+    
+    kind = "untyped"
+    
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = Lock()
+    
+    def labels(self, *values: str) -> "_Metric":
+        """Return the child metric for one combination of label values."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+    
+    def _new_child(self) -> "_Metric":
+        return type(self)(self._registry, self.name, self.documentation)
+    
+    @abstractmethod
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        """Return (suffix, labels, value) samples of an unlabelled metric."""
+    
+    def render(self) -> List[str]:
+        """Render the metric in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        if self.labelnames:
+            series = [
+                (_format_labels(self.labelnames, key), child)
+                for key, child in sorted(self._children.items())
+            ]
+        else:
+            series = [("", self)]
+        for labels, metric in series:
+            for suffix, extra, value in metric._samples():
+                if labels and extra:
+                    label_text = labels[:-1] + "," + extra + "}"
+                elif extra:
+                    label_text = "{" + extra + "}"
+                else:
+                    label_text = labels
+                lines.append(f"{self.name}{suffix}{label_text} {value:g}")
+        return lines
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    
+    kind = "counter"
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0):
+        """Increase the counter."""
+        if self._registry.enabled:
+            with self._lock:
+                self.value += amount
+    
+    def _samples(self):
+        return [("_total", "", self.value)]
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally read from a callback at scrape time."""
+    
+    kind = "gauge"
+    
+    def __init__(self, *args, callback: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = 0.0
+        self.callback = callback
+    
+    def set(self, value: float):
+        """Set the gauge."""
+        if self._registry.enabled:
+            self.value = value
+    
+    def _samples(self):
+        value = self.value
+        if self.callback is not None:
+            try:
+                value = float(self.callback())
+            except Exception:
+                value = float("nan")
+        return [("", "", value)]
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+    
+    kind = "histogram"
+    
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def _new_child(self):
+        return Histogram(self._registry, self.name, self.documentation, buckets=self.buckets)
+    
+    def observe(self, value: float):
+        """Record one observation."""
+        if not self._registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.sum += value
+            self.count += 1
+    
+    def time(self):
+        """Context manager and decorator timing a block or (async) function."""
+        return _Timer(self)
+    
+    def _samples(self):
+        with self._lock:
+            counts, total, count = list(self._counts), self.sum, self.count
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            samples.append(("_bucket", f'le="{bound:g}"', cumulative))
+        samples.append(("_bucket", 'le="+Inf"', count))
+        samples.append(("_sum", "", total))
+        samples.append(("_count", "", count))
+        return samples
+
+class _Timer:
+    """Times a block into a histogram; skips the clock entirely when disabled."""
+    
+    __slots__ = ("_histogram", "_started")
+    
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+        self._started = None
+    
+    def __enter__(self):
+        if self._histogram._registry.enabled:
+            self._started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        if self._started is not None:
+            self._histogram.observe(time.perf_counter() - self._started)
+        return False
+    
+    def __call__(self, function):
+        histogram = self._histogram
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with _Timer(histogram):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _Timer(histogram):
+                return function(*args, **kwargs)
+        return wrapper
+
+class MetricsRegistry:
+    """Holds all metrics and renders them for scraping."""
+    
+    def __init__(self):
+        self.enabled = False
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create (or return the existing) counter."""
+        return self._register(Counter(self, name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], float]] = None) -> Gauge:
+        """Create (or return the existing) gauge."""
+        return self._register(Gauge(self, name, documentation, labelnames, callback=callback))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create (or return the existing) histogram."""
+        return self._register(Histogram(self, name, documentation, labelnames, buckets=buckets))
+    
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry used by the instrumented modules
+REGISTRY = MetricsRegistry()
+
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke up a periodic timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Periodically measure how far the event loop lags behind its timers."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - started - interval))
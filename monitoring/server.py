@@ -0,0 +1,65 @@
+"""HTTP endpoint exposing metrics for Prometheus to scrape."""
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from .metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class MetricsServer:
+    """Serves ``GET /metrics`` from a background thread."""
+    
+    def __init__(self, port: int, host: str = "127.0.0.1",
+                 registry: MetricsRegistry = REGISTRY):
+        """Initialize the listening socket; metrics stay disabled until start()."""
+        self.registry = registry
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def port(self) -> int:
+        """The port actually bound (useful when started with port 0)."""
+        return self._server.server_address[1]
+    
+    def start(self):
+        """Enable collection and serve scrapes on a background thread."""
+        self.registry.enabled = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="metrics-server",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Serving metrics on port {self.port}")
+    
+    def stop(self):
+        """Shut the server down and stop collecting."""
+        self._server.shutdown()
+        self._server.server_close()
+        self.registry.enabled = False
+    
+    def _make_handler(self):
+        """Build the request handler class bound to this server's registry."""
+        registry = self.registry
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+        
+        return Handler
@@ -0,0 +1,106 @@
+"""Storage backend interface."""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+class LinkStatus(NamedTuple):
+    """Revalidation state of one stored link."""
+    link: str
+    submitters: int               # Number of users who submitted the link
+    checked_at: Optional[float]   # Wall-clock time of the last check, None if never
+    alive: Optional[bool]         # Last verdict, None if never checked
+    dead_since: Optional[float]   # First failed check of the current dead streak
+
+# (link, alive, checked_at)
+Verdict = Tuple[str, bool, float]
+
+class StorageBackend(ABC):
+    """Interface implemented by every link storage backend.
+    
+    Backends raise on failure; StorageManager turns errors into the boolean
+    and None results its callers expect.
+    """
+    
+    @abstractmethod
+    def store_links(self, user_id: str, username: str, links: List[str]):
+        """Add links to a user's collection, ignoring ones already stored."""
+    
+    def store_links_batch(self, submissions: List[Tuple[str, str, List[str]]]):
+        """Store several (user_id, username, links) submissions at once.
+        
+        Backends override this to write the whole batch in one operation.
+        """
+        for user_id, username, links in submissions:
+            self.store_links(user_id, username, links)
+    
+    @abstractmethod
+    def get_user_links(self, user_id: str) -> Optional[Dict]:
+        """Return {"username": ..., "links": [...]} for a user, or None."""
+    
+    @abstractmethod
+    def remove_link(self, user_id: str, link: str) -> bool:
+        """Remove one link from a user, returning False if the user is unknown."""
+    
+    @abstractmethod
+    def clear_user_links(self, user_id: str):
+        """Remove all links of a user."""
+    
+    @abstractmethod
+    def get_all_channels(self) -> List[str]:
+        """Return the global (manually maintained) proxy channel list."""
+    
+    def channels_version(self) -> Optional[Hashable]:
+        """Return a token that changes whenever the global channel list changes.
+        
+        None means the backend cannot tell, so the list is reloaded on every
+        check.
+        """
+        return None
+    
+    @abstractmethod
+    def get_channel_submitters(self, link: str) -> List[str]:
+        """Return the ids of users who submitted a link."""
+    
+    def stored_links(self) -> List[str]:
+        """Return every distinct link at least one user has stored."""
+        return list({link for _, _, link in self.iter_user_links()})
+    
+    def known_links(self, links: List[str]) -> Set[str]:
+        """Return the given links that at least one user has stored."""
+        return {link for link in links if self.get_channel_submitters(link)}
+    
+    @abstractmethod
+    def iter_user_links(self, user_id: Optional[str] = None) -> Iterator[Tuple[str, str, str]]:
+        """Stream (user_id, username, link) rows, for one user or everyone."""
+    
+    @abstractmethod
+    def get_link_statuses(self) -> List[LinkStatus]:
+        """Return the revalidation state of every stored and global link."""
+    
+    @abstractmethod
+    def record_link_verdicts(self, verdicts: Iterable[Verdict]):
+        """Store revalidation verdicts, tracking since when a link has been dead."""
+    
+    def top_channels(self, k: int) -> List[Tuple[str, int]]:
+        """Return up to k (link, submitter count) pairs, most submitted first."""
+        statuses = [status for status in self.get_link_statuses() if status.submitters]
+        statuses.sort(key=lambda status: status.submitters, reverse=True)
+        return [(status.link, status.submitters) for status in statuses[:k]]
+    
+    def get_dead_links(self) -> List[str]:
+        """Return links whose last check found them dead."""
+        return [status.link for status in self.get_link_statuses() if status.alive is False]
+    
+    def prune_link(self, link: str) -> int:
+        """Remove a link from every user who submitted it, returning how many."""
+        submitters = self.get_channel_submitters(link)
+        for user_id in submitters:
+            self.remove_link(user_id, link)
+        return len(submitters)
+    
+    def storage_size_bytes(self) -> Optional[int]:
+        """Return the on-disk size of the stored data, or None if unknown."""
+        return None
+    
+    def close(self):
+        """Flush pending state and release resources."""
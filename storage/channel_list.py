@@ -0,0 +1,72 @@
+"""Memory-resident snapshot of the global channel list."""
+
+import logging
+import time
+from threading import Lock
+from typing import Callable, Hashable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class _Snapshot(NamedTuple):
+    """Channel list together with the source version it was loaded from."""
+    channels: Tuple[str, ...]
+    version: Optional[Hashable]
+
+class ChannelListSnapshot:
+    """Immutable channel list snapshot that reloads only when its source changes.
+    
+    Readers get the current tuple without taking any lock: the snapshot is a
+    single attribute that is swapped atomically on reload. At most once per
+    ``check_interval`` a reader compares the source version (e.g. file
+    mtime/inode) with the loaded one and reloads if it differs.
+    """
+    
+    def __init__(self,
+                 loader: Callable[[], List[str]],
+                 version: Callable[[], Optional[Hashable]],
+                 check_interval: float = 1.0):
+        """Initialize snapshot with a list loader and a source version probe."""
+        self._loader = loader
+        self._version = version
+        self.check_interval = check_interval
+        self._snapshot = _Snapshot((), None)
+        self._next_check = 0.0
+        self._reload_lock = Lock()  # Serializes reloaders only, never readers
+    
+    def get(self) -> Tuple[str, ...]:
+        """Return the current channel list, reloading first if the source changed."""
+        if time.monotonic() >= self._next_check:
+            self._refresh(force=False)
+        return self._snapshot.channels
+    
+    def reload(self) -> Tuple[str, ...]:
+        """Unconditionally reload the channel list from its source."""
+        self._refresh(force=True)
+        return self._snapshot.channels
+    
+    @property
+    def version(self) -> Optional[Hashable]:
+        """Source version of the currently loaded snapshot."""
+        return self._snapshot.version
+    
+    def _refresh(self, force: bool):
+        """Reload when forced or when the source version changed."""
+        if not self._reload_lock.acquire(blocking=force):
+            return  # Another thread is already refreshing; serve the old snapshot
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            version = self._version()
+            if not force and version is not None and version == self._snapshot.version:
+                return
+            
+            try:
+                channels = tuple(self._loader())
+            except Exception as e:
+                # Keep serving the last good list; retry at the next check
+                logger.error(f"Error reloading channel list, keeping previous snapshot: {e}")
+                return
+            
+            self._snapshot = _Snapshot(channels, version)
+            logger.info(f"Loaded {len(channels)} channels into memory")
+        finally:
+            self._reload_lock.release()
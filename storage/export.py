@@ -0,0 +1,100 @@
+"""Streaming export of stored links and their submitters as JSONL or CSV."""
+
+import csv
+import gzip
+import io
+import json
+import logging
+from typing import IO, Iterable, Iterator, Optional, Tuple, Union
+from .base import StorageBackend
+from .storage_manager import StorageManager
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("jsonl", "csv")
+CSV_HEADER = ("link", "user_id", "username")
+# Rendered rows are buffered up to this many characters per write
+CHUNK_SIZE = 64 * 1024
+
+# (user_id, username, link)
+Row = Tuple[str, str, str]
+
+def iter_jsonl(rows: Iterable[Row]) -> Iterator[str]:
+    """Render rows as JSON lines, one string per row."""
+    for user_id, username, link in rows:
+        yield json.dumps(
+            {"link": link, "user_id": user_id, "username": username},
+            ensure_ascii=False,
+            separators=(',', ':')
+        ) + "\n"
+
+def iter_csv(rows: Iterable[Row]) -> Iterator[str]:
+    """Render rows as CSV with a header line, one string per row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    for user_id, username, link in rows:
+        writer.writerow((link, user_id, username))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()  # Header only, if there were no rows
+
+def iter_chunks(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Group small strings into chunks of roughly chunk_size characters."""
+    chunk = []
+    size = 0
+    for piece in pieces:
+        chunk.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield "".join(chunk)
+
+def render(rows: Iterable[Row], fmt: str) -> Iterator[str]:
+    """Render rows in an export format."""
+    if fmt == "jsonl":
+        return iter_jsonl(rows)
+    if fmt == "csv":
+        return iter_csv(rows)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+class _CountingRows:
+    """Iterates rows while counting them."""
+    
+    def __init__(self, rows: Iterable[Row]):
+        self._rows = rows
+        self.count = 0
+    
+    def __iter__(self) -> Iterator[Row]:
+        for row in self._rows:
+            self.count += 1
+            yield row
+
+def write_export(rows: Iterable[Row], out: IO[str], fmt: str) -> int:
+    """Stream rows into a text file object in chunks, returning the row count."""
+    counted = _CountingRows(rows)
+    for chunk in iter_chunks(render(counted, fmt)):
+        out.write(chunk)
+    return counted.count
+
+def export_to_file(storage_manager: Union[StorageManager, StorageBackend],
+                   path: str,
+                   fmt: str = "jsonl",
+                   user_id: Optional[str] = None,
+                   compress: Optional[bool] = None) -> int:
+    """Export stored links to a file, gzip-compressed if compress or path ends in .gz.
+    
+    Only one user's links are exported when user_id is given. The storage
+    can be a backend opened read-only, as the offline export does.
+    """
+    if compress is None:
+        compress = path.endswith(".gz")
+    opener = gzip.open if compress else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as out:
+        count = write_export(storage_manager.iter_user_links(user_id), out, fmt)
+    logger.info(f"Exported {count} links as {fmt} to {path}")
+    return count
@@ -0,0 +1,282 @@
+"""Append-only journal with an in-memory materialized view of user links."""
+
+import json
+import logging
+import os
+import time
+from contextlib import suppress
+from threading import Event, Lock, Thread
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+from .link_index import LinkIndex
+
+logger = logging.getLogger(__name__)
+
+class CorruptStorageError(Exception):
+    """Raised when a storage snapshot cannot be parsed."""
+
+def fsync_directory(path: str):
+    """Flush directory metadata so a completed rename survives a crash."""
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # Not supported on every platform/filesystem
+    finally:
+        os.close(fd)
+
+def atomic_write(path: str, data: str):
+    """Write data to path via fsync + rename so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Don't leave a partial file behind for the next writer to trip over
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    fsync_directory(os.path.dirname(path))
+
+class JournalStore:
+    """Log-structured store for per-user link records.
+    
+    Every change is appended to a journal file and fsynced before it is
+    applied to the in-memory state. A background thread periodically folds
+    the journal into a compact snapshot (written atomically) and truncates
+    the journal. All operations are idempotent, so replaying a journal on top
+    of a snapshot that already contains some of its records is safe.
+    """
+    
+    def __init__(self,
+                 snapshot_path: str,
+                 journal_path: Optional[str] = None,
+                 compact_threshold: int = 1000,
+                 compact_interval: float = 300.0,
+                 read_only: bool = False):
+        """Initialize store paths and compaction policy.
+        
+        A read-only store (e.g. for an export while the bot runs) only reads
+        the files: it keeps no journal handle, never compacts and never
+        truncates a torn record, which may be a write still in progress.
+        """
+        self.snapshot_path = snapshot_path
+        self.read_only = read_only
+        self.journal_path = journal_path or f"{os.path.splitext(snapshot_path)[0]}.journal"
+        self.compact_threshold = compact_threshold
+        self.compact_interval = compact_interval
+        self.state = LinkIndex()
+        self.lock = Lock()
+        self._journal = None
+        self._pending_records = 0
+        self._compact_requested = Event()
+        self._stopped = Event()
+        self._compactor: Optional[Thread] = None
+    
+    def open(self):
+        """Load the snapshot, replay the journal and start background compaction."""
+        directory = os.path.dirname(self.snapshot_path)
+        if directory and not self.read_only:
+            os.makedirs(directory, exist_ok=True)
+        
+        with self.lock:
+            if self.read_only:
+                self._pending_records = self._read_consistently()
+            else:
+                self.state = self._load_snapshot()
+                self._pending_records = self._replay_journal()
+                self._journal = open(self.journal_path, 'ab')
+        
+        logger.info(
+            f"Loaded {len(self.state)} users from storage "
+            f"({self._pending_records} journal records replayed)"
+        )
+        if self.read_only:
+            return
+        
+        self._compactor = Thread(
+            target=self._compaction_loop,
+            name="storage-compactor",
+            daemon=True
+        )
+        self._compactor.start()
+    
+    def close(self):
+        """Stop background compaction and fold the journal into the snapshot."""
+        if self.read_only:
+            return
+        self._stopped.set()
+        self._compact_requested.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        
+        self.compact()
+        with self.lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+    
+    def _load_snapshot(self) -> LinkIndex:
+        """Read the last compacted snapshot into a link index."""
+        if not os.path.exists(self.snapshot_path):
+            return LinkIndex()
+        
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                return LinkIndex.from_snapshot(json.load(f))
+        except json.JSONDecodeError as e:
+            # Snapshots are only ever replaced atomically, so this is real
+            # damage; refuse to start rather than silently dropping the data
+            raise CorruptStorageError(
+                f"Corrupted storage snapshot {self.snapshot_path}: {e}"
+            ) from e
+    
+    def _read_consistently(self) -> int:
+        """Load snapshot and journal while another process may be compacting them.
+        
+        Compaction replaces the snapshot before the journal, so opening the
+        journal first never pairs an old snapshot with a truncated journal;
+        a newer snapshot under an older journal is safe to replay onto.
+        """
+        try:
+            journal = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            self.state = self._load_snapshot()
+            return 0
+        with journal:
+            self.state = self._load_snapshot()
+            replayed, _ = self._replay_records(journal)
+            return replayed
+    
+    def _replay_journal(self) -> int:
+        """Apply journal records on top of the snapshot, returning their count."""
+        if not os.path.exists(self.journal_path):
+            return 0
+        
+        with open(self.journal_path, 'rb') as f:
+            replayed, valid_size = self._replay_records(f)
+        if valid_size != os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_size)
+                os.fsync(f.fileno())
+        return replayed
+    
+    def _replay_records(self, journal: BinaryIO) -> Tuple[int, int]:
+        """Apply the complete records of a journal, returning their count and size."""
+        replayed = 0
+        valid_size = 0
+        for line in journal:
+            if not line.endswith(b"\n"):
+                # Torn write from a crash; the record was never acknowledged
+                logger.warning("Discarding incomplete trailing journal record")
+                break
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.error("Skipping unreadable journal record")
+            else:
+                self._apply(record)
+                replayed += 1
+            valid_size += len(line)
+        return replayed, valid_size
+    
+    def _apply(self, record: Dict):
+        """Apply one journal record to the in-memory state."""
+        op = record["op"]
+        user_id = record["user_id"]
+        
+        if op == "add":
+            self.state.add_links(user_id, record["username"], record["links"])
+        elif op == "remove":
+            self.state.remove_link(user_id, record["link"])
+        elif op == "clear":
+            self.state.clear_user(user_id)
+        else:
+            logger.error(f"Unknown journal operation: {op}")
+    
+    def append(self, records: Iterable[Dict]):
+        """Durably append records to the journal, then apply them in memory."""
+        if self.read_only:
+            raise PermissionError(f"{self.journal_path} was opened read-only")
+        records = list(records)
+        if not records:
+            return
+        
+        payload = "".join(
+            json.dumps(record, separators=(',', ':')) + "\n"
+            for record in records
+        ).encode()
+        with self.lock:
+            self._journal.write(payload)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            for record in records:
+                self._apply(record)
+            self._pending_records += len(records)
+            if self._pending_records >= self.compact_threshold:
+                self._compact_requested.set()
+    
+    def get(self, user_id: str) -> Optional[Dict]:
+        """Return a copy of one user's entry."""
+        with self.lock:
+            return self.state.get_user(user_id)
+    
+    def compact(self):
+        """Write a fresh snapshot and drop the journal records it covers."""
+        with self.lock:
+            if self._journal is None or self._pending_records == 0:
+                return
+            self._journal.flush()
+            covered_size = self._journal.tell()
+            covered_records = self._pending_records
+            data = self.state.dumps()
+        
+        started = time.monotonic()
+        atomic_write(self.snapshot_path, data)
+        
+        with self.lock:
+            # Keep only the records appended while the snapshot was written
+            self._journal.flush()
+            with open(self.journal_path, 'rb') as f:
+                f.seek(covered_size)
+                tail = f.read()
+            tmp_path = f"{self.journal_path}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.journal_path)
+            except BaseException:
+                # The current journal and its handle stay in use
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            # Swap handles only once the new journal is in place
+            previous, self._journal = self._journal, open(self.journal_path, 'ab')
+            previous.close()
+            fsync_directory(os.path.dirname(self.journal_path))
+            self._pending_records -= covered_records
+        
+        logger.info(
+            f"Compacted {covered_records} journal records into snapshot "
+            f"in {time.monotonic() - started:.3f}s"
+        )
+    
+    def _compaction_loop(self):
+        """Compact when enough records pile up or the interval elapses."""
+        while not self._stopped.is_set():
+            self._compact_requested.wait(self.compact_interval)
+            self._compact_requested.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Error compacting storage journal: {e}")
@@ -0,0 +1,232 @@
+"""JSON file storage backend."""
+
+import json
+import logging
+import os
+from threading import Lock
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+from .base import LinkStatus, StorageBackend, Verdict
+from .journal_store import JournalStore, atomic_write
+
+logger = logging.getLogger(__name__)
+
+class JsonStorageBackend(StorageBackend):
+    """Stores user links in a journaled JSON snapshot and reads the global list from JSON."""
+    
+    def __init__(self,
+                 user_storage_path: str = "data/user_links.json",
+                 global_storage_path: str = "data/proxy_channels.json",
+                 link_status_path: Optional[str] = None,
+                 read_only: bool = False):
+        """Initialize backend with separate files for user links and global channel list.
+        
+        Revalidation verdicts live in link_status_path, by default
+        link_status.json next to the user links. read_only opens the files
+        of a possibly running bot for reading only (see JournalStore).
+        """
+        self.user_storage_path = user_storage_path
+        self.global_storage_path = global_storage_path
+        self.link_status_path = link_status_path or os.path.join(
+            os.path.dirname(user_storage_path), "link_status.json"
+        )
+        self.lock = Lock()  # For thread-safe global list reads
+        self.status_lock = Lock()
+        # user_links.json is the compacted snapshot; changes go to a journal
+        self.read_only = read_only
+        self.user_store = JournalStore(user_storage_path, read_only=read_only)
+        self._ensure_storage_exists()
+        self._link_status: Dict[str, Dict] = self._read_link_status()
+    
+    def _ensure_storage_exists(self):
+        """Create storage directory and load user storage."""
+        if not self.read_only:
+            os.makedirs(os.path.dirname(self.user_storage_path), exist_ok=True)
+        self.user_store.open()
+        
+        # Check if global channels file exists
+        if not os.path.exists(self.global_storage_path):
+            logger.warning(f"Global proxy channels file not found at {self.global_storage_path}")
+    
+    def _read_global_storage(self) -> List[str]:
+        """Read the global channel list (manually maintained)."""
+        if not os.path.exists(self.global_storage_path):
+            logger.warning("Global proxy channels file not found")
+            return []
+        
+        with open(self.global_storage_path, 'r') as f:
+            data = json.load(f)
+            return data.get("channels", [])
+    
+    def _read_link_status(self) -> Dict[str, Dict]:
+        """Load revalidation verdicts; they can be rebuilt, so damage is not fatal."""
+        if not os.path.exists(self.link_status_path):
+            return {}
+        
+        try:
+            with open(self.link_status_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error reading link status, starting over: {e}")
+            return {}
+    
+    @staticmethod
+    def _add_record(user_id: str, username: str, links: List[str]) -> Dict:
+        """Build the journal record adding links to a user."""
+        return {
+            "op": "add",
+            "user_id": user_id,
+            "username": username,
+            "links": list(dict.fromkeys(links))
+        }
+    
+    def store_links(self, user_id: str, username: str, links: List[str]):
+        """Append an add record for the user's links."""
+        self.user_store.append([self._add_record(user_id, username, links)])
+    
+    def store_links_batch(self, submissions: List[Tuple[str, str, List[str]]]):
+        """Append all add records with a single write and fsync."""
+        self.user_store.append(
+            self._add_record(user_id, username, links)
+            for user_id, username, links in submissions
+        )
+    
+    def get_user_links(self, user_id: str) -> Optional[Dict]:
+        """Return a copy of the user's entry."""
+        return self.user_store.get(user_id)
+    
+    def remove_link(self, user_id: str, link: str) -> bool:
+        """Append a remove record if the user has the link."""
+        with self.user_store.lock:
+            if user_id not in self.user_store.state:
+                return False
+            has_link = self.user_store.state.has_link(user_id, link)
+        
+        if has_link:
+            self.user_store.append([{
+                "op": "remove",
+                "user_id": user_id,
+                "link": link
+            }])
+        return True
+    
+    def clear_user_links(self, user_id: str):
+        """Append a clear record for a known user."""
+        if self.user_store.get(user_id) is not None:
+            self.user_store.append([{"op": "clear", "user_id": user_id}])
+    
+    def get_all_channels(self) -> List[str]:
+        """Read the global channel list file."""
+        with self.lock:
+            return self._read_global_storage()
+    
+    def channels_version(self) -> Optional[Hashable]:
+        """Identify the global channel file revision by inode, mtime and size."""
+        try:
+            stat = os.stat(self.global_storage_path)
+        except FileNotFoundError:
+            return "missing"
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    def get_channel_submitters(self, link: str) -> List[str]:
+        """Scan every user's link ids for the link's id."""
+        with self.user_store.lock:
+            return self.user_store.state.submitters(link)
+    
+    def stored_links(self) -> List[str]:
+        """Return the index's links that still have a submitter."""
+        with self.user_store.lock:
+            return [link for link, _ in self.user_store.state.link_counts()]
+    
+    def known_links(self, links: List[str]) -> Set[str]:
+        """Look the links up in the index's submitter counts."""
+        with self.user_store.lock:
+            state = self.user_store.state
+            return {link for link in links if state.submitter_count(link)}
+    
+    def iter_user_links(self, user_id: Optional[str] = None) -> Iterator[Tuple[str, str, str]]:
+        """Yield rows user by user, copying one entry at a time under the lock."""
+        if user_id is None:
+            with self.user_store.lock:
+                user_ids = self.user_store.state.user_ids()
+        else:
+            user_ids = [user_id]
+        
+        for current in user_ids:
+            entry = self.user_store.get(current)
+            if entry is None:
+                continue
+            for link in entry["links"]:
+                yield current, entry["username"], link
+    
+    def get_link_statuses(self) -> List[LinkStatus]:
+        """Combine submitter counts from user storage with the stored verdicts."""
+        with self.user_store.lock:
+            submitters = dict(self.user_store.state.link_counts())
+        for link in self.get_all_channels():
+            submitters.setdefault(link, 0)
+        
+        with self.status_lock:
+            status = dict(self._link_status)
+        statuses = []
+        for link, count in submitters.items():
+            entry = status.get(link, {})
+            statuses.append(LinkStatus(
+                link,
+                count,
+                entry.get("checked_at"),
+                entry.get("alive"),
+                entry.get("dead_since")
+            ))
+        return statuses
+    
+    def record_link_verdicts(self, verdicts: Iterable[Verdict]):
+        """Update the verdicts in memory and rewrite the status file atomically."""
+        with self.status_lock:
+            for link, alive, checked_at in verdicts:
+                previous = self._link_status.get(link, {})
+                dead_since = None if alive else (previous.get("dead_since") or checked_at)
+                self._link_status[link] = {
+                    "alive": alive,
+                    "checked_at": checked_at,
+                    "dead_since": dead_since
+                }
+            atomic_write(
+                self.link_status_path,
+                json.dumps(self._link_status, separators=(',', ':'))
+            )
+    
+    def top_channels(self, k: int) -> List[Tuple[str, int]]:
+        """Walk the index's submitter-count buckets from the top."""
+        with self.user_store.lock:
+            return self.user_store.state.top_links(k)
+    
+    def get_dead_links(self) -> List[str]:
+        """Return links whose last verdict was negative."""
+        with self.status_lock:
+            return [
+                link for link, entry in self._link_status.items()
+                if entry["alive"] is False
+            ]
+    
+    def prune_link(self, link: str) -> int:
+        """Append remove records for every submitter with a single fsync."""
+        submitters = self.get_channel_submitters(link)
+        self.user_store.append(
+            {"op": "remove", "user_id": user_id, "link": link}
+            for user_id in submitters
+        )
+        return len(submitters)
+    
+    def storage_size_bytes(self) -> Optional[int]:
+        """Return the combined size of the snapshot, journal, global list and verdicts."""
+        paths = (
+            self.user_store.snapshot_path,
+            self.user_store.journal_path,
+            self.global_storage_path,
+            self.link_status_path
+        )
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+    
+    def close(self):
+        """Flush pending journal records into the snapshot."""
+        self.user_store.close()
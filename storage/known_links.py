@@ -0,0 +1,71 @@
+"""In-memory membership check of links already in storage."""
+
+import hashlib
+import math
+from typing import Iterable, Iterator, Optional
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, rare false positives."""
+    
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """Size the filter for capacity keys at the given false positive rate."""
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, key: str) -> Iterator[int]:
+        """Yield the key's bit positions by double hashing one digest."""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * step) % self.size
+    
+    def add(self, key: str):
+        """Set the key's bits."""
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+class KnownLinks:
+    """Links some user has stored, so new submissions of them need no probe.
+    
+    By default this is a set and answers exactly. For very large collections
+    a Bloom filter takes about 1.2 bytes per link instead, but only says
+    "maybe": callers confirm its positives against storage. Links removed by
+    their last submitter stay known until restart (a Bloom filter cannot
+    forget at all); pruned dead links are dropped from the set.
+    """
+    
+    def __init__(self, bloom_capacity: Optional[int] = None):
+        """Initialize an exact set, or a Bloom filter sized for bloom_capacity links."""
+        self.exact = bloom_capacity is None
+        self._keys = set() if self.exact else BloomFilter(bloom_capacity)
+    
+    @staticmethod
+    def make_key(link: str) -> str:
+        """Build the membership key of a link (Telegram usernames ignore case)."""
+        return link.lower()
+    
+    def __len__(self) -> int:
+        return len(self._keys) if self.exact else self._keys.count
+    
+    def __contains__(self, link: str) -> bool:
+        return self.make_key(link) in self._keys
+    
+    def add(self, links: Iterable[str]):
+        """Remember links as stored."""
+        for link in links:
+            self._keys.add(self.make_key(link))
+    
+    def discard(self, link: str):
+        """Forget a link that is no longer stored anywhere (exact set only)."""
+        if self.exact:
+            self._keys.discard(self.make_key(link))
@@ -0,0 +1,234 @@
+"""Compact in-memory model of user links with interned link ids."""
+
+import json
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+class UserLinks:
+    """One user's username and link ids, in submission order."""
+    
+    # Millions of users should cost a small object each; the ids live in a
+    # dict (ordered, with O(1) membership and removal) rather than a list
+    __slots__ = ("username", "link_ids")
+    
+    def __init__(self, username: str):
+        self.username = username
+        self.link_ids: Dict[int, None] = {}
+
+class LinkIndex:
+    """User links stored as integer ids into a table of interned link strings.
+    
+    Every distinct channel is kept once and referenced by a small integer,
+    so memory grows with the number of unique channels rather than with the
+    number of submissions. Channels are interned by their lowercase username
+    (Telegram usernames ignore case); the first spelling seen is the one
+    returned. Submitter counts are kept per link together with
+    frequency buckets (count -> links) chained from the highest count down,
+    which makes "top k submitted channels" an O(k) walk.
+    
+    Not thread-safe; JournalStore serializes access with its lock.
+    """
+    
+    def __init__(self):
+        """Initialize an empty index."""
+        self._ids: Dict[str, int] = {}
+        self._links: List[str] = []
+        self._counts = array('I')
+        self._users: Dict[str, UserLinks] = {}
+        # count -> ids with exactly that many submitters (dicts keep insertion order)
+        self._buckets: Dict[int, Dict[int, None]] = {}
+        # Non-empty bucket counts form a doubly linked list (0 ends it)
+        self._lower: Dict[int, int] = {}
+        self._higher: Dict[int, int] = {}
+        self._top = 0
+        self._bottom = 0
+    
+    def __len__(self) -> int:
+        """Number of users."""
+        return len(self._users)
+    
+    def __contains__(self, user_id: str) -> bool:
+        """Whether a user is known."""
+        return user_id in self._users
+    
+    @property
+    def unique_links(self) -> int:
+        """Number of distinct links ever interned."""
+        return len(self._links)
+    
+    @staticmethod
+    def link_key(link: str) -> str:
+        """Return the interning key of a link: its lowercase username."""
+        return link.rsplit("/", 1)[-1].lower()
+    
+    def _id_of(self, link: str) -> Optional[int]:
+        """Return the id of a link, or None if it was never interned."""
+        return self._ids.get(self.link_key(link))
+    
+    def _intern(self, link: str) -> int:
+        """Return the id of a link, assigning the next id on first sight."""
+        key = self.link_key(link)
+        link_id = self._ids.get(key)
+        if link_id is None:
+            link_id = len(self._links)
+            self._ids[key] = link_id
+            self._links.append(link)
+            self._counts.append(0)
+        return link_id
+    
+    def _unlink_bucket(self, count: int):
+        """Drop an empty bucket from the chain."""
+        del self._buckets[count]
+        lower = self._lower.pop(count, 0)
+        higher = self._higher.pop(count, 0)
+        if lower:
+            self._higher[lower] = higher
+        else:
+            self._bottom = higher
+        if higher:
+            self._lower[higher] = lower
+        else:
+            self._top = lower
+    
+    def _link_bucket(self, count: int, lower: int, higher: int):
+        """Insert an empty bucket for count between two neighbours (0: none)."""
+        self._buckets[count] = {}
+        self._lower[count] = lower
+        self._higher[count] = higher
+        if lower:
+            self._higher[lower] = count
+        else:
+            self._bottom = count
+        if higher:
+            self._lower[higher] = count
+        else:
+            self._top = count
+    
+    def _move(self, link_id: int, delta: int):
+        """Change a link's submitter count by +1/-1, keeping buckets in order."""
+        old = self._counts[link_id]
+        new = old + delta
+        self._counts[link_id] = new
+        
+        if new and new not in self._buckets:
+            # The new count sits right next to the old one in the chain
+            if delta > 0:
+                lower, higher = old, (self._higher[old] if old else self._bottom)
+            else:
+                lower, higher = self._lower[old], old
+            self._link_bucket(new, lower, higher)
+        if new:
+            self._buckets[new][link_id] = None
+        
+        if old:
+            bucket = self._buckets[old]
+            del bucket[link_id]
+            if not bucket:
+                self._unlink_bucket(old)
+    
+    def add_links(self, user_id: str, username: str, links: Iterable[str]):
+        """Add links to a user, ignoring ones the user already has."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = UserLinks(username)
+        entry.username = username
+        link_ids = entry.link_ids
+        for link in links:
+            link_id = self._intern(link)
+            if link_id not in link_ids:
+                link_ids[link_id] = None
+                self._move(link_id, 1)
+    
+    def remove_link(self, user_id: str, link: str) -> bool:
+        """Remove one link from a user, returning whether it was there."""
+        entry = self._users.get(user_id)
+        link_id = self._id_of(link)
+        if entry is None or link_id is None or link_id not in entry.link_ids:
+            return False
+        del entry.link_ids[link_id]
+        self._move(link_id, -1)
+        return True
+    
+    def clear_user(self, user_id: str):
+        """Remove every link of a user, keeping the user itself."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return
+        for link_id in entry.link_ids:
+            self._move(link_id, -1)
+        entry.link_ids = {}
+    
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        """Return {"username": ..., "links": [...]} for a user, or None."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        links = self._links
+        return {
+            "username": entry.username,
+            "links": [links[link_id] for link_id in entry.link_ids]
+        }
+    
+    def user_ids(self) -> List[str]:
+        """Return all user ids."""
+        return list(self._users)
+    
+    def has_link(self, user_id: str, link: str) -> bool:
+        """Whether a user has submitted a link."""
+        entry = self._users.get(user_id)
+        link_id = self._id_of(link)
+        return entry is not None and link_id is not None and link_id in entry.link_ids
+    
+    def submitter_count(self, link: str) -> int:
+        """Number of users who currently have a link."""
+        link_id = self._id_of(link)
+        return 0 if link_id is None else self._counts[link_id]
+    
+    def submitters(self, link: str) -> List[str]:
+        """Return the ids of users who have a link (a scan over users)."""
+        link_id = self._id_of(link)
+        if link_id is None or not self._counts[link_id]:
+            return []
+        return [
+            user_id for user_id, entry in self._users.items()
+            if link_id in entry.link_ids
+        ]
+    
+    def link_counts(self) -> Iterator[Tuple[str, int]]:
+        """Yield (link, submitter count) for every link with at least one submitter."""
+        for link, count in zip(self._links, self._counts):
+            if count:
+                yield link, count
+    
+    def top_links(self, k: int) -> List[Tuple[str, int]]:
+        """Return up to k (link, submitter count) pairs, most submitted first."""
+        top = []
+        count = self._top
+        while count and len(top) < k:
+            for link_id in self._buckets[count]:
+                top.append((self._links[link_id], count))
+                if len(top) == k:
+                    break
+            count = self._lower.get(count, 0)
+        return top
+    
+    @classmethod
+    def from_snapshot(cls, users: Dict[str, Dict]) -> "LinkIndex":
+        """Build an index from the user_links.json layout."""
+        index = cls()
+        for user_id, entry in users.items():
+            index.add_links(user_id, entry.get("username", ""), entry.get("links", []))
+        return index
+    
+    def iter_snapshot(self) -> Iterator[Tuple[str, Dict]]:
+        """Yield (user_id, entry) pairs in the user_links.json layout."""
+        for user_id in self._users:
+            yield user_id, self.get_user(user_id)
+    
+    def dumps(self) -> str:
+        """Serialize to the compact user_links.json layout, one user at a time."""
+        parts = [
+            f"{json.dumps(user_id)}:{json.dumps(entry, separators=(',', ':'))}"
+            for user_id, entry in self.iter_snapshot()
+        ]
+        return "{" + ",".join(parts) + "}"
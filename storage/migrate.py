@@ -0,0 +1,75 @@
+"""One-shot migration of the JSON storage files into SQLite.
+
+Usage:
+
+    python -m storage.migrate [--user-links data/user_links.json]
+                              [--channels data/proxy_channels.json]
+                              [--db data/bot.db]
+"""
+
+import argparse
+import json
+import logging
+import os
+from typing import Dict
+from .journal_store import JournalStore
+from .sqlite_backend import SQLiteStorageBackend
+
+logger = logging.getLogger(__name__)
+
+def migrate_json_to_sqlite(user_storage_path: str = "data/user_links.json",
+                           global_storage_path: str = "data/proxy_channels.json",
+                           db_path: str = "data/bot.db") -> Dict[str, int]:
+    """Copy users, links and the global channel list into a SQLite database.
+    
+    The migration is idempotent: links already present in the database are
+    left alone, and the global channel list is replaced.
+    """
+    # Load through the journal so records not yet compacted are included;
+    # read-only, so the JSON files are never compacted or rewritten here
+    user_store = JournalStore(user_storage_path, read_only=True)
+    user_store.open()
+    try:
+        users = dict(user_store.state.iter_snapshot())
+        backend = SQLiteStorageBackend(db_path)
+        try:
+            backend.import_users(users)
+            
+            channels = []
+            if os.path.exists(global_storage_path):
+                with open(global_storage_path, 'r') as f:
+                    channels = json.load(f).get("channels", [])
+                backend.set_channels(channels)
+        finally:
+            backend.close()
+    finally:
+        user_store.close()
+    
+    summary = {
+        "users": len(users),
+        "links": sum(len(entry.get("links", [])) for entry in users.values()),
+        "channels": len(channels)
+    }
+    logger.info(f"Migrated {summary} into {db_path}")
+    return summary
+
+def main():
+    """Run the migration from the command line."""
+    parser = argparse.ArgumentParser(description="Migrate JSON storage to SQLite.")
+    parser.add_argument("--user-links", default="data/user_links.json")
+    parser.add_argument("--channels", default="data/proxy_channels.json")
+    parser.add_argument("--db", default="data/bot.db")
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    summary = migrate_json_to_sqlite(args.user_links, args.channels, args.db)
+    print(
+        f"Migrated {summary['users']} users, {summary['links']} links and "
+        f"{summary['channels']} channels into {args.db}"
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,423 @@
+"""Snapshot and change stream replication of user links for a hot standby.
+
+The primary appends every change it stores to a change stream in a shared
+directory and periodically writes a compact snapshot next to it. A standby
+loads the snapshot, tails the stream into its own storage and takes over as
+soon as it can lock the directory, which the primary holds until it exits.
+
+Directory layout:
+    primary.lock        flock held by the primary (contains host and pid)
+    snapshot.json       {"seq": N, "created_at": ..., "users": {...}}
+    changes-<N>.log     JSON lines with seq N+1, N+2, ... (one file per snapshot)
+"""
+
+import fcntl
+import glob
+import json
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set, Tuple
+from monitoring.metrics import REGISTRY
+from .journal_store import atomic_write, fsync_directory
+
+if TYPE_CHECKING:
+    from .storage_manager import StorageManager
+
+logger = logging.getLogger(__name__)
+
+REPLICATION_SEQ = REGISTRY.gauge(
+    "replication_seq", "Last change published (primary) or applied (standby)"
+)
+REPLICATION_PRIMARY = REGISTRY.gauge(
+    "replication_primary", "1 while this instance is the replication primary"
+)
+REPLICATION_RESYNCS = REGISTRY.counter(
+    "replication_resyncs", "Standby storage reloads from a replication snapshot"
+)
+
+class ReplicationError(Exception):
+    """Raised when the change stream cannot be followed from the current position."""
+
+@dataclass
+class ReplicationConfig:
+    """Shared directory and timing of storage replication."""
+    directory: str
+    # A snapshot is written after this many changes or this many seconds
+    snapshot_records: int = 10000
+    snapshot_interval: float = 600.0
+    # How often a standby reads new changes and tries to take over
+    poll_interval: float = 0.5
+    # Flushed changes are visible to standbys on the same host at once;
+    # fsync makes them survive a crash of the host as well
+    fsync: bool = False
+
+def _trim_incomplete_record(path: str):
+    """Cut a torn trailing record (left by a crashed primary) off a change file."""
+    try:
+        with open(path, 'r+b') as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+    except FileNotFoundError:
+        pass
+
+class Replicator:
+    """Publishes a storage manager's changes as primary, or follows them as standby.
+    
+    Every instance starts as a standby: it catches up from the directory and
+    promotes itself once it holds the primary lock, so a restarted primary
+    never serves data older than what its successor stored. Changes are the
+    idempotent storage operations themselves, so a snapshot taken while
+    writes continue becomes exact by replaying the changes after its seq.
+    """
+    
+    SNAPSHOT_FILE = "snapshot.json"
+    LOCK_FILE = "primary.lock"
+    
+    def __init__(self, config: ReplicationConfig, manager: "StorageManager"):
+        """Initialize replication of manager's storage through config.directory."""
+        self.config = config
+        self.manager = manager
+        self.snapshot_path = os.path.join(config.directory, self.SNAPSHOT_FILE)
+        self.lock_path = os.path.join(config.directory, self.LOCK_FILE)
+        # Last change applied or published; None until synced with a snapshot
+        self.position: Optional[int] = None
+        self.promoted = Event()
+        self._lock_fd: Optional[int] = None
+        self._write_lock = Lock()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+        # Primary: the change file being written and snapshot bookkeeping
+        self._segment = None
+        self._segment_base: Optional[int] = None
+        self._snapshot_seq: Optional[int] = None
+        self._unsnapshotted = 0
+        self._snapshot_requested = Event()
+        # Held for a whole snapshot so the thread and explicit calls take turns
+        self._snapshot_lock = Lock()
+        # Standby: the change file being read and its unfinished last line
+        self._reader = None
+        self._reader_base: Optional[int] = None
+        self._partial = b""
+    
+    @property
+    def is_primary(self) -> bool:
+        """Whether this instance holds the primary role."""
+        return self.promoted.is_set()
+    
+    def start(self):
+        """Follow the stream, and later serve as primary, on a background thread."""
+        os.makedirs(self.config.directory, exist_ok=True)
+        self._thread = Thread(target=self._run, name="storage-replication", daemon=True)
+        self._thread.start()
+    
+    def wait_until_primary(self, timeout: Optional[float] = None) -> bool:
+        """Block until this instance is primary, returning False on timeout."""
+        return self.promoted.wait(timeout)
+    
+    def close(self):
+        """Stop replicating and release the primary lock so a standby takes over."""
+        self._stopped.set()
+        self._snapshot_requested.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        
+        with self._write_lock:
+            self.promoted.clear()
+            self._close_reader()
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)  # Releases the flock
+                self._lock_fd = None
+        REPLICATION_PRIMARY.set(0)
+    
+    def _run(self):
+        """Follow the primary until this instance can take over, then write snapshots."""
+        logger.info(f"Following storage changes in {self.config.directory}")
+        while not self._stopped.is_set():
+            self._follow()
+            if self._try_lock():
+                try:
+                    # The old primary is gone; whatever it wrote is complete
+                    self._follow()
+                    self._promote()
+                    break
+                except Exception as e:
+                    logger.error(f"Error taking over as replication primary: {e}")
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+            self._stopped.wait(self.config.poll_interval)
+        
+        while self.is_primary and not self._stopped.is_set():
+            self._snapshot_requested.wait(self.config.snapshot_interval)
+            self._snapshot_requested.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.error(f"Error writing replication snapshot: {e}")
+    
+    def _try_lock(self) -> bool:
+        """Take the primary lock if no live process holds it."""
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{socket.gethostname()} {os.getpid()}\n".encode())
+        self._lock_fd = fd
+        return True
+    
+    def _promote(self):
+        """Become primary, continuing the stream where the old primary stopped."""
+        self._close_reader()
+        if self.position is None and not self._resync():
+            # Nothing replicated yet: this instance's storage starts the stream
+            self.position = 0
+        with self._write_lock:
+            self._open_segment(self.position)
+            self.promoted.set()
+        REPLICATION_PRIMARY.set(1)
+        REPLICATION_SEQ.set(self.position)
+        logger.info(f"Promoted to replication primary at change {self.position}")
+        if self._snapshot_seq is None:
+            self.snapshot()
+    
+    def _segment_path(self, base: int) -> str:
+        """Path of the change file following the snapshot at seq base."""
+        return os.path.join(self.config.directory, f"changes-{base:012d}.log")
+    
+    def _segments(self) -> List[Tuple[int, str]]:
+        """Return (base, path) of every change file, oldest first."""
+        segments = []
+        for path in glob.glob(os.path.join(self.config.directory, "changes-*.log")):
+            try:
+                base = int(os.path.basename(path)[len("changes-"):-len(".log")])
+            except ValueError:
+                continue
+            segments.append((base, path))
+        return sorted(segments)
+    
+    def _open_segment(self, base: int):
+        """Switch appends to the change file starting after seq base."""
+        if self._segment is not None:
+            self._segment.close()
+        path = self._segment_path(base)
+        _trim_incomplete_record(path)
+        self._segment = open(path, 'ab')
+        self._segment_base = base
+        fsync_directory(self.config.directory)
+    
+    @contextmanager
+    def publishing(self, records: List[Dict]) -> Iterator[None]:
+        """Publish records once the block has applied them to local storage.
+        
+        Holding one lock across both keeps the stream in the order the
+        changes were applied. Nothing is published by a standby or when the
+        block raises.
+        """
+        with self._write_lock:
+            yield
+            if self.is_primary and self._segment is not None:
+                self._append(records)
+    
+    def _append(self, records: List[Dict]):
+        """Number records and append them to the change file (write lock held)."""
+        lines = []
+        for record in records:
+            self.position += 1
+            lines.append(json.dumps({"seq": self.position, **record}, separators=(',', ':')))
+        try:
+            self._segment.write(("\n".join(lines) + "\n").encode())
+            self._segment.flush()
+            if self.config.fsync:
+                os.fsync(self._segment.fileno())
+        except OSError as e:
+            # Standbys see the gap and resync from the next snapshot
+            logger.error(f"Error publishing {len(records)} storage changes: {e}")
+            self._snapshot_requested.set()
+            return
+        REPLICATION_SEQ.set(self.position)
+        self._unsnapshotted += len(records)
+        if self._unsnapshotted >= self.config.snapshot_records:
+            self._snapshot_requested.set()
+    
+    def snapshot(self):
+        """Write a snapshot of local storage and start a new change file."""
+        with self._snapshot_lock:
+            with self._write_lock:
+                if not self.is_primary or self.position == self._snapshot_seq:
+                    return
+                base = self.position
+                if base != self._segment_base:
+                    self._open_segment(base)
+                self._unsnapshotted = 0
+                self._snapshot_requested.clear()
+            
+            started = time.monotonic()
+            users: Dict[str, Dict] = {}
+            for user_id, username, link in self.manager.backend.iter_user_links():
+                entry = users.setdefault(user_id, {"username": username, "links": []})
+                entry["links"].append(link)
+            atomic_write(self.snapshot_path, json.dumps(
+                {"seq": base, "created_at": time.time(), "users": users},
+                separators=(',', ':')
+            ))
+            # Change files before the previous snapshot are covered twice over;
+            # the rest stay so a lagging standby can finish without a resync
+            previous, self._snapshot_seq = self._snapshot_seq, base
+            for segment_base, path in self._segments():
+                if previous is not None and segment_base < previous:
+                    os.remove(path)
+            logger.info(
+                f"Wrote replication snapshot at change {base} ({len(users)} users) "
+                f"in {time.monotonic() - started:.3f}s"
+            )
+    
+    def _follow(self):
+        """Catch up with the stream, resyncing from the snapshot after an error."""
+        try:
+            applied = self._catch_up()
+        except ReplicationError as e:
+            logger.warning(f"Storage changes lost, resyncing: {e}")
+            self._close_reader()
+            self.position = None
+            return
+        except Exception as e:
+            logger.error(f"Error following storage changes, resyncing: {e}")
+            self._close_reader()
+            self.position = None
+            return
+        if applied:
+            logger.debug(f"Applied {applied} storage changes (now at {self.position})")
+    
+    def _catch_up(self) -> int:
+        """Apply every complete change written so far, returning how many."""
+        if self.position is None and not self._resync():
+            return 0
+        
+        applied = 0
+        while True:
+            if self._reader is None:
+                path = self._segment_path(self.position)
+                if not os.path.exists(path):
+                    if any(base > self.position for base, _ in self._segments()):
+                        raise ReplicationError(f"Changes after {self.position} were removed")
+                    return applied
+                self._reader = open(path, 'rb')
+                self._reader_base = self.position
+                self._partial = b""
+            
+            applied += self._read_changes()
+            if not any(base > self._reader_base for base, _ in self._segments()):
+                return applied
+            # The primary has moved to a newer file, so this one is final
+            applied += self._read_changes()
+            if self._partial:
+                logger.warning("Discarding incomplete trailing storage change")
+            self._close_reader()
+    
+    def _read_changes(self) -> int:
+        """Apply the complete records appended to the current file since the last read."""
+        data = self._reader.read()
+        if not data:
+            return 0
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        
+        applied = 0
+        for line in lines:
+            if not line:
+                continue
+            record = json.loads(line)
+            seq = record["seq"]
+            if seq <= self.position:
+                continue
+            if seq != self.position + 1:
+                raise ReplicationError(f"Changes {self.position + 1}-{seq - 1} are missing")
+            self._apply(record)
+            self.position = seq
+            applied += 1
+        REPLICATION_SEQ.set(self.position)
+        return applied
+    
+    def _apply(self, record: Dict):
+        """Apply one change to local storage."""
+        backend = self.manager.backend
+        op = record["op"]
+        if op == "add":
+            submissions = [tuple(submission) for submission in record["submissions"]]
+            backend.store_links_batch(submissions)
+            for _, _, links in submissions:
+                self.manager.known_links.add(links)
+        elif op == "remove":
+            backend.remove_link(record["user_id"], record["link"])
+        elif op == "clear":
+            backend.clear_user_links(record["user_id"])
+        elif op == "prune":
+            backend.prune_link(record["link"])
+            self.manager.known_links.discard(record["link"])
+        else:
+            logger.error(f"Unknown storage change: {op}")
+    
+    def _resync(self) -> bool:
+        """Make local storage match the latest snapshot; False if there is none yet."""
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return False
+        self._close_reader()
+        
+        backend = self.manager.backend
+        local: Dict[str, Set[str]] = {}
+        for user_id, _, link in backend.iter_user_links():
+            local.setdefault(user_id, set()).add(link)
+        
+        users = snapshot["users"]
+        for user_id in local.keys() - users.keys():
+            backend.clear_user_links(user_id)
+        removed = 0
+        additions = []
+        for user_id, entry in users.items():
+            stored = local.get(user_id, set())
+            for link in stored.difference(entry["links"]):
+                backend.remove_link(user_id, link)
+                removed += 1
+            missing = [link for link in entry["links"] if link not in stored]
+            if missing:
+                additions.append((user_id, entry["username"], missing))
+        if additions:
+            backend.store_links_batch(additions)
+            for _, _, links in additions:
+                self.manager.known_links.add(links)
+        
+        self.position = self._snapshot_seq = snapshot["seq"]
+        REPLICATION_RESYNCS.inc()
+        REPLICATION_SEQ.set(self.position)
+        logger.info(
+            f"Synced storage with replication snapshot at change {self.position}: "
+            f"{sum(len(links) for _, _, links in additions)} links added, {removed} removed, "
+            f"{len(local.keys() - users.keys())} users cleared"
+        )
+        return True
+    
+    def _close_reader(self):
+        """Stop reading the current change file."""
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+            self._reader_base = None
+        self._partial = b""
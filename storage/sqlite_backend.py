@@ -0,0 +1,417 @@
+"""SQLite storage backend."""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+from .base import LinkStatus, StorageBackend, Verdict
+
+logger = logging.getLogger(__name__)
+
+# Telegram usernames ignore case, so urls compare (and are unique) without it
+LINKS_TABLE = """
+CREATE TABLE IF NOT EXISTS {} (
+    link_id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    checked_at REAL,
+    alive INTEGER,
+    dead_since REAL
+);
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    username TEXT NOT NULL DEFAULT ''
+);""" + LINKS_TABLE.format("links") + """CREATE TABLE IF NOT EXISTS user_links (
+    user_id TEXT NOT NULL REFERENCES users(user_id),
+    link_id INTEGER NOT NULL REFERENCES links(link_id),
+    added_at REAL NOT NULL,
+    PRIMARY KEY (user_id, link_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_links_link ON user_links(link_id);
+CREATE TABLE IF NOT EXISTS channels (
+    link_id INTEGER PRIMARY KEY REFERENCES links(link_id),
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('channels_version', 0);
+"""
+
+# Columns added after the first release, created on databases that predate them
+ADDED_COLUMNS = {
+    "links": [("checked_at", "REAL"), ("alive", "INTEGER"), ("dead_since", "REAL")]
+}
+
+class SQLiteStorageBackend(StorageBackend):
+    """Stores users, links and the global channel list in a WAL-mode SQLite database."""
+    
+    def __init__(self, db_path: str = "data/bot.db", read_only: bool = False):
+        """Initialize backend and create the schema if needed.
+        
+        read_only opens an existing database for reading only, leaving its
+        schema alone (e.g. for an export while the bot runs).
+        """
+        self.db_path = db_path
+        self.read_only = read_only
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        if read_only:
+            self._connection()
+            return
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._add_missing_columns(conn)
+        self._make_urls_case_insensitive(conn)
+    
+    @staticmethod
+    def _add_missing_columns(conn: sqlite3.Connection):
+        """Upgrade tables created by older versions of the schema."""
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for name, column_type in columns:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
+    @staticmethod
+    def _make_urls_case_insensitive(conn: sqlite3.Connection):
+        """Rebuild a links table whose urls still compare case-sensitively.
+        
+        Rows differing only in case are merged into the oldest one, which
+        takes over their submitters and channel list entries; their
+        verdicts are dropped and come back with the next revalidation.
+        """
+        (sql,) = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'links'"
+        ).fetchone()
+        if "COLLATE NOCASE" in sql.upper():
+            return
+        
+        logger.info("Rebuilding the links table to compare urls case-insensitively")
+        # The table is replaced under its foreign keys, which SQLite only
+        # allows with enforcement off (and that cannot change inside a transaction)
+        conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "CREATE TEMP TABLE link_merge "
+                    "(link_id INTEGER PRIMARY KEY, keep_id INTEGER NOT NULL)"
+                )
+                conn.execute(
+                    "INSERT INTO link_merge SELECT link_id, keep_id FROM ("
+                    "SELECT link_id, MIN(link_id) OVER (PARTITION BY url COLLATE NOCASE) "
+                    "AS keep_id FROM links) WHERE link_id != keep_id"
+                )
+                for table in ("user_links", "channels"):
+                    # Rows the kept link already has are left behind and deleted
+                    conn.execute(
+                        f"UPDATE OR IGNORE {table} SET link_id = (SELECT keep_id "
+                        f"FROM link_merge m WHERE m.link_id = {table}.link_id) "
+                        "WHERE link_id IN (SELECT link_id FROM link_merge)"
+                    )
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE link_id IN (SELECT link_id FROM link_merge)"
+                    )
+                conn.execute("DELETE FROM links WHERE link_id IN (SELECT link_id FROM link_merge)")
+                conn.execute("DROP TABLE link_merge")
+                conn.execute(LINKS_TABLE.format("links_nocase"))
+                conn.execute(
+                    "INSERT INTO links_nocase (link_id, url, checked_at, alive, dead_since) "
+                    "SELECT link_id, url, checked_at, alive, dead_since FROM links"
+                )
+                conn.execute("DROP TABLE links")
+                conn.execute("ALTER TABLE links_nocase RENAME TO links")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; writes open explicit IMMEDIATE transactions
+            database = self.db_path
+            if self.read_only:
+                database = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+            conn = sqlite3.connect(
+                database,
+                isolation_level=None,
+                timeout=10,
+                check_same_thread=False,  # Only closed from another thread
+                uri=self.read_only
+            )
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def _write(self, statements):
+        """Run a callable inside a single write transaction."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+    
+    @staticmethod
+    def _insert_links(conn: sqlite3.Connection, links: List[str]):
+        """Make sure every link has a row in the links table."""
+        conn.executemany(
+            "INSERT OR IGNORE INTO links (url) VALUES (?)",
+            ((link,) for link in links)
+        )
+    
+    @classmethod
+    def _store_links(cls, conn: sqlite3.Connection, user_id: str,
+                     username: str, links: List[str]):
+        """Insert a user and their links; duplicates hit the primary key and are ignored."""
+        conn.execute(
+            "INSERT INTO users (user_id, username) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET username = excluded.username",
+            (user_id, username)
+        )
+        cls._insert_links(conn, links)
+        now = time.time()
+        conn.executemany(
+            "INSERT OR IGNORE INTO user_links (user_id, link_id, added_at) "
+            "SELECT ?, link_id, ? FROM links WHERE url = ?",
+            ((user_id, now, link) for link in links)
+        )
+    
+    def store_links(self, user_id: str, username: str, links: List[str]):
+        """Add links to a user's collection in one transaction."""
+        self._write(lambda conn: self._store_links(conn, user_id, username, links))
+    
+    def store_links_batch(self, submissions: List[Tuple[str, str, List[str]]]):
+        """Store all submissions in one transaction."""
+        def insert(conn):
+            for user_id, username, links in submissions:
+                self._store_links(conn, user_id, username, links)
+        
+        self._write(insert)
+    
+    def get_user_links(self, user_id: str) -> Optional[Dict]:
+        """Return the user's username and links via the primary-key index."""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT username FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        links = conn.execute(
+            "SELECT l.url FROM user_links ul JOIN links l USING (link_id) "
+            "WHERE ul.user_id = ? ORDER BY ul.added_at, l.link_id",
+            (user_id,)
+        ).fetchall()
+        return {"username": row[0], "links": [url for (url,) in links]}
+    
+    def remove_link(self, user_id: str, link: str) -> bool:
+        """Delete one user/link association."""
+        def remove(conn):
+            if conn.execute(
+                "SELECT 1 FROM users WHERE user_id = ?", (user_id,)
+            ).fetchone() is None:
+                return False
+            conn.execute(
+                "DELETE FROM user_links WHERE user_id = ? AND link_id = "
+                "(SELECT link_id FROM links WHERE url = ?)",
+                (user_id, link)
+            )
+            return True
+        
+        return self._write(remove)
+    
+    def clear_user_links(self, user_id: str):
+        """Delete all of a user's link associations."""
+        self._write(lambda conn: conn.execute(
+            "DELETE FROM user_links WHERE user_id = ?", (user_id,)
+        ))
+    
+    def get_all_channels(self) -> List[str]:
+        """Return the global channel list in its configured order."""
+        rows = self._connection().execute(
+            "SELECT l.url FROM channels c JOIN links l USING (link_id) "
+            "ORDER BY c.position"
+        ).fetchall()
+        return [url for (url,) in rows]
+    
+    def set_channels(self, channels: List[str]):
+        """Replace the global channel list."""
+        def replace(conn):
+            conn.execute("DELETE FROM channels")
+            self._insert_links(conn, channels)
+            conn.executemany(
+                "INSERT OR IGNORE INTO channels (link_id, position) "
+                "SELECT link_id, ? FROM links WHERE url = ?",
+                ((position, link) for position, link in enumerate(channels))
+            )
+            conn.execute(
+                "UPDATE meta SET value = value + 1 WHERE key = 'channels_version'"
+            )
+        
+        self._write(replace)
+    
+    def channels_version(self) -> Optional[Hashable]:
+        """Return the counter bumped by every set_channels call."""
+        row = self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'channels_version'"
+        ).fetchone()
+        return row[0] if row else None
+    
+    def get_channel_submitters(self, link: str) -> List[str]:
+        """Return submitters of a link via the user_links(link_id) index."""
+        rows = self._connection().execute(
+            "SELECT ul.user_id FROM user_links ul JOIN links l USING (link_id) "
+            "WHERE l.url = ?",
+            (link,)
+        ).fetchall()
+        return [user_id for (user_id,) in rows]
+    
+    def top_channels(self, k: int) -> List[Tuple[str, int]]:
+        """Count submitters per link in SQL and keep the k largest."""
+        rows = self._connection().execute(
+            "SELECT l.url, COUNT(*) AS submitters FROM user_links ul "
+            "JOIN links l USING (link_id) GROUP BY ul.link_id "
+            "ORDER BY submitters DESC LIMIT ?",
+            (k,)
+        ).fetchall()
+        return [(url, submitters) for url, submitters in rows]
+    
+    def stored_links(self) -> List[str]:
+        """Return links that have a row in user_links."""
+        rows = self._connection().execute(
+            "SELECT url FROM links l WHERE EXISTS "
+            "(SELECT 1 FROM user_links ul WHERE ul.link_id = l.link_id)"
+        ).fetchall()
+        return [url for (url,) in rows]
+    
+    def known_links(self, links: List[str]) -> Set[str]:
+        """Look the links up by url, a few hundred per query."""
+        conn = self._connection()
+        known = set()
+        for start in range(0, len(links), 500):
+            chunk = links[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT url FROM links l WHERE url IN ({placeholders}) AND EXISTS "
+                "(SELECT 1 FROM user_links ul WHERE ul.link_id = l.link_id)",
+                chunk
+            ).fetchall()
+            # Matched case-insensitively; answer in the caller's spelling
+            stored = {url.lower() for (url,) in rows}
+            known.update(link for link in chunk if link.lower() in stored)
+        return known
+    
+    def iter_user_links(self, user_id: Optional[str] = None) -> Iterator[Tuple[str, str, str]]:
+        """Stream rows from a cursor in batches instead of fetching them all."""
+        query = (
+            "SELECT ul.user_id, u.username, l.url FROM user_links ul "
+            "JOIN users u USING (user_id) JOIN links l USING (link_id)"
+        )
+        if user_id is None:
+            cursor = self._connection().execute(f"{query} ORDER BY ul.user_id, ul.added_at")
+        else:
+            cursor = self._connection().execute(
+                f"{query} WHERE ul.user_id = ? ORDER BY ul.added_at", (user_id,)
+            )
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            yield from rows
+    
+    def get_link_statuses(self) -> List[LinkStatus]:
+        """Return every submitted or channel link with its submitter count and last verdict.
+        
+        Rows of links nobody submits any more (pruned, removed) stay in the
+        links table for their ids and verdicts but are left out, as in JSON storage.
+        """
+        rows = self._connection().execute(
+            "SELECT l.url, COUNT(ul.user_id), l.checked_at, l.alive, l.dead_since "
+            "FROM links l LEFT JOIN user_links ul USING (link_id) "
+            "GROUP BY l.link_id "
+            "HAVING COUNT(ul.user_id) > 0 OR l.link_id IN (SELECT link_id FROM channels)"
+        ).fetchall()
+        return [
+            LinkStatus(url, count, checked_at, None if alive is None else bool(alive), dead_since)
+            for url, count, checked_at, alive, dead_since in rows
+        ]
+    
+    def record_link_verdicts(self, verdicts: Iterable[Verdict]):
+        """Store verdicts in one transaction, keeping the start of a dead streak."""
+        verdicts = list(verdicts)
+        
+        def update(conn):
+            self._insert_links(conn, [link for link, _, _ in verdicts])
+            conn.executemany(
+                "UPDATE links SET checked_at = ?, alive = ?, dead_since = "
+                "CASE WHEN ? THEN NULL ELSE COALESCE(dead_since, ?) END "
+                "WHERE url = ?",
+                (
+                    (checked_at, int(alive), int(alive), checked_at, link)
+                    for link, alive, checked_at in verdicts
+                )
+            )
+        
+        self._write(update)
+    
+    def get_dead_links(self) -> List[str]:
+        """Return links whose last verdict was negative."""
+        rows = self._connection().execute(
+            "SELECT url FROM links WHERE alive = 0"
+        ).fetchall()
+        return [url for (url,) in rows]
+    
+    def prune_link(self, link: str) -> int:
+        """Delete every user association of a link in one statement."""
+        return self._write(lambda conn: conn.execute(
+            "DELETE FROM user_links WHERE link_id = "
+            "(SELECT link_id FROM links WHERE url = ?)",
+            (link,)
+        ).rowcount)
+    
+    def storage_size_bytes(self) -> Optional[int]:
+        """Return the size of the database file plus its write-ahead log."""
+        paths = (self.db_path, f"{self.db_path}-wal")
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+    
+    def import_users(self, users: Dict[str, Dict]):
+        """Bulk insert users in the user_links.json layout in one transaction."""
+        def insert(conn):
+            for user_id, entry in users.items():
+                self._store_links(
+                    conn, user_id, entry.get("username", ""), entry.get("links", [])
+                )
+        
+        self._write(insert)
+    
+    def close(self):
+        """Close every connection opened by this backend."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
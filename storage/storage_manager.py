@@ -1,148 +1,451 @@
 """Storage manager for handling link storage operations."""
 
-import json
+import asyncio
 import logging
-import os
-from typing import List, Dict, Optional, Set
-from threading import Lock
+import time
+from contextlib import nullcontext
+from threading import Event, RLock, Thread
+from typing import Awaitable, Callable, FrozenSet, Hashable, Iterator, List, Dict, Optional, Set, Tuple, Union
+from coordination.base import CoordinationBackend, CoordinationError
+from monitoring.metrics import REGISTRY
+from utils.startup import STARTUP
+from .base import LinkStatus, StorageBackend, Verdict
+from .channel_list import ChannelListSnapshot
+from .json_backend import JsonStorageBackend
+from .known_links import KnownLinks
+from .replication import ReplicationConfig, Replicator
+from .sqlite_backend import SQLiteStorageBackend
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
+WRITE_SECONDS = REGISTRY.histogram(
+    "storage_write_seconds", "Duration of durable link writes", ("operation",)
+)
+STORE_LINKS_SECONDS = WRITE_SECONDS.labels("store_links")
+STORE_BATCH_SECONDS = WRITE_SECONDS.labels("store_links_batch")
+WRITE_ERRORS = REGISTRY.counter("storage_write_errors", "Failed link writes")
+STORAGE_SIZE = REGISTRY.gauge("storage_size_bytes", "On-disk size of the link storage")
+KNOWN_LINK_CHECKS = REGISTRY.counter(
+    "known_link_checks", "Submitted links checked against stored ones before probing",
+    ("result",)
+)
+KNOWN_LINK_HITS = KNOWN_LINK_CHECKS.labels("known")
+KNOWN_LINK_MISSES = KNOWN_LINK_CHECKS.labels("new")
+
+# Bumped by any worker whose revalidation changed the set of dead links
+DEAD_LINKS_VERSION_KEY = "storage:dead_links_version"
+
 class StorageManager:
-    """Manages JSON-based storage for Telegram proxy channels."""
+    """Manages storage for Telegram proxy channels through a pluggable backend."""
     
     def __init__(self, 
                  user_storage_path: str = "data/user_links.json",
-                 global_storage_path: str = "data/proxy_channels.json"):
-        """Initialize storage manager with separate files for user links and global channel list."""
+                 global_storage_path: str = "data/proxy_channels.json",
+                 backend: Union[str, StorageBackend] = "json",
+                 db_path: str = "data/bot.db",
+                 coordination: Optional[CoordinationBackend] = None,
+                 lazy: bool = False,
+                 bloom_capacity: Optional[int] = None,
+                 replication: Optional[ReplicationConfig] = None,
+                 dead_links_poll_interval: float = 2.0,
+                 dead_links_max_retry: float = 30.0):
+        """Initialize storage manager with a backend instance or name ("json" or "sqlite").
+        
+        With a coordination backend, dead links found by another worker's
+        revalidation are hidden here too (the storage itself must be shared,
+        e.g. one SQLite database); a thread checks for them every
+        dead_links_poll_interval seconds, backing off up to
+        dead_links_max_retry while the backend is down. With lazy, storage files are read by
+        start_warm_up() or on first use instead of here. bloom_capacity
+        tracks known links in a Bloom filter instead of a set (see KnownLinks).
+        With replication, changes are published to (or, on a standby,
+        followed from) a shared directory once warmed up (see Replicator).
+        """
+        if not isinstance(backend, StorageBackend) and backend not in ("json", "sqlite"):
+            raise ValueError(f"Unknown storage backend: {backend}")
+        self._backend: Optional[StorageBackend] = (
+            backend if isinstance(backend, StorageBackend) else None
+        )
+        self._backend_name = backend
         self.user_storage_path = user_storage_path
         self.global_storage_path = global_storage_path
-        self.lock = Lock()  # For thread-safe file operations
-        self._ensure_storage_exists()
-    
-    def _ensure_storage_exists(self):
-        """Create storage files and directory if they don't exist."""
-        os.makedirs(os.path.dirname(self.user_storage_path), exist_ok=True)
+        self.db_path = db_path
+        self._warm = False
+        self._warm_up_lock = RLock()
         
-        # Initialize user storage if it doesn't exist
-        if not os.path.exists(self.user_storage_path):
-            with open(self.user_storage_path, 'w') as f:
-                json.dump({}, f)
+        self.coordination = coordination
+        # Channels found dead by revalidation are hidden from the list
+        self._dead_links = frozenset()
+        self._dead_links_version = 0
+        self._shared_dead_links_version: Optional[str] = None
+        self.dead_links_poll_interval = dead_links_poll_interval
+        self.dead_links_max_retry = dead_links_max_retry
+        self._dead_links_poller: Optional[Thread] = None
+        self._closed = Event()
+        # Links stored so far, to skip probing resubmissions; filled by warm_up
+        self.known_links = KnownLinks(bloom_capacity)
+        self._listed_channels: Tuple[str, ...] = ()
+        self._listed_keys: FrozenSet[str] = frozenset()
+        self.replicator = Replicator(replication, self) if replication else None
         
-        # Check if global channels file exists
-        if not os.path.exists(self.global_storage_path):
-            logger.warning(f"Global proxy channels file not found at {self.global_storage_path}")
+        # Served from memory; reloaded only when the backend reports a change
+        self.channel_list = ChannelListSnapshot(
+            self._load_visible_channels,
+            self._channels_version
+        )
+        STORAGE_SIZE.callback = self._storage_size_bytes
+        if not lazy:
+            self.warm_up()
     
-    def _read_user_storage(self) -> Dict:
-        """Read the user storage content."""
-        try:
-            with open(self.user_storage_path, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.error("Corrupted user storage file, resetting to empty state")
-            return {}
-        except Exception as e:
-            logger.error(f"Error reading user storage: {e}")
-            return {}
+    @property
+    def backend(self) -> StorageBackend:
+        """The storage backend, opened first if warm-up has not done so yet."""
+        if self._backend is None:
+            self.warm_up()
+        return self._backend
+    
+    def _open_backend(self) -> StorageBackend:
+        """Create the named backend, reading its files."""
+        if self._backend_name == "json":
+            return JsonStorageBackend(self.user_storage_path, self.global_storage_path)
+        return SQLiteStorageBackend(self.db_path)
+    
+    def warm_up(self):
+        """Open the backend and load dead links and the channel list, once."""
+        with self._warm_up_lock:
+            if self._warm:
+                return
+            with STARTUP.phase("storage warm-up"):
+                if self._backend is None:
+                    self._backend = self._open_backend()
+                self._reload_dead_links()
+                self.channel_list.reload()
+                self._load_known_links()
+            self._warm = True
+            if self.replicator is not None:
+                self.replicator.start()
+            if self.coordination is not None:
+                self._dead_links_poller = Thread(
+                    target=self._poll_shared_dead_links, name="dead-links-poll", daemon=True
+                )
+                self._dead_links_poller.start()
     
-    def _read_global_storage(self) -> List[str]:
-        """Read the global channel list (manually maintained)."""
+    async def wait_until_warm(self):
+        """Wait for warm-up on a thread, so a fast start never blocks the event loop."""
+        if not self._warm:
+            await asyncio.to_thread(self.warm_up)
+    
+    def start_warm_up(self) -> Thread:
+        """Warm up on a background thread; calls needing storage wait for it."""
+        thread = Thread(target=self._warm_up_in_background, name="storage-warm-up", daemon=True)
+        thread.start()
+        return thread
+    
+    def _warm_up_in_background(self):
+        """Warm up, logging instead of raising."""
+        started = time.monotonic()
         try:
-            if not os.path.exists(self.global_storage_path):
-                logger.warning("Global proxy channels file not found")
-                return []
-                
-            with open(self.global_storage_path, 'r') as f:
-                data = json.load(f)
-                return data.get("channels", [])
-        except json.JSONDecodeError:
-            logger.error("Corrupted global storage file")
-            return []
+            self.warm_up()
         except Exception as e:
-            logger.error(f"Error reading global storage: {e}")
-            return []
+            logger.error(f"Error warming up storage: {e}")
+            return
+        logger.info(f"Storage warmed up in {time.monotonic() - started:.3f}s")
     
-    def _write_user_storage(self, data: Dict):
-        """Write data to user storage."""
+    def _load_known_links(self):
+        """Fill the known link set from storage."""
         try:
-            with open(self.user_storage_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            self.known_links.add(self.backend.stored_links())
         except Exception as e:
-            logger.error(f"Error writing to user storage: {e}")
-            raise
+            logger.error(f"Error loading known links: {e}")
+            return
+        logger.info(f"Tracking {len(self.known_links)} known links")
+    
+    def _storage_size_bytes(self) -> Optional[int]:
+        """Storage size for the metrics gauge; unknown until the backend is open."""
+        if self._backend is None:
+            return None
+        return self._backend.storage_size_bytes()
+    
+    def _replicated(self, record: Dict):
+        """Context applying one change to the backend and publishing it to standbys."""
+        if self.replicator is None:
+            return nullcontext()
+        return self.replicator.publishing([record])
+    
+    def wait_until_primary(self, timeout: Optional[float] = None) -> bool:
+        """Block while this instance is a replication standby (at once without replication)."""
+        if self.replicator is None:
+            return True
+        return self.replicator.wait_until_primary(timeout)
     
     def store_links(self, user_id: str, username: str, links: List[str]) -> bool:
         """Store valid links for a user."""
         if not links:
             return True
-            
-        with self.lock:
-            try:
-                # Update user storage only
-                user_storage = self._read_user_storage()
-                if user_id not in user_storage:
-                    user_storage[user_id] = {
-                        "username": username,
-                        "links": []
-                    }
-                
-                user_storage[user_id]["username"] = username
-                existing_user_links = set(user_storage[user_id]["links"])
-                new_user_links = set(links)
-                user_storage[user_id]["links"] = list(existing_user_links | new_user_links)
-                
-                # Save user storage
-                self._write_user_storage(user_storage)
-                return True
-            except Exception as e:
-                logger.error(f"Error storing links for user {user_id}: {e}")
-                return False
+        
+        try:
+            record = {"op": "add", "submissions": [[user_id, username, links]]}
+            with STORE_LINKS_SECONDS.time(), self._replicated(record):
+                self.backend.store_links(user_id, username, links)
+            self.known_links.add(links)
+            return True
+        except Exception as e:
+            WRITE_ERRORS.inc()
+            logger.error(f"Error storing links for user {user_id}: {e}")
+            return False
+    
+    def store_links_batch(self, submissions: List[Tuple[str, str, List[str]]]) -> bool:
+        """Store several (user_id, username, links) submissions in one backend write."""
+        submissions = [entry for entry in submissions if entry[2]]
+        if not submissions:
+            return True
+        
+        try:
+            record = {"op": "add", "submissions": submissions}
+            with STORE_BATCH_SECONDS.time(), self._replicated(record):
+                self.backend.store_links_batch(submissions)
+            for _, _, links in submissions:
+                self.known_links.add(links)
+            return True
+        except Exception as e:
+            WRITE_ERRORS.inc()
+            logger.error(f"Error storing a batch of {len(submissions)} submissions: {e}")
+            return False
     
     def get_user_links(self, user_id: str) -> Optional[Dict]:
         """Get all links for a specific user."""
-        with self.lock:
+        try:
+            return self.backend.get_user_links(user_id)
+        except Exception as e:
+            logger.error(f"Error retrieving links for user {user_id}: {e}")
+            return None
+    
+    def _reload_dead_links(self):
+        """Re-read the dead link set from the backend."""
+        try:
+            self._dead_links = frozenset(self.backend.get_dead_links())
+        except Exception as e:
+            logger.error(f"Error loading dead links: {e}")
+    
+    def _poll_shared_dead_links(self):
+        """Reload dead links whenever another worker changes them, until closed.
+        
+        Runs on its own thread so that serving the list only reads the last
+        version seen. After a failure the backend is left alone for a while,
+        doubling up to dead_links_max_retry while failures continue.
+        """
+        backoff = self.dead_links_poll_interval
+        wait = 0.0
+        while not self._closed.wait(wait):
             try:
-                storage = self._read_user_storage()
-                return storage.get(user_id)
-            except Exception as e:
-                logger.error(f"Error retrieving links for user {user_id}: {e}")
-                return None
+                shared = self.coordination.get(DEAD_LINKS_VERSION_KEY)
+            except CoordinationError as e:
+                logger.warning(
+                    f"Could not check for dead links found by other workers, "
+                    f"retrying in {backoff:.0f}s: {e}"
+                )
+                wait = backoff
+                backoff = min(backoff * 2, self.dead_links_max_retry)
+                continue
+            wait = backoff = self.dead_links_poll_interval
+            if shared != self._shared_dead_links_version:
+                # Reload before publishing the version, so the list never
+                # caches the old dead links under the new version
+                self._reload_dead_links()
+                self._shared_dead_links_version = shared
     
-    def get_all_channels(self) -> List[str]:
+    def _load_visible_channels(self) -> List[str]:
+        """Read the global channel list without the channels known to be dead."""
+        dead = self._dead_links
+        return [channel for channel in self.backend.get_all_channels() if channel not in dead]
+    
+    def _channels_version(self) -> Optional[Hashable]:
+        """Version of the visible list: the backend's list plus the dead link set."""
+        version = self.backend.channels_version()
+        if version is None:
+            return None
+        return (version, self._dead_links_version, self._shared_dead_links_version)
+    
+    def get_all_channels(self) -> Tuple[str, ...]:
         """Get the global list of all proxy channels (manually maintained)."""
-        with self.lock:
-            return self._read_global_storage()
+        if not self._warm:
+            self.warm_up()
+        return self.channel_list.get()
+    
+    def _listed_channel_keys(self) -> FrozenSet[str]:
+        """Membership keys of the visible channel list, rebuilt when it changes."""
+        channels = self.get_all_channels()
+        if channels is not self._listed_channels:
+            self._listed_keys = frozenset(KnownLinks.make_key(channel) for channel in channels)
+            self._listed_channels = channels
+        return self._listed_keys
+    
+    def _match_known_links(self, links: List[str]) -> Tuple[Set[str], List[str]]:
+        """Split links into those known from memory and the Bloom filter's "maybe" answers."""
+        listed = self._listed_channel_keys()
+        dead = self._dead_links
+        known = set()
+        maybe = []
+        for link in links:
+            if link in dead:
+                continue
+            if KnownLinks.make_key(link) in listed:
+                known.add(link)
+            elif link in self.known_links:
+                if self.known_links.exact:
+                    known.add(link)
+                else:
+                    maybe.append(link)
+        return known, maybe
+    
+    def _confirm_known_links(self, maybe: List[str]) -> Set[str]:
+        """Look up which possibly known links storage really holds (blocking)."""
+        try:
+            return set(self.backend.known_links(maybe))
+        except Exception as e:
+            logger.error(f"Error looking up {len(maybe)} possibly known links: {e}")
+            return set()
+    
+    @staticmethod
+    def _count_known_links(links: List[str], known: Set[str]):
+        """Count a lookup's known and new links."""
+        KNOWN_LINK_HITS.inc(len(known))
+        KNOWN_LINK_MISSES.inc(len(links) - len(known))
+    
+    def find_known_links(self, links: List[str]) -> Set[str]:
+        """Return the normalized links that are already listed or stored and not dead.
+        
+        Only the Bloom filter's "maybe" answers cost a storage lookup. Links
+        stored by other workers since warm-up are not known here.
+        """
+        known, maybe = self._match_known_links(links)
+        if maybe:
+            known.update(self._confirm_known_links(maybe))
+        self._count_known_links(links, known)
+        return known
+    
+    async def afind_known_links(self,
+                                links: List[str],
+                                run_io: Callable[..., Awaitable] = asyncio.to_thread) -> Set[str]:
+        """Like find_known_links(), confirming "maybe" answers through run_io off the loop."""
+        known, maybe = self._match_known_links(links)
+        if maybe:
+            known.update(await run_io(self._confirm_known_links, maybe))
+        self._count_known_links(links, known)
+        return known
+    
+    def reload_channels(self) -> int:
+        """Force a reload of the global channel list, returning its size."""
+        return len(self.channel_list.reload())
+    
+    def get_channel_submitters(self, link: str) -> List[str]:
+        """Get the ids of all users who submitted a link."""
+        try:
+            return self.backend.get_channel_submitters(link)
+        except Exception as e:
+            logger.error(f"Error retrieving submitters of {link}: {e}")
+            return []
+    
+    def top_channels(self, k: int = 10) -> List[Tuple[str, int]]:
+        """Get the k most submitted links with their submitter counts."""
+        try:
+            return self.backend.top_channels(k)
+        except Exception as e:
+            logger.error(f"Error retrieving top channels: {e}")
+            return []
+    
+    def iter_user_links(self, user_id: Optional[str] = None) -> Iterator[Tuple[str, str, str]]:
+        """Stream (user_id, username, link) rows, for one user or everyone.
+        
+        Unlike the other methods this raises on failure, so that an export is
+        never silently truncated.
+        """
+        return self.backend.iter_user_links(user_id)
+    
+    def get_link_statuses(self) -> List[LinkStatus]:
+        """Get the revalidation state of every known link."""
+        try:
+            return self.backend.get_link_statuses()
+        except Exception as e:
+            logger.error(f"Error retrieving link statuses: {e}")
+            return []
+    
+    def record_link_verdicts(self, verdicts: List[Verdict]) -> bool:
+        """Store revalidation verdicts and hide or re-show affected channels."""
+        if not verdicts:
+            return True
+        
+        try:
+            self.backend.record_link_verdicts(verdicts)
+        except Exception as e:
+            logger.error(f"Error recording {len(verdicts)} link verdicts: {e}")
+            return False
+        
+        dead = set(self._dead_links)
+        for link, alive, _ in verdicts:
+            if alive:
+                dead.discard(link)
+            else:
+                dead.add(link)
+        if dead != self._dead_links:
+            self._dead_links = frozenset(dead)
+            self._dead_links_version += 1
+            self._publish_dead_links_change()
+        return True
+    
+    def _publish_dead_links_change(self):
+        """Tell other workers to reload the dead link set."""
+        if self.coordination is None:
+            return
+        try:
+            # Our own change is already applied; don't reload it on the next poll
+            self._shared_dead_links_version = str(
+                self.coordination.incr(DEAD_LINKS_VERSION_KEY)
+            )
+        except CoordinationError as e:
+            logger.warning(f"Could not publish dead link changes to other workers: {e}")
+    
+    def is_dead(self, link: str) -> bool:
+        """Whether the last revalidation found the link dead."""
+        return link in self._dead_links
+    
+    def prune_link(self, link: str) -> int:
+        """Remove a link from every user's collection, returning how many users had it."""
+        try:
+            with self._replicated({"op": "prune", "link": link}):
+                pruned = self.backend.prune_link(link)
+            self.known_links.discard(link)
+            return pruned
+        except Exception as e:
+            logger.error(f"Error pruning {link}: {e}")
+            return 0
     
     def remove_link(self, user_id: str, link: str) -> bool:
         """Remove a specific link for a user."""
-        with self.lock:
-            try:
-                user_storage = self._read_user_storage()
-                if user_id not in user_storage:
-                    return False
-                
-                if link in user_storage[user_id]["links"]:
-                    user_storage[user_id]["links"].remove(link)
-                    self._write_user_storage(user_storage)
-                return True
-            except Exception as e:
-                logger.error(f"Error removing link for user {user_id}: {e}")
-                return False
+        try:
+            with self._replicated({"op": "remove", "user_id": user_id, "link": link}):
+                return self.backend.remove_link(user_id, link)
+        except Exception as e:
+            logger.error(f"Error removing link for user {user_id}: {e}")
+            return False
     
     def clear_user_links(self, user_id: str) -> bool:
         """Clear all links for a specific user."""
-        with self.lock:
-            try:
-                user_storage = self._read_user_storage()
-                if user_id in user_storage:
-                    user_storage[user_id]["links"] = []
-                    self._write_user_storage(user_storage)
-                return True
-            except Exception as e:
-                logger.error(f"Error clearing links for user {user_id}: {e}")
-                return False 
\ No newline at end of file
+        try:
+            with self._replicated({"op": "clear", "user_id": user_id}):
+                self.backend.clear_user_links(user_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing links for user {user_id}: {e}")
+            return False
+    
+    def close(self):
+        """Flush pending state and release backend resources."""
+        self._closed.set()
+        if self._dead_links_poller is not None:
+            self._dead_links_poller.join()
+        if self.replicator is not None:
+            self.replicator.close()
+        with self._warm_up_lock:
+            if self._backend is not None:
+                self._backend.close()
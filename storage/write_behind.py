@@ -0,0 +1,119 @@
+"""Write-behind buffer that batches link submissions."""
+
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from utils.offload import Offloader
+from .storage_manager import StorageManager
+
+logger = logging.getLogger(__name__)
+
+# (user_id, username, links)
+Submission = Tuple[str, str, List[str]]
+
+class WriteBehindBuffer:
+    """Collects link submissions from many users and stores them as one batch.
+    
+    A batch is flushed once ``max_batch_size`` submissions are waiting or
+    ``max_delay`` seconds after the first one arrived, whichever comes first.
+    The storage call runs in a worker thread so the event loop never blocks.
+    """
+    
+    def __init__(self,
+                 storage_manager: StorageManager,
+                 max_batch_size: int = 100,
+                 max_delay: float = 0.05,
+                 offloader: Optional[Offloader] = None):
+        """Initialize buffer with its storage manager, flush triggers and I/O offloader."""
+        self.storage_manager = storage_manager
+        self._run_io = offloader.run_io if offloader is not None else asyncio.to_thread
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending: List[Tuple[Submission, Optional[asyncio.Future]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_tasks = set()
+        self._closed = False
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+    
+    async def submit(self, user_id: str, username: str, links: List[str]) -> bool:
+        """Queue links for storage and wait until the batch holding them is written."""
+        if not links:
+            return True
+        if self._closed:
+            # Shutting down: write straight through
+            return await self._run_io(
+                self.storage_manager.store_links, user_id, username, links
+            )
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(((user_id, username, links), future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._start_flush)
+        
+        return await future
+    
+    def _start_flush(self):
+        """Schedule a flush of everything currently pending."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+    
+    async def flush(self):
+        """Write all pending submissions as a single storage batch."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        
+        # Batches are written one at a time so they reach storage in order
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            
+            stored = False
+            try:
+                stored = await self._run_io(
+                    self.storage_manager.store_links_batch,
+                    [submission for submission, _ in batch]
+                )
+                if not stored:
+                    logger.error("Failed to store a batch of %d submissions", len(batch))
+            except Exception as e:
+                logger.error("Error storing a batch of %d submissions: %s", len(batch), e)
+            finally:
+                # Submitters must never wait forever, even if the flush is cancelled
+                for _, future in batch:
+                    if future is not None and not future.done():
+                        future.set_result(stored)
+    
+    def flush_sync(self) -> int:
+        """Synchronously write pending submissions, e.g. from a signal handler.
+        
+        Waiting submitters are not resumed; this is meant for a process that
+        is about to exit.
+        """
+        batch, self._pending = self._pending, []
+        if batch:
+            self.storage_manager.store_links_batch(
+                [submission for submission, _ in batch]
+            )
+        return len(batch)
+    
+    async def close(self):
+        """Stop batching and durably flush whatever is still pending."""
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
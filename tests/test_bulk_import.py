@@ -0,0 +1,95 @@
+"""Tests for parsing and importing uploaded channel lists."""
+
+import asyncio
+import json
+import pytest
+from bot.bulk_import import BulkImporter, parse_import_file
+from validators.link_validator import LinkValidator
+
+class OfflineValidator(LinkValidator):
+    """Treats every channel as existing unless its name starts with "dead"."""
+    
+    def __init__(self):
+        super().__init__()
+        self.probed = []
+    
+    async def _acheck_existence(self, normalized_link, use_cache=True):
+        self.probed.append(normalized_link)
+        return not normalized_link.rsplit("/", 1)[-1].startswith("dead"), ""
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_txt_lines_yield_distinct_usernames_in_order(tmp_path):
+    path = write(tmp_path, "channels.txt", "\n".join([
+        "first https://t.me/alpha_one and @beta_two",
+        "t.me/Alpha_One again, telegram.me/gamma_three",
+        "not a link: @abc",
+    ]))
+    assert parse_import_file(path) == ["alpha_one", "beta_two", "gamma_three"]
+
+def test_csv_columns_need_no_parsing(tmp_path):
+    path = write(tmp_path, "channels.csv", (
+        "name,link,added\n"
+        "Alpha,https://t.me/alpha_one,2024-01-01\n"
+        "Beta,@beta_two,2024-01-02\n"
+    ))
+    assert parse_import_file(path) == ["alpha_one", "beta_two"]
+
+def test_json_escaped_slashes_are_undone(tmp_path):
+    # PHP and some other encoders escape every slash
+    path = write(tmp_path, "channels.json", json.dumps(
+        {"channels": ["https://t.me/alpha_one", {"link": "https://t.me/beta_two"}]}
+    ).replace("/", "\\/"))
+    assert parse_import_file(path) == ["alpha_one", "beta_two"]
+
+def test_undecodable_bytes_are_replaced(tmp_path):
+    path = tmp_path / "channels.txt"
+    path.write_bytes(b"\xff\xfe https://t.me/alpha_one \x80\n")
+    assert parse_import_file(str(path)) == ["alpha_one"]
+
+@pytest.mark.parametrize("file_name, supported", [
+    ("list.txt", True), ("LIST.CSV", True), ("export.json", True),
+    ("list.xlsx", False), ("", False), (None, False),
+])
+def test_supported_extensions(file_name, supported):
+    assert BulkImporter.is_supported(file_name) is supported
+
+def test_import_caps_links_per_file_before_any_lookup(tmp_path):
+    usernames = [f"channel_{i:02d}" for i in range(8)]
+    usernames[3] = "dead_channel"
+    path = write(tmp_path, "channels.txt", "\n".join(f"@{name}" for name in usernames))
+    validator = OfflineValidator()
+    importer = BulkImporter(validator, batch_size=2, max_links=5)
+    looked_up = []
+    progress = []
+    
+    async def find_known(links):
+        looked_up.extend(links)
+        return {"https://t.me/channel_02"}
+    
+    async def show_progress(checked, total):
+        progress.append((checked, total))
+    
+    result = asyncio.run(importer.import_file(
+        path,
+        known_links=["https://t.me/CHANNEL_00"],
+        find_known=find_known,
+        grant=lambda wanted: wanted - 1,
+        progress=show_progress
+    ))
+    
+    assert result.found == 8
+    assert result.already_stored == 1
+    # Only the first five new links are within the cap; channel_06 and 07 are not
+    expected = ["https://t.me/channel_01", "https://t.me/channel_02", "https://t.me/dead_channel",
+                "https://t.me/channel_04", "https://t.me/channel_05"]
+    assert looked_up == expected
+    # channel_02 is known elsewhere; the grant leaves channel_05 unchecked
+    assert validator.probed == [expected[0], expected[2], expected[3]]
+    assert result.valid == [expected[1], expected[0], expected[3]]
+    assert result.invalid == 1
+    assert result.skipped == 1 + 2
+    assert progress == [(2, 3), (3, 3)]
@@ -0,0 +1,190 @@
+"""Tests for the RESP coordination client against the bundled broker."""
+
+import socket
+import threading
+import time
+import pytest
+from coordination.base import CoordinationError, Lease
+from coordination.broker import LocalBroker
+from coordination.memory import InMemoryCoordinationBackend
+from coordination.redis_backend import RedisCoordinationBackend
+from coordination.verdicts import SharedVerdictCache
+from storage.storage_manager import DEAD_LINKS_VERSION_KEY, StorageManager
+
+@pytest.fixture
+def broker():
+    """A local broker on a free port."""
+    broker = LocalBroker(port=0)
+    broker.start()
+    yield broker
+    broker.stop()
+
+@pytest.fixture
+def backend(broker):
+    """A client of the local broker."""
+    backend = RedisCoordinationBackend(broker.url)
+    yield backend
+    backend.close()
+
+def test_get_set_delete_and_incr(backend):
+    assert backend.get("missing") is None
+    assert backend.set("key", "välue")
+    assert backend.get("key") == "välue"
+    assert not backend.set("key", "other", only_if_absent=True)
+    backend.delete("key")
+    assert backend.set("key", "other", only_if_absent=True)
+    assert backend.incr("counter") == 1
+    assert backend.incr("counter") == 2
+
+def test_set_with_ttl_expires(backend):
+    backend.set("short", "1", ttl=0.05)
+    assert backend.get("short") == "1"
+    time.sleep(0.1)
+    assert backend.get("short") is None
+
+def test_compare_and_set(backend):
+    backend.set("role", "a")
+    assert not backend.compare_and_set("role", "b", "c")
+    assert backend.compare_and_set("role", "a", "c")
+    assert backend.get("role") == "c"
+    assert backend.compare_and_set("role", "c", None)
+    assert backend.get("role") is None
+
+def test_connections_are_pooled(backend):
+    for _ in range(5):
+        backend.get("key")
+    assert len(backend._idle) == 1
+
+def test_unreachable_server_raises_coordination_error():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        port = server.getsockname()[1]
+    backend = RedisCoordinationBackend(f"redis://127.0.0.1:{port}/0", timeout=0.5)
+    with pytest.raises(CoordinationError):
+        backend.get("key")
+
+def test_malformed_reply_discards_the_connection():
+    server = socket.create_server(("127.0.0.1", 0))
+    
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            conn.recv(1024)
+            conn.sendall(b":notanint\r\n")
+            conn.recv(1024)
+    
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    backend = RedisCoordinationBackend(f"redis://127.0.0.1:{server.getsockname()[1]}/0")
+    try:
+        with pytest.raises(CoordinationError):
+            backend.incr("key")
+        assert backend._idle == []
+    finally:
+        thread.join(timeout=2)
+        server.close()
+
+def test_lease_has_one_holder(backend):
+    first = Lease(backend, "revalidation", ttl=5)
+    second = Lease(backend, "revalidation", ttl=5)
+    assert first.hold()
+    assert not second.hold()
+    first.release()
+    assert second.hold()
+
+def test_shared_verdict_cache_serves_other_workers_verdicts(broker):
+    backends = [RedisCoordinationBackend(broker.url) for _ in range(2)]
+    try:
+        publisher, reader = (SharedVerdictCache(backend) for backend in backends)
+        publisher.set("channel_one", True)
+        assert reader.get("channel_one") is True
+        assert reader.get_stats()["shared_hits"] == 1
+        assert reader.get("channel_two") is None
+    finally:
+        for backend in backends:
+            backend.close()
+
+def test_shared_verdict_cache_backs_off_while_the_backend_is_down():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        port = server.getsockname()[1]
+    cache = SharedVerdictCache(
+        RedisCoordinationBackend(f"redis://127.0.0.1:{port}/0", timeout=0.5), retry_after=60
+    )
+    cache.set("channel_one", False)  # Fails to publish, but is cached locally
+    assert cache.get("channel_one") is False
+    assert not cache._backend_available()
+    assert cache.get("channel_two") is None
+
+def test_malformed_shared_verdict_is_a_miss():
+    backend = InMemoryCoordinationBackend()
+    cache = SharedVerdictCache(backend)
+    backend.set(cache.prefix + cache.make_key("channel_one"), "1:soon")
+    assert cache.get("channel_one") is None
+    assert cache.get_stats()["shared_hits"] == 0
+
+class FlakyCoordinationBackend(InMemoryCoordinationBackend):
+    """Counts get() calls and fails them while down is set."""
+    
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+        self.down = False
+    
+    def get(self, key):
+        self.gets += 1
+        if self.down:
+            raise CoordinationError("backend down")
+        return super().get(key)
+
+def wait_for(predicate, timeout=5.0):
+    """Poll until predicate() is true, failing the test on timeout."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            pytest.fail("Timed out")
+        time.sleep(0.01)
+
+def test_dead_links_found_by_another_worker_are_hidden(tmp_path):
+    coordination = InMemoryCoordinationBackend()
+    managers = [
+        StorageManager(
+            backend="sqlite", db_path=str(tmp_path / "bot.db"),
+            coordination=coordination, dead_links_poll_interval=0.02
+        )
+        for _ in range(2)
+    ]
+    try:
+        first, second = managers
+        first.backend.set_channels(["https://t.me/alive", "https://t.me/gone"])
+        second.reload_channels()
+        assert second.get_all_channels() == ("https://t.me/alive", "https://t.me/gone")
+        
+        assert first.record_link_verdicts([("https://t.me/gone", False, time.time())])
+        assert coordination.get(DEAD_LINKS_VERSION_KEY) == "1"
+        wait_for(lambda: second.get_all_channels() == ("https://t.me/alive",))
+        assert second.is_dead("https://t.me/gone")
+    finally:
+        for manager in managers:
+            manager.close()
+
+def test_listing_channels_never_waits_for_the_coordination_backend(tmp_path):
+    coordination = FlakyCoordinationBackend()
+    coordination.down = True
+    manager = StorageManager(
+        backend="sqlite", db_path=str(tmp_path / "bot.db"), coordination=coordination,
+        dead_links_poll_interval=0.01, dead_links_max_retry=60
+    )
+    try:
+        manager.backend.set_channels(["https://t.me/alive"])
+        manager.channel_list.check_interval = 0  # Check the version on every read
+        manager.reload_channels()
+        wait_for(lambda: coordination.gets >= 1)
+        time.sleep(0.3)
+        # 0.01 + 0.02 + 0.04 + 0.08 + 0.16: backing off, not polling 30 times
+        assert coordination.gets <= 7
+        
+        polled = coordination.gets
+        for _ in range(100):
+            assert manager.get_all_channels() == ("https://t.me/alive",)
+        assert coordination.gets - polled <= 1
+    finally:
+        manager.close()
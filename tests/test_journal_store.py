@@ -0,0 +1,147 @@
+"""Tests for the journal store: replay, torn-tail recovery and compaction."""
+
+import json
+import os
+import pytest
+from storage.journal_store import CorruptStorageError, JournalStore, atomic_write
+
+def add(user_id, *links, username="user"):
+    """Build an add record."""
+    return {"op": "add", "user_id": user_id, "username": username, "links": list(links)}
+
+@pytest.fixture
+def make_store(tmp_path):
+    """Open stores on one snapshot path, closing them after the test."""
+    stores = []
+    
+    def make():
+        store = JournalStore(
+            str(tmp_path / "user_links.json"), compact_threshold=10**6, compact_interval=3600
+        )
+        store.open()
+        stores.append(store)
+        return store
+    
+    yield make
+    for store in stores:
+        store.close()
+
+def test_appended_records_are_replayed_on_reopen(make_store):
+    store = make_store()
+    store.append([add("1", "https://t.me/channel_one")])
+    store.append([{"op": "remove", "user_id": "1", "link": "https://t.me/channel_one"}])
+    store.append([add("1", "https://t.me/channel_two"), add("2", "https://t.me/channel_two")])
+    # Simulate a crash: the journal is never compacted
+    store._journal.close()
+    store._journal = None
+    
+    reopened = make_store()
+    assert reopened.get("1")["links"] == ["https://t.me/channel_two"]
+    assert reopened.get("2")["links"] == ["https://t.me/channel_two"]
+
+def test_torn_trailing_record_is_discarded(make_store):
+    store = make_store()
+    store.append([add("1", "https://t.me/channel_one")])
+    store._journal.close()
+    store._journal = None
+    with open(store.journal_path, "ab") as f:
+        f.write(b'{"op":"add","user_id":"2","username":"u","li')
+    intact_size = os.path.getsize(store.journal_path) - len(b'{"op":"add","user_id":"2","username":"u","li')
+    
+    reopened = make_store()
+    assert reopened.get("1")["links"] == ["https://t.me/channel_one"]
+    assert reopened.get("2") is None
+    # The torn bytes are cut off so new records do not end up glued to them
+    assert os.path.getsize(reopened.journal_path) == intact_size
+    reopened.append([add("3", "https://t.me/channel_three")])
+    with open(reopened.journal_path, "rb") as f:
+        assert [json.loads(line)["user_id"] for line in f] == ["1", "3"]
+
+def test_unreadable_record_is_skipped(make_store):
+    store = make_store()
+    store._journal.write(b"not json\n")
+    store._journal.flush()
+    store.append([add("1", "https://t.me/channel_one")])
+    store._journal.close()
+    store._journal = None
+    
+    assert make_store().get("1")["links"] == ["https://t.me/channel_one"]
+
+def test_compaction_folds_the_journal_into_the_snapshot(make_store):
+    store = make_store()
+    store.append([add("1", "https://t.me/channel_one"), add("2", "https://t.me/channel_two")])
+    store.compact()
+    
+    assert os.path.getsize(store.journal_path) == 0
+    with open(store.snapshot_path) as f:
+        assert json.load(f)
+    store.append([add("1", "https://t.me/channel_three")])
+    store.close()
+    
+    reopened = make_store()
+    assert reopened.get("1")["links"] == ["https://t.me/channel_one", "https://t.me/channel_three"]
+    assert reopened.get("2")["links"] == ["https://t.me/channel_two"]
+
+def test_failed_compaction_keeps_the_journal_usable(make_store, monkeypatch):
+    store = make_store()
+    store.append([add("1", "https://t.me/channel_one")])
+    real_replace = os.replace
+    
+    def fail_for_journal(src, dst):
+        if dst == store.journal_path:
+            raise OSError("disk full")
+        return real_replace(src, dst)
+    
+    monkeypatch.setattr(os, "replace", fail_for_journal)
+    with pytest.raises(OSError):
+        store.compact()
+    monkeypatch.undo()
+    
+    assert not os.path.exists(f"{store.journal_path}.tmp")
+    store.append([add("2", "https://t.me/channel_two")])
+    store.close()
+    
+    reopened = make_store()
+    assert reopened.get("1")["links"] == ["https://t.me/channel_one"]
+    assert reopened.get("2")["links"] == ["https://t.me/channel_two"]
+
+def test_failed_atomic_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    path = tmp_path / "link_status.json"
+    atomic_write(str(path), "old")
+    
+    def fail(fd):
+        raise OSError("disk full")
+    
+    monkeypatch.setattr(os, "fsync", fail)
+    with pytest.raises(OSError):
+        atomic_write(str(path), "new")
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["link_status.json"]
+
+def test_corrupt_snapshot_refuses_to_load(tmp_path):
+    snapshot = tmp_path / "user_links.json"
+    snapshot.write_text('{"users": ')
+    store = JournalStore(str(snapshot))
+    with pytest.raises(CorruptStorageError):
+        store.open()
+
+def test_read_only_store_leaves_a_running_store_alone(make_store):
+    store = make_store()
+    store.append([add("1", "https://t.me/channel_one")])
+    store.compact()
+    store.append([add("2", "https://t.me/channel_two")])
+    store._journal.write(b'{"op":"add","user_id":"3"')  # A write in progress
+    store._journal.flush()
+    journal_size = os.path.getsize(store.journal_path)
+    journal_inode = os.stat(store.journal_path).st_ino
+    
+    reader = JournalStore(store.snapshot_path, read_only=True)
+    reader.open()
+    assert reader.get("1") and reader.get("2") and reader.get("3") is None
+    with pytest.raises(PermissionError):
+        reader.append([add("4", "https://t.me/channel_four")])
+    reader.close()
+    
+    assert os.path.getsize(store.journal_path) == journal_size
+    assert os.stat(store.journal_path).st_ino == journal_inode
+    assert not os.path.exists(f"{store.snapshot_path}.tmp")
@@ -0,0 +1,69 @@
+"""Tests for the known link set and the lookups built on it."""
+
+import asyncio
+import time
+from storage.known_links import BloomFilter, KnownLinks
+from storage.storage_manager import StorageManager
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"https://t.me/channel{i}")
+    
+    assert all(f"https://t.me/channel{i}" in bloom for i in range(1000))
+    false_positives = sum(f"https://t.me/other{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+    assert bloom.count == 1000
+
+def test_known_links_ignore_case():
+    for known in (KnownLinks(), KnownLinks(bloom_capacity=100)):
+        known.add(["https://t.me/Channel_One"])
+        assert "https://t.me/channel_one" in known
+        assert "https://t.me/channel_two" not in known
+        assert len(known) == 1
+    
+    exact = KnownLinks()
+    exact.add(["https://t.me/channel_one"])
+    exact.discard("https://t.me/CHANNEL_ONE")
+    assert "https://t.me/channel_one" not in exact
+
+def make_manager(tmp_path, bloom_capacity=None):
+    manager = StorageManager(
+        user_storage_path=str(tmp_path / "user_links.json"),
+        global_storage_path=str(tmp_path / "proxy_channels.json"),
+        bloom_capacity=bloom_capacity
+    )
+    assert manager.store_links("1", "alice", ["https://t.me/stored", "https://t.me/gone"])
+    manager.record_link_verdicts([("https://t.me/gone", False, time.time())])
+    return manager
+
+def test_find_known_links_from_the_exact_set(tmp_path):
+    manager = make_manager(tmp_path)
+    try:
+        links = ["https://t.me/stored", "https://t.me/gone", "https://t.me/new"]
+        assert manager.find_known_links(links) == {"https://t.me/stored"}
+    finally:
+        manager.close()
+
+def test_bloom_filter_maybes_are_confirmed_off_the_loop(tmp_path):
+    # A tiny filter, so that some unstored links are reported as maybe stored
+    manager = make_manager(tmp_path, bloom_capacity=2)
+    candidates = [f"https://t.me/other{i}" for i in range(1000)]
+    false_positive = next(link for link in candidates if link in manager.known_links)
+    new = next(link for link in candidates if link not in manager.known_links)
+    offloaded = []
+    
+    async def run_io(func, *args):
+        offloaded.append(args)
+        return await asyncio.to_thread(func, *args)
+    
+    try:
+        links = ["https://t.me/stored", "https://t.me/gone", new, false_positive]
+        assert manager.find_known_links(links) == {"https://t.me/stored"}
+        assert asyncio.run(manager.afind_known_links(links, run_io)) == {"https://t.me/stored"}
+        # Only the filter's positives reach storage; dead and new links do not
+        assert offloaded == [(["https://t.me/stored", false_positive],)]
+        assert asyncio.run(manager.afind_known_links([new], run_io)) == set()
+        assert len(offloaded) == 1
+    finally:
+        manager.close()
@@ -0,0 +1,80 @@
+"""Tests for the interned in-memory link index."""
+
+import json
+import random
+from collections import Counter
+from storage.link_index import LinkIndex
+
+def test_links_keep_submission_order_and_skip_duplicates():
+    index = LinkIndex()
+    index.add_links("1", "alice", ["https://t.me/bbbbb", "https://t.me/aaaaa"])
+    index.add_links("1", "alice2", ["https://t.me/bbbbb", "https://t.me/ccccc"])
+    
+    assert index.get_user("1") == {
+        "username": "alice2",
+        "links": ["https://t.me/bbbbb", "https://t.me/aaaaa", "https://t.me/ccccc"]
+    }
+    assert index.submitter_count("https://t.me/bbbbb") == 1
+    assert index.get_user("2") is None
+
+def test_links_are_interned_case_insensitively():
+    index = LinkIndex()
+    index.add_links("1", "alice", ["https://t.me/Channel_One"])
+    index.add_links("2", "bob", ["https://t.me/channel_one"])
+    
+    assert index.unique_links == 1
+    # The first spelling is kept
+    assert index.get_user("2")["links"] == ["https://t.me/Channel_One"]
+    assert index.submitter_count("https://t.me/CHANNEL_ONE") == 2
+    assert index.has_link("1", "https://t.me/channel_one")
+    assert index.submitters("https://t.me/channel_ONE") == ["1", "2"]
+    assert index.remove_link("2", "https://t.me/CHANNEL_one")
+    assert index.submitter_count("https://t.me/channel_one") == 1
+
+def test_remove_and_clear_update_counts():
+    index = LinkIndex()
+    index.add_links("1", "alice", ["https://t.me/aaaaa", "https://t.me/bbbbb"])
+    index.add_links("2", "bob", ["https://t.me/aaaaa"])
+    
+    assert not index.remove_link("2", "https://t.me/bbbbb")
+    assert not index.remove_link("3", "https://t.me/aaaaa")
+    assert not index.remove_link("1", "https://t.me/unknown")
+    assert index.remove_link("1", "https://t.me/aaaaa")
+    assert not index.has_link("1", "https://t.me/aaaaa")
+    assert index.submitters("https://t.me/aaaaa") == ["2"]
+    
+    index.clear_user("2")
+    assert index.get_user("2") == {"username": "bob", "links": []}
+    assert "2" in index
+    assert dict(index.link_counts()) == {"https://t.me/bbbbb": 1}
+
+def test_top_links_match_a_recount():
+    rng = random.Random(17)
+    links = [f"https://t.me/channel{i:03d}" for i in range(40)]
+    index = LinkIndex()
+    for _ in range(2000):
+        user_id = str(rng.randrange(50))
+        link = rng.choice(links)
+        if rng.random() < 0.7:
+            index.add_links(user_id, "u", [link])
+        elif rng.random() < 0.9:
+            index.remove_link(user_id, link)
+        else:
+            index.clear_user(user_id)
+    
+    expected = Counter()
+    for user_id in index.user_ids():
+        expected.update(index.get_user(user_id)["links"])
+    assert dict(index.link_counts()) == dict(expected)
+    top = index.top_links(10)
+    assert [count for _, count in top] == sorted(expected.values(), reverse=True)[:10]
+    assert all(expected[link] == count for link, count in top)
+
+def test_snapshot_round_trip():
+    index = LinkIndex()
+    index.add_links("1", "alice", ["https://t.me/aaaaa", "https://t.me/bbbbb"])
+    index.add_links("2", "bob", ["https://t.me/bbbbb"])
+    
+    restored = LinkIndex.from_snapshot(json.loads(index.dumps()))
+    assert dict(restored.iter_snapshot()) == dict(index.iter_snapshot())
+    assert restored.top_links(1) == [("https://t.me/bbbbb", 2)]
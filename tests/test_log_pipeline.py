@@ -0,0 +1,104 @@
+"""Tests for sampling, queueing and rotation in the log pipeline."""
+
+import logging
+import queue
+import time
+import pytest
+from monitoring.log_pipeline import (
+    DROPPED_QUEUE_FULL,
+    DROPPED_SAMPLED,
+    DroppingQueueHandler,
+    SampleFilter,
+    SizeAndTimeRotatingFileHandler,
+    sampled,
+)
+from monitoring.metrics import REGISTRY
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """Count metrics during the test."""
+    monkeypatch.setattr(REGISTRY, "enabled", True)
+
+def make_record(created=100.0, level=logging.INFO, msg="Received message", args=(), **extra):
+    record = logging.LogRecord("bot", level, __file__, 1, msg, args, None)
+    record.created = created
+    record.__dict__.update(extra)
+    return record
+
+def test_sample_filter_passes_a_burst_then_one_in_n(metrics):
+    sample = SampleFilter(burst=3, every=4)
+    dropped = DROPPED_SAMPLED.value
+    records = [make_record(**sampled()) for _ in range(12)]
+    
+    kept = [i for i, record in enumerate(records, 1) if sample.filter(record)]
+    assert kept == [1, 2, 3, 7, 11]
+    assert [getattr(records[i - 1], "sample_rate", None) for i in kept] == [None, None, None, 4, 4]
+    assert DROPPED_SAMPLED.value - dropped == 7
+    
+    # Each second starts with a fresh burst
+    assert sample.filter(make_record(created=101.2, **sampled()))
+
+def test_sample_filter_never_drops_unsampled_or_important_records():
+    sample = SampleFilter(burst=0, every=1000)
+    assert not sample.filter(make_record(**sampled()))
+    assert sample.filter(make_record())
+    assert sample.filter(make_record(level=logging.WARNING, **sampled()))
+    # every is at least one, so nothing divides by zero
+    assert SampleFilter(burst=0, every=0).filter(make_record(**sampled()))
+
+def test_dropping_queue_handler_counts_what_does_not_fit(metrics):
+    records = queue.Queue(2)
+    handler = DroppingQueueHandler(records)
+    dropped = DROPPED_QUEUE_FULL.value
+    for i in range(5):
+        handler.handle(make_record(msg="record %d", args=(i,)))
+    
+    assert DROPPED_QUEUE_FULL.value - dropped == 3
+    first = records.get_nowait()
+    # Rendered before queueing, so later changes to the arguments don't show
+    assert (first.msg, first.args, first.message) == ("record 0", None, "record 0")
+    assert records.get_nowait().message == "record 1"
+    assert records.empty()
+
+def test_rotation_at_the_interval_boundary(tmp_path):
+    path = tmp_path / "bot.log"
+    handler = SizeAndTimeRotatingFileHandler(str(path), max_bytes=0, interval=3600, backup_count=2)
+    try:
+        assert handler.next_rollover % 3600 == 0
+        assert 0 < handler.next_rollover - time.time() <= 3600
+        
+        handler.emit(make_record(msg="first"))
+        handler.emit(make_record(msg="second"))
+        assert not (tmp_path / "bot.log.1").exists()
+        
+        # The boundary passes
+        handler.next_rollover = time.time() - 1
+        handler.emit(make_record(msg="third"))
+        assert (tmp_path / "bot.log.1").read_text().split() == ["first", "second"]
+        assert path.read_text().split() == ["third"]
+        assert handler.next_rollover > time.time()
+    finally:
+        handler.close()
+
+def test_empty_file_is_not_rotated_at_the_boundary(tmp_path):
+    path = tmp_path / "bot.log"
+    handler = SizeAndTimeRotatingFileHandler(str(path), max_bytes=0, interval=60, backup_count=2)
+    try:
+        handler.next_rollover = time.time() - 1
+        assert not handler.shouldRollover(make_record())
+        assert handler.next_rollover > time.time()
+        assert not (tmp_path / "bot.log.1").exists()
+    finally:
+        handler.close()
+
+def test_rotation_by_size_keeps_backup_count_files(tmp_path):
+    path = tmp_path / "bot.log"
+    handler = SizeAndTimeRotatingFileHandler(str(path), max_bytes=20, interval=0, backup_count=2)
+    try:
+        assert handler.next_rollover == float("inf")
+        for i in range(5):
+            handler.emit(make_record(msg=f"line {i} " + "x" * 10))
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["bot.log", "bot.log.1", "bot.log.2"]
+        assert "line 4" in path.read_text()
+    finally:
+        handler.close()
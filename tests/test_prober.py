@@ -0,0 +1,118 @@
+"""Tests for page classification, retry decisions and adaptive probe timeouts."""
+
+import asyncio
+import httpx
+import pytest
+from validators.prober import (
+    PageClassifier, ProbeConfig, ProbeError, ProbeTimeout, Prober, status_verdict
+)
+
+EXISTING_PAGE = (
+    b'<html><div class="tgme_page"><div class="tgme_page_title">Channel</div>'
+    b'<div class="tgme_page_description">About</div></div></html>'
+)
+MISSING_PAGE = (
+    b'<html><div class="tgme_page"><div class="tgme_page_description">'
+    b'If you have Telegram, you can contact @name right away.</div></div></html>'
+)
+
+def classify(page: bytes, limit: int = 1024, chunk_size: int = 7):
+    """Feed a page in small chunks and return the classifier's result."""
+    classifier = PageClassifier(limit)
+    for start in range(0, len(page), chunk_size):
+        if classifier.feed(page[start:start + chunk_size]):
+            break
+    return classifier.result()
+
+def test_classifier_finds_markers_split_across_chunks():
+    assert classify(EXISTING_PAGE) is True
+    assert classify(MISSING_PAGE) is False
+
+def test_classifier_stops_reading_once_decided():
+    classifier = PageClassifier(1024)
+    assert classifier.feed(EXISTING_PAGE)
+    assert classifier.feed(b"more")
+    assert classifier.result() is True
+
+def test_classifier_gives_up_after_its_limit():
+    page = b"<html>" + b" " * 2048 + b'<div class="tgme_page_title">'
+    assert classify(page, limit=1024) is None
+
+def test_classifier_without_markers_decides_by_page_kind():
+    # A complete t.me page without a title or description has no entity
+    assert classify(b'<div class="tgme_page">nothing</div>') is False
+    # Any other page (a stand-in server) exists by its status
+    assert classify(b"ok") is True
+
+@pytest.mark.parametrize("status, verdict", [(200, None), (404, False), (410, False), (302, False)])
+def test_status_verdict(status, verdict):
+    assert status_verdict(status) is verdict
+
+@pytest.mark.parametrize("status, retryable", [
+    (429, True), (500, True), (503, True), (400, False), (403, False)
+])
+def test_status_verdict_errors(status, retryable):
+    with pytest.raises(ProbeError) as info:
+        status_verdict(status)
+    assert info.value.retryable is retryable
+
+def test_timeout_adapts_to_measured_round_trips():
+    prober = Prober(ProbeConfig(initial_timeout=2.0, min_timeout=0.5, max_timeout=10.0))
+    assert prober.timeout_for("t.me").read == 2.0
+    
+    prober.observe_rtt("t.me", 0.2)
+    # First sample: SRTT = 0.2, RTTVAR = 0.1, so 0.2 + 4 * 0.1
+    assert prober.timeout_for("t.me").read == pytest.approx(0.6)
+    assert prober.timeout_for("t.me", attempt=1).read == pytest.approx(1.2)
+    assert prober.timeout_for("t.me", attempt=10).read == 10.0
+    # Hosts are tracked separately
+    assert prober.timeout_for("example.com").read == 2.0
+    
+    for _ in range(50):
+        prober.observe_rtt("t.me", 0.01)
+    assert prober.timeout_for("t.me").read == 0.5
+    
+    prober.observe_rtt("t.me", 3.0)
+    assert prober.timeout_for("t.me").read > 2.0
+
+def probe_with(responses, attempts=3):
+    """Probe once against a mock transport answering with the given callables in turn."""
+    calls = []
+    
+    def handle(request):
+        calls.append(request)
+        return responses[len(calls) - 1](request)
+    
+    async def run():
+        prober = Prober(ProbeConfig(attempts=attempts, retry_backoff=0))
+        prober._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+        try:
+            return await prober.probe("https://t.me/channel_one")
+        finally:
+            await prober.aclose()
+    
+    return asyncio.run(run()), len(calls)
+
+def page(status, body=b""):
+    """Build a responder returning a fixed response."""
+    return lambda request: httpx.Response(status, content=body)
+
+def timeout(request):
+    """Responder that times out."""
+    raise httpx.ReadTimeout("timed out", request=request)
+
+def test_probe_retries_server_errors_and_timeouts():
+    assert probe_with([page(503), timeout, page(200, EXISTING_PAGE)]) == (True, 3)
+
+def test_probe_does_not_retry_a_verdict():
+    assert probe_with([page(404), page(200, EXISTING_PAGE)]) == (False, 1)
+    assert probe_with([page(200, MISSING_PAGE)]) == (False, 1)
+
+def test_probe_does_not_retry_client_errors():
+    with pytest.raises(ProbeError) as info:
+        probe_with([page(400), page(200, EXISTING_PAGE)])
+    assert not info.value.retryable
+
+def test_probe_gives_up_after_its_attempts():
+    with pytest.raises(ProbeTimeout):
+        probe_with([timeout, timeout], attempts=2)
@@ -0,0 +1,133 @@
+"""Tests for the token bucket rate limiters, on a clock the test moves."""
+
+import pytest
+from bot.rate_limiter import InboundRateLimiter, RateLimitConfig
+from utils.rate_limit import KeyedRateLimiter
+
+class FakeClock:
+    """Monotonic clock that only moves when told to."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_burst_then_refill_at_rate(clock):
+    limiter = KeyedRateLimiter(rate=2.0, capacity=3, clock=clock)
+    assert [limiter.try_acquire("a") for _ in range(4)] == [True, True, True, False]
+    # Other keys have their own bucket
+    assert limiter.try_acquire("b")
+    
+    clock.advance(0.4)
+    assert not limiter.try_acquire("a")
+    clock.advance(0.1)
+    assert limiter.try_acquire("a")
+    assert not limiter.try_acquire("a")
+    
+    # Refilling stops at capacity
+    clock.advance(60)
+    assert [limiter.try_acquire("a") for _ in range(4)] == [True, True, True, False]
+    assert not limiter.try_acquire("a", cost=0.5)
+
+def test_retry_after(clock):
+    limiter = KeyedRateLimiter(rate=0.5, capacity=2, clock=clock)
+    assert limiter.retry_after("a") == 0.0
+    limiter.try_acquire("a", cost=2)
+    assert limiter.retry_after("a") == pytest.approx(2.0)
+    assert limiter.retry_after("a", cost=2) == pytest.approx(4.0)
+    # More than a full bucket never becomes available; wait for a full one
+    assert limiter.retry_after("a", cost=10) == pytest.approx(4.0)
+    
+    clock.advance(1.5)
+    assert limiter.retry_after("a") == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert limiter.retry_after("a") == 0.0
+    assert limiter.try_acquire("a")
+
+def test_acquire_up_to_grants_partially(clock):
+    limiter = KeyedRateLimiter(rate=1.0, capacity=5, clock=clock)
+    assert limiter.acquire_up_to("a", 3) == 3
+    assert limiter.acquire_up_to("a", 5) == 2
+    assert limiter.acquire_up_to("a", 4) == 0
+    assert limiter.acquire_up_to("a", 0) == 0
+    
+    # Only whole tokens are granted; the fraction keeps refilling
+    clock.advance(2.5)
+    assert limiter.acquire_up_to("a", 10) == 2
+    clock.advance(0.5)
+    assert limiter.acquire_up_to("a", 10) == 1
+
+def test_full_buckets_are_swept_when_the_table_is_full(clock):
+    limiter = KeyedRateLimiter(rate=1.0, capacity=2, max_keys=3, clock=clock)
+    for key in "abc":
+        limiter.try_acquire(key, cost=2)
+    assert len(limiter) == 3
+    
+    clock.advance(1.0)
+    limiter.try_acquire("a")  # Touched, so not yet full again
+    clock.advance(1.0)
+    limiter.try_acquire("d")
+    # b and c had refilled completely and were dropped
+    assert len(limiter) == 2
+    assert limiter.retry_after("a") == 0.0
+
+def test_rate_and_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        KeyedRateLimiter(rate=0, capacity=1)
+    with pytest.raises(ValueError):
+        KeyedRateLimiter(rate=1, capacity=0)
+
+def test_inbound_messages_and_retry_after(clock):
+    limiter = InboundRateLimiter(RateLimitConfig(message_rate=0.2, message_burst=2), clock=clock)
+    assert limiter.retry_after(1) == 1  # Never less than a second
+    assert limiter.allow_message(1)
+    assert limiter.allow_message(1)
+    assert not limiter.allow_message(1)
+    assert limiter.allow_message(2)
+    
+    assert limiter.retry_after(1) == 5
+    clock.advance(2)
+    assert limiter.retry_after(1) == 3
+    clock.advance(0.5)
+    assert limiter.retry_after(1) == 3  # Rounded up to whole seconds
+    clock.advance(2.5)
+    assert limiter.allow_message(1)
+
+def test_inbound_link_budget_is_granted_partially(clock):
+    limiter = InboundRateLimiter(RateLimitConfig(link_rate=2.0, link_burst=50), clock=clock)
+    assert limiter.grant_links(1, 30) == 30
+    assert limiter.grant_links(1, 30) == 20
+    assert limiter.grant_links(1, 1) == 0
+    assert limiter.links_retry_after(1) == 1
+    
+    clock.advance(5)
+    assert limiter.grant_links(1, 30) == 10
+    assert limiter.grant_links(2, 60) == 50
+
+def test_one_notice_per_interval(clock):
+    limiter = InboundRateLimiter(RateLimitConfig(notice_interval=30), clock=clock)
+    assert limiter.should_notify(1)
+    assert not limiter.should_notify(1)
+    assert limiter.should_notify(2)
+    clock.advance(29)
+    assert not limiter.should_notify(1)
+    clock.advance(1)
+    assert limiter.should_notify(1)
+
+def test_split_divides_the_shared_limits():
+    config = RateLimitConfig(overall_send_rate=30, group_send_rate=1.0, group_send_burst=20)
+    assert config.split(1) is config
+    share = config.split(4)
+    assert share.overall_send_rate == 7.5
+    assert share.group_send_rate == 0.25
+    assert share.group_send_burst == 5
+    assert share.chat_send_rate == config.chat_send_rate
+    assert config.split(40).group_send_burst == 1
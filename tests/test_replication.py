@@ -0,0 +1,147 @@
+"""Tests for replicating storage to a standby through a shared directory."""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+import pytest
+from storage.replication import ReplicationConfig
+from storage.storage_manager import StorageManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_manager(tmp_path, name, backend="json", **options):
+    """Open a storage manager with its own files, replicating through tmp_path/shared."""
+    config = ReplicationConfig(
+        str(tmp_path / "shared"), poll_interval=0.05, **options
+    )
+    directory = tmp_path / name
+    directory.mkdir(exist_ok=True)
+    return StorageManager(
+        user_storage_path=str(directory / "user_links.json"),
+        global_storage_path=str(directory / "proxy_channels.json"),
+        backend=backend,
+        db_path=str(directory / "bot.db"),
+        replication=config
+    )
+
+def contents(manager):
+    """All (user_id, username, link) rows of a manager's storage."""
+    return sorted(manager.iter_user_links())
+
+def wait_for(predicate, timeout=10.0):
+    """Poll until predicate() is true, failing the test on timeout."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            pytest.fail("Timed out waiting for replication")
+        time.sleep(0.02)
+
+def write_changes(manager, count):
+    """Store, remove, clear and prune links through the manager."""
+    for i in range(count):
+        user_id = str(i % 5)
+        assert manager.store_links(user_id, f"user{user_id}", [
+            f"https://t.me/channel{i:04d}", f"https://t.me/channel{i + 1:04d}"
+        ])
+        if i % 4 == 0:
+            manager.remove_link(user_id, f"https://t.me/channel{i:04d}")
+        if i % 17 == 0:
+            manager.clear_user_links(user_id)
+        if i % 13 == 0:
+            manager.prune_link(f"https://t.me/channel{i - 1:04d}")
+
+@pytest.fixture
+def managers():
+    """Close every manager a test opened, standbys last."""
+    opened = []
+    yield opened
+    for manager in reversed(opened):
+        manager.close()
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_standby_follows_the_primary(tmp_path, managers, backend):
+    primary = make_manager(tmp_path, "a", backend)
+    managers.append(primary)
+    assert primary.wait_until_primary(5)
+    write_changes(primary, 20)
+    
+    standby = make_manager(tmp_path, "b", backend)
+    managers.append(standby)
+    assert not standby.wait_until_primary(timeout=0.2)
+    wait_for(lambda: contents(standby) == contents(primary))
+    
+    write_changes(primary, 40)
+    wait_for(lambda: contents(standby) == contents(primary))
+    assert contents(primary)
+
+def test_new_standby_catches_up_from_a_snapshot(tmp_path, managers):
+    primary = make_manager(tmp_path, "a", snapshot_records=10)
+    managers.append(primary)
+    assert primary.wait_until_primary(5)
+    write_changes(primary, 30)
+    primary.replicator.snapshot()
+    write_changes(primary, 5)
+    
+    standby = make_manager(tmp_path, "b")
+    managers.append(standby)
+    wait_for(lambda: contents(standby) == contents(primary))
+    wait_for(lambda: standby.replicator.position == primary.replicator.position)
+
+def test_standby_takes_over_when_the_primary_stops(tmp_path, managers):
+    primary = make_manager(tmp_path, "a")
+    managers.append(primary)
+    assert primary.wait_until_primary(5)
+    standby = make_manager(tmp_path, "b")
+    managers.append(standby)
+    write_changes(primary, 10)
+    expected = contents(primary)
+    
+    primary.close()
+    managers.remove(primary)
+    assert standby.wait_until_primary(5)
+    assert contents(standby) == expected
+    
+    # The old primary comes back as a standby of its successor
+    standby.store_links("42", "late", ["https://t.me/late_channel"])
+    restarted = make_manager(tmp_path, "a")
+    managers.append(restarted)
+    assert not restarted.wait_until_primary(timeout=0.2)
+    wait_for(lambda: contents(restarted) == contents(standby))
+
+PRIMARY_PROCESS = textwrap.dedent("""
+    import json, sys, time, pathlib
+    sys.path.insert(0, {root!r})
+    from tests.test_replication import contents, make_manager, write_changes
+    manager = make_manager(pathlib.Path({tmp!r}), "a")
+    manager.wait_until_primary()
+    print("primary", flush=True)
+    write_changes(manager, 50)
+    print(json.dumps(contents(manager)), flush=True)
+    time.sleep(60)
+""")
+
+def test_standby_takes_over_from_a_killed_process(tmp_path, managers):
+    process = subprocess.Popen(
+        [sys.executable, "-c", PRIMARY_PROCESS.format(root=ROOT, tmp=str(tmp_path))],
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    try:
+        assert process.stdout.readline().strip() == "primary"
+        standby = make_manager(tmp_path, "b")
+        managers.append(standby)
+        expected = [tuple(row) for row in json.loads(process.stdout.readline())]
+        wait_for(lambda: contents(standby) == expected)
+        assert not standby.wait_until_primary(timeout=0)
+    finally:
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+    
+    # The kernel releases the dead process's lock
+    assert standby.wait_until_primary(5)
+    assert contents(standby) == expected
+    assert standby.store_links("42", "after", ["https://t.me/after_failover"])
@@ -0,0 +1,116 @@
+"""Tests for sharding webhook updates across workers."""
+
+import asyncio
+import json
+import httpx
+from telegram import Bot
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+from bot.shard_router import (
+    SECRET_TOKEN_HEADER, ShardRouter, make_worker_app, shard_for, shard_key
+)
+from bot.webhook import WebhookConfig
+
+def message(update_id, user_id, chat_id=None):
+    """Build a raw message update."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "from": {"id": user_id, "is_bot": False, "first_name": "u"},
+            "chat": {"id": chat_id if chat_id is not None else user_id, "type": "private"},
+            "text": "hi"
+        }
+    }
+
+def test_shard_key_prefers_the_sender():
+    assert shard_key(message(1, 42, chat_id=-100)) == 42
+    callback = {
+        "update_id": 2,
+        "callback_query": {"id": "x", "from": {"id": 7}, "message": {"chat": {"id": 9}}}
+    }
+    assert shard_key(callback) == 7
+    channel_post = {"update_id": 3, "channel_post": {"chat": {"id": -100123}}}
+    assert shard_key(channel_post) == -100123
+    assert shard_key({"update_id": 4}) is None
+
+def test_one_user_always_maps_to_the_same_worker():
+    shards = {shard_for(message(update_id, 42), 4) for update_id in range(100)}
+    assert len(shards) == 1
+    assert {shard_for(message(1, user_id), 4) for user_id in range(100)} == {0, 1, 2, 3}
+    # Updates without a user or chat spread by update id
+    assert shard_for({"update_id": 6}, 4) == 2
+    assert shard_for(message(1, -7), 4) == 3
+
+def test_router_forwards_to_the_worker_of_the_user():
+    webhook = WebhookConfig("https://example.com")
+    requests = []
+    
+    def handle(request):
+        requests.append(request)
+        return httpx.Response(200)
+    
+    async def run():
+        router = ShardRouter(webhook, ["http://worker0/telegram", "http://worker1/telegram"])
+        await router.client.aclose()
+        router.client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+        update = message(1, 3)
+        status = await router.forward(update, json.dumps(update).encode())
+        await router.client.aclose()
+        return router, status
+    
+    router, status = asyncio.run(run())
+    assert status == 200
+    assert router.forwarded == [0, 1]
+    assert str(requests[0].url) == "http://worker1/telegram"
+    assert requests[0].headers[SECRET_TOKEN_HEADER] == webhook.secret_token
+
+def test_router_answers_503_when_a_worker_is_down():
+    def handle(request):
+        raise httpx.ConnectError("refused", request=request)
+    
+    async def run():
+        router = ShardRouter(WebhookConfig("https://example.com"), ["http://worker0/telegram"])
+        await router.client.aclose()
+        router.client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+        try:
+            return await router.forward(message(1, 3), b"{}")
+        finally:
+            await router.client.aclose()
+    
+    assert asyncio.run(run()) == 503
+
+class FakeApplication:
+    """Just what the worker handler uses of a PTB application."""
+    
+    def __init__(self):
+        self.bot = Bot("123456:TEST")
+        self.update_queue = asyncio.Queue()
+
+def test_worker_queues_forwarded_updates_with_the_secret_token():
+    webhook = WebhookConfig("https://example.com")
+    
+    async def run():
+        application = FakeApplication()
+        sock, port = bind_unused_port()
+        server = HTTPServer(make_worker_app(application, webhook))
+        server.add_sockets([sock])
+        url = f"http://127.0.0.1:{port}/{webhook.url_path}"
+        body = json.dumps(message(5, 42))
+        try:
+            async with httpx.AsyncClient() as client:
+                rejected = await client.post(url, content=body)
+                accepted = await client.post(
+                    url, content=body, headers={SECRET_TOKEN_HEADER: webhook.secret_token}
+                )
+        finally:
+            server.stop()
+        return rejected.status_code, accepted.status_code, application.update_queue
+    
+    rejected, accepted, queue = asyncio.run(run())
+    assert (rejected, accepted) == (403, 200)
+    update = queue.get_nowait()
+    assert update.update_id == 5
+    assert update.effective_user.id == 42
+    assert queue.empty()
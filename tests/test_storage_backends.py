@@ -0,0 +1,188 @@
+"""Tests that the JSON and SQLite storage backends behave the same."""
+
+import json
+import sqlite3
+import pytest
+from storage.json_backend import JsonStorageBackend
+from storage.migrate import migrate_json_to_sqlite
+from storage.sqlite_backend import SQLiteStorageBackend
+
+A = "https://t.me/alpha_one"
+B = "https://t.me/beta_two"
+C = "https://t.me/gamma_three"
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, tmp_path):
+    """A backend of each kind with its files in tmp_path."""
+    if request.param == "json":
+        backend = JsonStorageBackend(
+            str(tmp_path / "user_links.json"), str(tmp_path / "proxy_channels.json")
+        )
+    else:
+        backend = SQLiteStorageBackend(str(tmp_path / "bot.db"))
+    yield backend
+    backend.close()
+
+def statuses_by_link(backend):
+    return {status.link: status for status in backend.get_link_statuses()}
+
+def test_store_and_get_user_links(backend):
+    backend.store_links("1", "alice", [A, B])
+    backend.store_links("1", "alice2", [B, C])
+    backend.store_links_batch([("2", "bob", [A, C]), ("3", "carol", [A])])
+    
+    assert backend.get_user_links("1") == {"username": "alice2", "links": [A, B, C]}
+    assert backend.get_user_links("2") == {"username": "bob", "links": [A, C]}
+    assert backend.get_user_links("4") is None
+    assert sorted(backend.get_channel_submitters(A)) == ["1", "2", "3"]
+    assert sorted(backend.stored_links()) == [A, B, C]
+    assert backend.top_channels(3) == [(A, 3), (C, 2), (B, 1)]
+    assert backend.top_channels(1) == [(A, 3)]
+
+def test_links_differing_in_case_are_one_link(backend):
+    backend.store_links("1", "alice", ["https://t.me/Channel_One"])
+    backend.store_links("2", "bob", ["https://t.me/channel_one"])
+    
+    # The first spelling is kept
+    assert backend.get_user_links("2")["links"] == ["https://t.me/Channel_One"]
+    assert sorted(backend.get_channel_submitters("https://t.me/CHANNEL_ONE")) == ["1", "2"]
+    assert backend.stored_links() == ["https://t.me/Channel_One"]
+    # Answered in the spelling asked about
+    assert backend.known_links(["https://t.me/channel_ONE", A]) == {"https://t.me/channel_ONE"}
+    
+    assert backend.remove_link("1", "https://t.me/CHANNEL_one")
+    assert backend.get_user_links("1")["links"] == []
+    assert backend.prune_link("https://t.me/channel_one") == 1
+    assert backend.known_links(["https://t.me/channel_one"]) == set()
+
+def test_remove_clear_and_prune(backend):
+    backend.store_links("1", "alice", [A, B])
+    backend.store_links("2", "bob", [A, C])
+    
+    assert not backend.remove_link("9", A)
+    assert backend.remove_link("1", C)  # Known user without the link
+    assert backend.remove_link("1", A)
+    assert backend.get_user_links("1")["links"] == [B]
+    
+    backend.clear_user_links("2")
+    assert backend.get_user_links("2") == {"username": "bob", "links": []}
+    backend.clear_user_links("9")
+    
+    backend.store_links("2", "bob", [B])
+    assert backend.prune_link(B) == 2
+    assert backend.prune_link(B) == 0
+    assert backend.known_links([A, B, C]) == set()
+    assert list(backend.iter_user_links()) == []
+
+def test_iter_user_links(backend):
+    backend.store_links("1", "alice", [A, B])
+    backend.store_links("2", "bob", [C])
+    
+    assert sorted(backend.iter_user_links()) == [
+        ("1", "alice", A), ("1", "alice", B), ("2", "bob", C)
+    ]
+    assert list(backend.iter_user_links("2")) == [("2", "bob", C)]
+    assert list(backend.iter_user_links("9")) == []
+
+def test_link_statuses_track_dead_streaks(backend):
+    backend.store_links("1", "alice", [A, B, C])
+    backend.store_links("2", "bob", [A])
+    backend.record_link_verdicts([(A, False, 100.0), (B, True, 100.0)])
+    backend.record_link_verdicts([(A, False, 200.0)])
+    
+    statuses = statuses_by_link(backend)
+    assert set(statuses) == {A, B, C}
+    assert tuple(statuses[A]) == (A, 2, 200.0, False, 100.0)
+    assert tuple(statuses[B]) == (B, 1, 100.0, True, None)
+    assert tuple(statuses[C]) == (C, 1, None, None, None)
+    assert backend.get_dead_links() == [A]
+    
+    backend.record_link_verdicts([(A, True, 300.0)])
+    assert tuple(statuses_by_link(backend)[A]) == (A, 2, 300.0, True, None)
+    assert backend.get_dead_links() == []
+    
+    # Links nobody submits any more are left out
+    backend.prune_link(C)
+    assert set(statuses_by_link(backend)) == {A, B}
+
+def create_legacy_database(db_path):
+    """A database from before urls compared case-insensitively."""
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE users (user_id TEXT PRIMARY KEY, username TEXT NOT NULL DEFAULT '');
+        CREATE TABLE links (link_id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE);
+        CREATE TABLE user_links (
+            user_id TEXT NOT NULL REFERENCES users(user_id),
+            link_id INTEGER NOT NULL REFERENCES links(link_id),
+            added_at REAL NOT NULL,
+            PRIMARY KEY (user_id, link_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE channels (
+            link_id INTEGER PRIMARY KEY REFERENCES links(link_id),
+            position INTEGER NOT NULL
+        );
+        INSERT INTO users VALUES ('1', 'alice'), ('2', 'bob'), ('3', 'carol');
+        INSERT INTO links VALUES (1, 'https://t.me/Alpha_One'), (2, 'https://t.me/alpha_one'),
+                                 (3, 'https://t.me/beta_two');
+        INSERT INTO user_links VALUES ('1', 1, 1.0), ('2', 2, 2.0), ('3', 1, 3.0), ('3', 2, 4.0),
+                                      ('3', 3, 5.0);
+        INSERT INTO channels VALUES (2, 0), (3, 1);
+    """)
+    conn.commit()
+    conn.close()
+
+def test_legacy_database_is_made_case_insensitive(tmp_path):
+    db_path = str(tmp_path / "bot.db")
+    create_legacy_database(db_path)
+    
+    backend = SQLiteStorageBackend(db_path)
+    try:
+        assert sorted(backend.get_channel_submitters("https://t.me/ALPHA_ONE")) == ["1", "2", "3"]
+        assert backend.get_user_links("3")["links"] == [
+            "https://t.me/Alpha_One", "https://t.me/beta_two"
+        ]
+        assert backend.get_all_channels() == ["https://t.me/Alpha_One", "https://t.me/beta_two"]
+        backend.store_links("4", "dave", ["https://t.me/ALPHA_ONE"])
+        assert backend.top_channels(1) == [("https://t.me/Alpha_One", 4)]
+        conn = backend._connection()
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        assert conn.execute("PRAGMA foreign_keys").fetchone() == (1,)
+    finally:
+        backend.close()
+    
+    # Already migrated: opening again changes nothing
+    backend = SQLiteStorageBackend(db_path)
+    try:
+        assert len(backend.stored_links()) == 2
+    finally:
+        backend.close()
+
+def test_migrate_json_to_sqlite(tmp_path):
+    user_links = str(tmp_path / "user_links.json")
+    channels = str(tmp_path / "proxy_channels.json")
+    db_path = str(tmp_path / "bot.db")
+    with open(channels, "w") as f:
+        json.dump({"channels": [C, A]}, f)
+    source = JsonStorageBackend(user_links, channels)
+    try:
+        source.store_links("1", "alice", [A, B])
+        source.store_links("2", "bob", [B, C])
+        source.remove_link("1", B)
+        # Not compacted yet: the migration reads the journal too
+        expected = sorted(source.iter_user_links())
+        
+        assert migrate_json_to_sqlite(user_links, channels, db_path) == {
+            "users": 2, "links": 3, "channels": 2
+        }
+        # Idempotent
+        migrate_json_to_sqlite(user_links, channels, db_path)
+    finally:
+        source.close()
+    
+    target = SQLiteStorageBackend(db_path)
+    try:
+        assert sorted(target.iter_user_links()) == expected
+        assert target.get_all_channels() == [C, A]
+        assert target.get_user_links("2") == {"username": "bob", "links": [B, C]}
+    finally:
+        target.close()
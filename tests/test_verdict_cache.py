@@ -0,0 +1,35 @@
+"""Tests for persisting the verdict cache."""
+
+import os
+from validators.verdict_cache import VerdictCache
+
+def test_saved_verdicts_survive_a_restart(tmp_path):
+    path = str(tmp_path / "verdicts.json")
+    cache = VerdictCache(persist_path=path)
+    cache.set("Channel_One", True)
+    cache.set("channel_two", False)
+    cache.save()
+    
+    restored = VerdictCache(persist_path=path)
+    assert restored.get("channel_one") is True
+    assert restored.get("channel_two") is False
+    assert os.listdir(tmp_path) == ["verdicts.json"]
+
+def test_failed_save_keeps_the_old_file_and_no_temp_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "verdicts.json")
+    cache = VerdictCache(persist_path=path)
+    cache.set("channel_one", True)
+    cache.save()
+    cache.set("channel_two", True)
+    
+    def fail(fd):
+        raise OSError("disk full")
+    
+    monkeypatch.setattr(os, "fsync", fail)
+    cache.save()  # Logged, not raised
+    monkeypatch.undo()
+    
+    assert os.listdir(tmp_path) == ["verdicts.json"]
+    restored = VerdictCache(persist_path=path)
+    assert restored.get("channel_one") is True
+    assert restored.get("channel_two") is None
@@ -0,0 +1,114 @@
+"""Tests for batching link submissions in the write-behind buffer."""
+
+import asyncio
+import time
+from storage.write_behind import WriteBehindBuffer
+
+class RecordingStorage:
+    """Stands in for StorageManager, recording every batch it is asked to store."""
+    
+    def __init__(self, delay=0.0, stored=True):
+        self.delay = delay
+        self.stored = stored
+        self.batches = []
+        self.single = []
+    
+    def store_links_batch(self, submissions):
+        time.sleep(self.delay)
+        self.batches.append(list(submissions))
+        return self.stored
+    
+    def store_links(self, user_id, username, links):
+        self.single.append((user_id, username, links))
+        return self.stored
+
+def submission(i):
+    return (str(i), f"user{i}", [f"https://t.me/channel{i}"])
+
+def test_concurrent_submissions_are_stored_as_one_batch():
+    storage = RecordingStorage()
+    
+    async def main():
+        buffer = WriteBehindBuffer(storage, max_batch_size=100, max_delay=0.01)
+        results = await asyncio.gather(*(buffer.submit(*submission(i)) for i in range(5)))
+        assert results == [True] * 5
+        assert len(buffer) == 0
+        # Nothing to store
+        assert await buffer.submit("9", "user9", [])
+    
+    asyncio.run(main())
+    assert storage.batches == [[submission(i) for i in range(5)]]
+
+def test_full_batches_are_flushed_at_once_and_in_order():
+    storage = RecordingStorage(delay=0.02)
+    
+    async def main():
+        buffer = WriteBehindBuffer(storage, max_batch_size=2, max_delay=60)
+        started = time.monotonic()
+        tasks = []
+        for i in range(6):
+            tasks.append(asyncio.create_task(buffer.submit(*submission(i))))
+            await asyncio.sleep(0.005)
+        assert await asyncio.gather(*tasks) == [True] * 6
+        # No batch waited for max_delay
+        assert time.monotonic() - started < 5
+    
+    asyncio.run(main())
+    # The first batch is full; later ones take everything that arrived while it was written
+    assert storage.batches[0] == [submission(0), submission(1)]
+    assert len(storage.batches) > 1
+    assert [entry for batch in storage.batches for entry in batch] == [
+        submission(i) for i in range(6)
+    ]
+
+def test_failed_store_resolves_every_submitter():
+    async def failing_io(func, *args):
+        raise OSError("disk full")
+    
+    async def main():
+        buffer = WriteBehindBuffer(RecordingStorage(), max_delay=0.01)
+        buffer._run_io = failing_io
+        results = await asyncio.wait_for(
+            asyncio.gather(*(buffer.submit(*submission(i)) for i in range(3))), timeout=5
+        )
+        assert results == [False] * 3
+    
+    asyncio.run(main())
+
+def test_unstored_batch_reports_false():
+    async def main():
+        buffer = WriteBehindBuffer(RecordingStorage(stored=False), max_delay=0.01)
+        assert await buffer.submit(*submission(1)) is False
+    
+    asyncio.run(main())
+
+def test_flush_sync_writes_what_is_pending():
+    storage = RecordingStorage()
+    
+    async def main():
+        buffer = WriteBehindBuffer(storage, max_delay=60)
+        tasks = [asyncio.create_task(buffer.submit(*submission(i))) for i in range(3)]
+        await asyncio.sleep(0)
+        assert len(buffer) == 3
+        assert buffer.flush_sync() == 3
+        assert buffer.flush_sync() == 0
+        for task in tasks:
+            task.cancel()
+    
+    asyncio.run(main())
+    assert storage.batches == [[submission(i) for i in range(3)]]
+
+def test_close_flushes_and_then_writes_through():
+    storage = RecordingStorage()
+    
+    async def main():
+        buffer = WriteBehindBuffer(storage, max_delay=60)
+        pending = asyncio.create_task(buffer.submit(*submission(1)))
+        await asyncio.sleep(0)
+        await buffer.close()
+        assert await pending
+        assert await buffer.submit(*submission(2))
+    
+    asyncio.run(main())
+    assert storage.batches == [[submission(1)]]
+    assert storage.single == [submission(2)]
@@ -0,0 +1 @@
+"""Development tools for running the bot against local stand-ins."""
\ No newline at end of file
@@ -0,0 +1,275 @@
+"""Local stand-in for the Telegram Bot API, for exercising the bot without Telegram.
+
+Start it, point the bot at it and push synthetic updates to the webhook:
+
+    python -m tools.fake_telegram_api --port 8081
+    TELEGRAM_API_BASE_URL=http://127.0.0.1:8081 python main.py --mode webhook \\
+        --webhook-url http://127.0.0.1:8443 --secret-token testsecret
+    python -m tools.fake_telegram_api --push http://127.0.0.1:8443/telegram \\
+        --secret-token testsecret --text "@some_channel"
+"""
+
+import argparse
+import email.policy
+import itertools
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {
+    "id": 1000000,
+    "is_bot": True,
+    "first_name": "Fake Bot",
+    "username": "fake_collector_bot"
+}
+
+def parse_multipart(content_type: str, body: bytes) -> Dict:
+    """Decode a multipart/form-data upload; file parts are kept as bytes."""
+    message = BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    params = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True)
+        params[name] = payload if part.get_filename() else payload.decode()
+    return params
+
+class FakeTelegramAPI:
+    """Records Bot API calls made by the bot and answers them like Telegram would."""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        """Initialize server address and an optional per-call latency."""
+        self.latency = latency
+        self.calls: List[Dict] = []
+        self.webhook: Optional[Dict] = None
+        self.files: Dict[str, bytes] = {}  # file_id -> content served to getFile
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1)
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        """URL to pass as TELEGRAM_API_BASE_URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="fake-telegram-api",
+            daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self):
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def sent_messages(self) -> List[Dict]:
+        """Return the parameters of every sendMessage/editMessageText call."""
+        with self._lock:
+            return [
+                call["params"] for call in self.calls
+                if call["method"] in ("sendMessage", "editMessageText")
+            ]
+    
+    def _record(self, method: str, params: Dict):
+        """Remember one API call."""
+        with self._lock:
+            self.calls.append({"method": method, "params": params, "time": time.time()})
+    
+    def _message(self, params: Dict) -> Dict:
+        """Build the Message object Telegram returns for a sent message."""
+        chat_id = int(params.get("chat_id", 0))
+        return {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", "")
+        }
+    
+    def handle(self, method: str, params: Dict):
+        """Return the result payload for a Bot API method."""
+        self._record(method, params)
+        if method == "getMe":
+            return BOT_USER
+        if method == "setWebhook":
+            self.webhook = params
+            return True
+        if method == "deleteWebhook":
+            self.webhook = None
+            return True
+        if method == "getUpdates":
+            # Behave like an idle long poll without holding the bot up
+            time.sleep(min(float(params.get("timeout", 0) or 0), 0.5))
+            return []
+        if method in ("sendMessage", "editMessageText"):
+            return self._message(params)
+        if method == "sendDocument":
+            message = self._message(params)
+            message["document"] = {"file_id": "sent", "file_unique_id": "sent"}
+            return message
+        if method == "getFile":
+            file_id = params.get("file_id", "")
+            return {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_size": len(self.files.get(file_id, b"")),
+                "file_path": f"documents/{file_id}"
+            }
+        # answerCallbackQuery, setMyCommands, close, ... just succeed
+        return True
+    
+    def _make_handler(self):
+        """Build the request handler class bound to this fake."""
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                # File downloads look like /file/bot<token>/documents/<file_id>
+                if self.path.startswith("/file/"):
+                    content = fake.files.get(self.path.rsplit("/", 1)[-1])
+                    if content is None:
+                        self.send_error(404)
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                    return
+                self.do_POST()
+            
+            def do_POST(self):
+                # Paths look like /bot<token>/<method>
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                content_type = self.headers.get("Content-Type", "")
+                if "json" in content_type:
+                    params = json.loads(body.decode() or "{}")
+                elif content_type.startswith("multipart/"):
+                    params = parse_multipart(content_type, body)
+                else:
+                    params = dict(parse_qsl(body.decode()))
+                
+                if fake.latency:
+                    time.sleep(fake.latency)
+                result = fake.handle(method, params)
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+        
+        return Handler
+
+_update_ids = itertools.count(1)
+
+def make_text_update(text: str, user_id: int = 42, username: str = "tester",
+                     update_id: Optional[int] = None) -> Dict:
+    """Build a private-chat text message update."""
+    update_id = update_id if update_id is not None else next(_update_ids)
+    user = {"id": user_id, "is_bot": False, "first_name": username, "username": username}
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": user,
+        "text": text
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
+
+def make_document_update(file_id: str, file_name: str, file_size: int,
+                         user_id: int = 42, username: str = "tester",
+                         update_id: Optional[int] = None) -> Dict:
+    """Build a private-chat update carrying an uploaded document."""
+    update = make_text_update("", user_id, username, update_id)
+    message = update["message"]
+    del message["text"]
+    message["document"] = {
+        "file_id": file_id,
+        "file_unique_id": file_id,
+        "file_name": file_name,
+        "file_size": file_size
+    }
+    return update
+
+def post_update(webhook_url: str, update: Dict, secret_token: Optional[str] = None,
+                timeout: float = 10.0) -> int:
+    """POST an update to a webhook the way Telegram does, returning the HTTP status."""
+    request = urllib.request.Request(
+        webhook_url,
+        data=json.dumps(update).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    if secret_token:
+        request.add_header("X-Telegram-Bot-Api-Secret-Token", secret_token)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def main():
+    """Serve the fake API, or push one update to a webhook."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds to wait before answering each call")
+    parser.add_argument("--push", metavar="WEBHOOK_URL",
+                        help="Send one text update to this webhook and exit")
+    parser.add_argument("--secret-token")
+    parser.add_argument("--text", default="/start")
+    parser.add_argument("--user-id", type=int, default=42)
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    
+    if args.push:
+        update = make_text_update(args.text, user_id=args.user_id)
+        print(post_update(args.push, update, args.secret_token))
+        return
+    
+    fake = FakeTelegramAPI(args.host, args.port, args.latency)
+    fake.start()
+    print(f"Fake Bot API listening on {fake.base_url}")
+    seen = 0
+    try:
+        while True:
+            time.sleep(0.5)
+            messages = fake.sent_messages()
+            for params in messages[seen:]:
+                print(json.dumps(params, ensure_ascii=False))
+            seen = len(messages)
+    except KeyboardInterrupt:
+        fake.stop()
+
+if __name__ == '__main__':
+    main()
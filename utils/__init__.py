@@ -0,0 +1 @@
+"""Shared utilities used across the bot, validators and storage."""
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""Offloading of blocking and CPU-heavy work away from the event loop."""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from monitoring.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+OFFLOADED = REGISTRY.counter(
+    "offloaded_tasks", "Blocking tasks by where they ran", ("executor",)
+)
+RAN_INLINE = OFFLOADED.labels("inline")
+RAN_IN_THREAD = OFFLOADED.labels("thread")
+RAN_IN_PROCESS = OFFLOADED.labels("process")
+
+@dataclass
+class OffloadConfig:
+    """Executor sizes and the input sizes (bytes or characters) that pick one."""
+    # Threads for blocking I/O such as storage writes (None: Python's default)
+    thread_workers: Optional[int] = None
+    # Processes for CPU-bound parsing (None: one per CPU, 0: never use processes)
+    process_workers: Optional[int] = None
+    # CPU-bound work on inputs up to this size runs inline on the event loop
+    inline_max_size: int = 16 * 1024
+    # and from this size on in a worker process; sizes in between use a thread
+    process_min_size: int = 256 * 1024
+
+class Offloader:
+    """Runs blocking calls in a thread pool and CPU-bound calls where they pay off.
+    
+    Small CPU-bound inputs are cheapest inline. Medium ones go to a thread,
+    which keeps the loop responsive through GIL switching. Only large ones
+    justify shipping the input to another process, where parsing runs truly
+    in parallel. Functions sent to processes must be module-level and take
+    picklable arguments.
+    """
+    
+    def __init__(self, config: Optional[OffloadConfig] = None):
+        """Initialize offloader; executors are created on first use."""
+        self.config = config or OffloadConfig()
+        self.stats: Dict[str, int] = {"inline": 0, "thread": 0, "process": 0}
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+    
+    def _thread_pool(self) -> Executor:
+        """Return the I/O thread pool, creating it on first use."""
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self.config.thread_workers,
+                thread_name_prefix="offload-io"
+            )
+        return self._threads
+    
+    def _process_pool(self) -> Optional[Executor]:
+        """Return the process pool, or None if processes are disabled."""
+        if self.config.process_workers == 0:
+            return None
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.config.process_workers or os.cpu_count(),
+                # Forking a process that runs threads is unsafe
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._processes
+    
+    async def run_io(self, func: Callable[..., Any], *args) -> Any:
+        """Run a blocking call in the thread pool."""
+        self.stats["thread"] += 1
+        RAN_IN_THREAD.inc()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._thread_pool(), functools.partial(func, *args))
+    
+    async def run_cpu(self, func: Callable[..., Any], *args, size: int) -> Any:
+        """Run a CPU-bound call inline, in a thread or in a process depending on size."""
+        if size <= self.config.inline_max_size:
+            self.stats["inline"] += 1
+            RAN_INLINE.inc()
+            return func(*args)
+        
+        pool = self._process_pool() if size >= self.config.process_min_size else None
+        if pool is None:
+            return await self.run_io(func, *args)
+        
+        self.stats["process"] += 1
+        RAN_IN_PROCESS.inc()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, functools.partial(func, *args))
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            logger.error(f"Process pool broke, running in a thread instead: {e}")
+            self._processes = None
+            return await self.run_io(func, *args)
+    
+    def shutdown(self):
+        """Stop the executors, waiting for running tasks."""
+        if self._threads is not None:
+            self._threads.shutdown()
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown()
+            self._processes = None
+        logger.info(f"Offloaded tasks: {self.stats}")
@@ -0,0 +1,88 @@
+"""Token bucket rate limiting."""
+
+import asyncio
+import time
+from typing import Callable, Dict, Hashable
+
+class TokenBucket:
+    """Token count of one key; rate and capacity live in the owning limiter."""
+    
+    # Millions of idle users should cost two floats each, not a full object dict
+    __slots__ = ("tokens", "updated")
+    
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+class KeyedRateLimiter:
+    """Token bucket rate limiter with one bucket per key.
+    
+    Buckets refill at ``rate`` tokens per second up to ``capacity``. A bucket
+    that has refilled completely is indistinguishable from a new one, so such
+    buckets are dropped whenever the table grows past ``max_keys``.
+    """
+    
+    def __init__(self,
+                 rate: float,
+                 capacity: float,
+                 max_keys: int = 100000,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize refill rate, burst capacity, the bucket table bound and the clock."""
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+    
+    def _bucket(self, key: Hashable, now: float) -> TokenBucket:
+        """Return the key's bucket refilled up to now."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._sweep(now)
+            bucket = self._buckets[key] = TokenBucket(self.capacity, now)
+            return bucket
+        
+        bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+        return bucket
+    
+    def _sweep(self, now: float):
+        """Drop buckets that have refilled completely."""
+        full_after = self.capacity / self.rate
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket.updated < full_after
+        }
+    
+    def try_acquire(self, key: Hashable, cost: float = 1.0) -> bool:
+        """Take cost tokens if available, returning whether they were granted."""
+        bucket = self._bucket(key, self.clock())
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return True
+        return False
+    
+    def acquire_up_to(self, key: Hashable, wanted: int) -> int:
+        """Take as many whole tokens as available, up to wanted, and return the count."""
+        bucket = self._bucket(key, self.clock())
+        granted = max(0, min(wanted, int(bucket.tokens)))
+        bucket.tokens -= granted
+        return granted
+    
+    def retry_after(self, key: Hashable, cost: float = 1.0) -> float:
+        """Seconds until cost tokens will be available for the key."""
+        bucket = self._bucket(key, self.clock())
+        missing = min(cost, self.capacity) - bucket.tokens
+        return max(0.0, missing / self.rate)
+    
+    async def acquire(self, key: Hashable, cost: float = 1.0):
+        """Wait until cost tokens are available, then take them."""
+        cost = min(cost, self.capacity)
+        while not self.try_acquire(key, cost):
+            await asyncio.sleep(self.retry_after(key, cost))
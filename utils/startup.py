@@ -0,0 +1,53 @@
+"""Timings of startup phases, reported with --profile-startup."""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+class StartupProfile:
+    """Records how long each startup phase took and when it ended.
+    
+    Times are measured from when this module was first imported, early in
+    main.py's own imports. Recording is always on (it is a handful of
+    clock reads); the report is only logged when enabled.
+    """
+    
+    def __init__(self):
+        """Start the clock."""
+        self.enabled = False
+        self.origin = time.perf_counter()
+        # (phase, seconds since origin at its end, duration)
+        self.phases: List[Tuple[str, float, float]] = []
+    
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            self.phases.append((name, ended - self.origin, ended - started))
+    
+    def mark(self, name: str):
+        """Record a point in time, such as "ready for updates"."""
+        self.phases.append((name, time.perf_counter() - self.origin, 0.0))
+    
+    def report(self) -> str:
+        """Format the recorded phases as a table."""
+        width = max((len(name) for name, _, _ in self.phases), default=0)
+        lines = [f"{'phase':<{width}}  {'took':>9}  {'at':>9}"]
+        for name, at, took in self.phases:
+            took_text = f"{took * 1000:.1f}ms" if took else "-"
+            lines.append(f"{name:<{width}}  {took_text:>9}  {at * 1000:>7.1f}ms")
+        return "\n".join(lines)
+    
+    def log_report(self, title: str):
+        """Log the table if profiling is enabled."""
+        if self.enabled:
+            logger.info(f"{title}:\n{self.report()}")
+
+STARTUP = StartupProfile()
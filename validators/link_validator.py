@@ -1,18 +1,33 @@
 """Link validator for Telegram links."""
 
 import re
+import asyncio
 import logging
-import requests
-from typing import List, Tuple, Dict
+import weakref
+from typing import Iterator, List, Tuple, Dict, Optional
 from dataclasses import dataclass
+from monitoring.metrics import REGISTRY
+from utils.rate_limit import KeyedRateLimiter
+from .prober import ProbeConfig, ProbeError, Prober, ProbeTimeout
+from .verdict_cache import VerdictCache
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
+EXTRACT_SECONDS = REGISTRY.histogram(
+    "link_extract_seconds", "Time spent extracting links from one message"
+)
+VALIDATE_SECONDS = REGISTRY.histogram(
+    "link_validate_existence_seconds", "Latency of one link existence check, cache hits included"
+)
+PROBE_RESULTS = REGISTRY.counter(
+    "link_probes", "Link existence checks by outcome", ("result",)
+)
+PROBE_CACHED = PROBE_RESULTS.labels("cached")
+PROBE_EXISTS = PROBE_RESULTS.labels("exists")
+PROBE_MISSING = PROBE_RESULTS.labels("missing")
+PROBE_TIMEOUT = PROBE_RESULTS.labels("timeout")
+PROBE_ERROR = PROBE_RESULTS.labels("error")
+
 @dataclass
 class ValidationResult:
     """Container for link validation results."""
@@ -24,94 +39,270 @@ class ValidationResult:
 class LinkValidator:
     """Validates Telegram links."""
     
-    # Regex patterns for different link formats
-    PATTERNS = {
-        'username': r'@([a-zA-Z]\w{3,30}[a-zA-Z\d])',
-        't_me': r't\.me/([a-zA-Z]\w{3,30}[a-zA-Z\d])',
-        'telegram_me': r'telegram\.me/([a-zA-Z]\w{3,30}[a-zA-Z\d])',
-        'https_t_me': r'https://t\.me/([a-zA-Z]\w{3,30}[a-zA-Z\d])',
-        'https_telegram_me': r'https://telegram\.me/([a-zA-Z]\w{3,30}[a-zA-Z\d])'
-    }
-    
-    def __init__(self, timeout: float = 0.1):
-        """Initialize validator with timeout."""
-        self.timeout = timeout
+    # Single alternation covering every supported link format; group 1 is
+    # the username. Used to check and normalize individual links.
+    USERNAME_PATTERN = r'[a-zA-Z]\w{3,30}[a-zA-Z\d]'
+    LINK_PATTERN = rf'(?:(?:https://)?(?:t|telegram)\.me/|@)({USERNAME_PATTERN})'
+    
+    def __init__(self,
+                 timeout: Optional[float] = None,
+                 max_concurrent_probes: int = 10,
+                 max_global_probes: int = 50,
+                 cache: Optional[VerdictCache] = None,
+                 host_limiter: Optional[KeyedRateLimiter] = None,
+                 probe_base_url: Optional[str] = None,
+                 probe: Optional[ProbeConfig] = None):
+        """Initialize validator with probe settings and limits, cache and per-host rate limiter.
+        
+        timeout overrides the probe's initial timeout; later ones adapt to
+        measured round trips. probe_base_url sends existence probes to
+        another server (such as a local t.me stand-in for benchmarks)
+        instead of https://t.me.
+        """
+        probe = probe or ProbeConfig()
+        if timeout is not None:
+            probe.initial_timeout = timeout
+        self.probe_base_url = probe_base_url.rstrip("/") if probe_base_url else None
+        self.cache = cache
+        self.max_concurrent_probes = max_concurrent_probes
+        self.max_global_probes = max_global_probes
+        # Cap on this validator's in-flight probes, one per event loop using it
+        self._probe_semaphores = weakref.WeakKeyDictionary()
+        self.prober = Prober(probe, host_limiter)
         self._compile_patterns()
     
     def _compile_patterns(self):
         """Compile regex patterns."""
-        self.compiled_patterns = {
-            name: re.compile(pattern)
-            for name, pattern in self.PATTERNS.items()
-        }
+        self.link_pattern = re.compile(self.LINK_PATTERN)
+        self.username_pattern = re.compile(self.USERNAME_PATTERN)
+    
+    def _iter_link_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, username) for every link in text, left to right.
+        
+        Equivalent to ``link_pattern.finditer`` but much faster on long texts:
+        the regex engine cannot skip ahead to a literal prefix when the pattern
+        starts with an alternation, whereas ``str.find`` jumps straight to the
+        '@' and '.me/' anchors and only those candidates are matched.
+        """
+        username_match = self.username_pattern.match
+        find = text.find
+        endswith = text.endswith
+        next_at = find('@')
+        next_me = find('.me/')
+        last_end = 0
+        
+        while next_at != -1 or next_me != -1:
+            if next_me == -1 or (next_at != -1 and next_at < next_me):
+                # @username
+                pos = next_at
+                next_at = find('@', pos + 1)
+                if pos < last_end:
+                    continue
+                match = username_match(text, pos + 1)
+                if match is None:
+                    continue
+                start = pos
+            else:
+                # [https://](t|telegram).me/username
+                pos = next_me
+                next_me = find('.me/', pos + 1)
+                if pos < last_end:
+                    continue
+                if endswith('telegram', last_end, pos):
+                    start = pos - len('telegram')
+                elif endswith('t', last_end, pos):
+                    start = pos - 1
+                else:
+                    continue
+                match = username_match(text, pos + len('.me/'))
+                if match is None:
+                    continue
+                if endswith('https://', last_end, start):
+                    start -= len('https://')
+            
+            last_end = match.end()
+            yield start, last_end, match.group()
+    
+    def extract_link_spans(self, text: str) -> List[Tuple[str, str]]:
+        """Extract (original span, username) pairs from text in a single pass."""
+        with EXTRACT_SECONDS.time():
+            return self._extract_link_spans(text)
+    
+    def _extract_link_spans(self, text: str) -> List[Tuple[str, str]]:
+        """extract_link_spans() without recording its duration."""
+        seen = set()
+        spans = []
+        for start, end, username in self._iter_link_matches(text):
+            key = username.lower()  # Telegram usernames are case-insensitive
+            if key not in seen:
+                seen.add(key)
+                spans.append((text[start:end], username))
+        return spans
     
     def extract_links(self, text: str) -> List[str]:
         """Extract potential Telegram links from text."""
-        links = []
-        for pattern in self.compiled_patterns.values():
-            links.extend(
-                f"@{match}" if not match.startswith(('@', 't', 'h')) else match
-                for match in pattern.findall(text)
-            )
-        return list(set(links))  # Remove duplicates
+        return [original for original, _ in self.extract_link_spans(text)]
     
     def normalize_link(self, link: str) -> str:
         """Convert link to standard format (https://t.me/username)."""
-        # Extract username from any format
-        username = None
-        for pattern in self.compiled_patterns.values():
-            match = pattern.search(link)
-            if match:
-                username = match.group(1)
-                break
-        
-        if username:
-            return f"https://t.me/{username}"
+        match = self.link_pattern.search(link)
+        if match:
+            return self.canonical_link(match.group(1))
         return link
     
+    @staticmethod
+    def canonical_link(username: str) -> str:
+        """Build the standard link for a username."""
+        return f"https://t.me/{username}"
+    
     def validate_link_format(self, link: str) -> bool:
         """Check if link matches any valid format."""
-        return any(
-            pattern.fullmatch(link) is not None
-            for pattern in self.compiled_patterns.values()
-        )
+        return self.link_pattern.fullmatch(link) is not None
+    
+    @staticmethod
+    def _username_of(normalized_link: str) -> str:
+        """Return the username part of a normalized link."""
+        return normalized_link.rsplit("/", 1)[-1]
+    
+    def _probe_url(self, normalized_link: str) -> str:
+        """Return the URL actually requested to check a normalized link."""
+        if self.probe_base_url is None:
+            return normalized_link
+        return f"{self.probe_base_url}/{self._username_of(normalized_link)}"
+    
+    def _cached_verdict(self, normalized_link: str) -> Optional[bool]:
+        """Look up a previous existence verdict for a normalized link."""
+        if self.cache is None:
+            return None
+        return self.cache.get(self._username_of(normalized_link))
+    
+    def _remember_verdict(self, normalized_link: str, exists: bool):
+        """Cache a definitive existence verdict for a normalized link."""
+        if self.cache is not None:
+            self.cache.set(self._username_of(normalized_link), exists)
+    
+    async def _acached_verdict(self, normalized_link: str) -> Optional[bool]:
+        """Look up a previous verdict without blocking the event loop."""
+        if self.cache is None:
+            return None
+        return await self.cache.aget(self._username_of(normalized_link))
+    
+    async def _aremember_verdict(self, normalized_link: str, exists: bool):
+        """Cache a definitive verdict without blocking the event loop."""
+        if self.cache is not None:
+            await self.cache.aset(self._username_of(normalized_link), exists)
     
     def validate_link_existence(self, link: str) -> Tuple[bool, str]:
         """Check if link points to existing Telegram entity."""
-        normalized_link = self.normalize_link(link)
+        return self._check_existence(self.normalize_link(link))
+    
+    @staticmethod
+    def _count_verdict(exists: bool):
+        """Count a definitive probe outcome."""
+        (PROBE_EXISTS if exists else PROBE_MISSING).inc()
+    
+    @VALIDATE_SECONDS.time()
+    def _check_existence(self, normalized_link: str) -> Tuple[bool, str]:
+        """Probe a normalized link, consulting the verdict cache first."""
+        cached = self._cached_verdict(normalized_link)
+        if cached is not None:
+            PROBE_CACHED.inc()
+            return cached, ""
+        
         try:
-            response = requests.head(
-                normalized_link,
-                timeout=self.timeout,
-                allow_redirects=True
-            )
-            return response.status_code == 200, ""
-        except requests.Timeout:
-            return False, "Request timed out"
-        except requests.RequestException as e:
+            exists = self.prober.probe_sync(self._probe_url(normalized_link))
+        except ProbeTimeout as e:
+            PROBE_TIMEOUT.inc()
+            return False, str(e)
+        except ProbeError as e:
+            PROBE_ERROR.inc()
             return False, str(e)
+        self._count_verdict(exists)
+        self._remember_verdict(normalized_link, exists)
+        return exists, ""
     
     def validate_links(self, text: str) -> Dict[str, ValidationResult]:
         """Extract and validate all links from text."""
         results = {}
-        extracted_links = self.extract_links(text)
         
-        for link in extracted_links:
-            # Validate format
-            if not self.validate_link_format(link):
-                results[link] = ValidationResult(
-                    original_link=link,
-                    normalized_link="",
-                    is_valid=False,
-                    error_message="Invalid link format"
-                )
-                continue
-            
-            # Normalize link
-            normalized_link = self.normalize_link(link)
-            
-            # Check existence
-            exists, error = self.validate_link_existence(link)
+        # Extracted spans are well-formed by construction, so only existence
+        # still needs checking
+        for link, username in self.extract_link_spans(text):
+            normalized_link = self.canonical_link(username)
+            exists, error = self._check_existence(normalized_link)
+            results[link] = ValidationResult(
+                original_link=link,
+                normalized_link=normalized_link,
+                is_valid=exists,
+                error_message=error
+            )
+        
+        return results
+    
+    def _probe_semaphore(self) -> asyncio.Semaphore:
+        """Return the semaphore limiting in-flight probes on the running loop.
+        
+        asyncio primitives belong to one loop, so each loop (e.g. of
+        successive asyncio.run() calls) gets its own, sized when first used.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._probe_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._probe_semaphores[loop] = asyncio.Semaphore(self.max_global_probes)
+        return semaphore
+    
+    async def avalidate_link_existence(self, link: str) -> Tuple[bool, str]:
+        """Asynchronously check if link points to existing Telegram entity."""
+        return await self._acheck_existence(self.normalize_link(link))
+    
+    async def arecheck_link(self, normalized_link: str) -> Tuple[bool, str]:
+        """Probe a normalized link even if a verdict is cached, refreshing the cache."""
+        return await self._acheck_existence(normalized_link, use_cache=False)
+    
+    @VALIDATE_SECONDS.time()
+    async def _acheck_existence(self, normalized_link: str,
+                                use_cache: bool = True) -> Tuple[bool, str]:
+        """Asynchronously probe a normalized link, consulting the cache first."""
+        cached = await self._acached_verdict(normalized_link) if use_cache else None
+        if cached is not None:
+            PROBE_CACHED.inc()
+            return cached, ""
+        
+        try:
+            async with self._probe_semaphore():
+                exists = await self.prober.probe(self._probe_url(normalized_link))
+        except ProbeTimeout as e:
+            PROBE_TIMEOUT.inc()
+            return False, str(e)
+        except ProbeError as e:
+            PROBE_ERROR.inc()
+            return False, str(e)
+        self._count_verdict(exists)
+        await self._aremember_verdict(normalized_link, exists)
+        return exists, ""
+    
+    async def avalidate_links(self, text: str) -> Dict[str, ValidationResult]:
+        """Extract and validate all links from text with concurrent probes."""
+        return await self.avalidate_spans(self.extract_link_spans(text))
+    
+    async def avalidate_spans(self, spans: List[Tuple[str, str]]) -> Dict[str, ValidationResult]:
+        """Validate already extracted (original span, username) pairs concurrently."""
+        # Bound the number of probes a single message may have in flight
+        message_semaphore = asyncio.Semaphore(self.max_concurrent_probes)
+        
+        async def probe(normalized_link: str) -> Tuple[bool, str]:
+            async with message_semaphore:
+                return await self._acheck_existence(normalized_link)
+        
+        normalized_links = [self.canonical_link(username) for _, username in spans]
+        verdicts = await asyncio.gather(
+            *(probe(normalized_link) for normalized_link in normalized_links)
+        )
+        
+        results = {}
+        for (link, _), normalized_link, (exists, error) in zip(
+            spans, normalized_links, verdicts
+        ):
             results[link] = ValidationResult(
                 original_link=link,
                 normalized_link=normalized_link,
@@ -119,4 +310,22 @@ class LinkValidator:
                 error_message=error
             )
         
-        return results 
\ No newline at end of file
+        return results
+    
+    async def aclose(self):
+        """Close the prober's pooled HTTP clients."""
+        await self.prober.aclose()
+
+# Per-process validator for extract_link_spans when it runs in a worker process
+_extractor: Optional[LinkValidator] = None
+
+def extract_link_spans(text: str) -> List[Tuple[str, str]]:
+    """Module-level LinkValidator.extract_link_spans, picklable for process pools.
+    
+    It records no duration: a worker process has its own metrics registry,
+    which is never exported, so callers time the offloaded call instead.
+    """
+    global _extractor
+    if _extractor is None:
+        _extractor = LinkValidator()
+    return _extractor._extract_link_spans(text)
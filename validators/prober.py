@@ -0,0 +1,294 @@
+"""Existence probes for t.me pages over pooled keep-alive connections."""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from importlib.util import find_spec
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from monitoring.metrics import REGISTRY
+from utils.rate_limit import KeyedRateLimiter
+
+logger = logging.getLogger(__name__)
+
+PROBE_RETRIES = REGISTRY.counter(
+    "link_probe_retries", "Probe attempts repeated after a timeout or server error"
+)
+PROBE_RTT = REGISTRY.histogram(
+    "link_probe_rtt_seconds", "Time until the response headers of one probe attempt"
+)
+
+# t.me renders a page for every username, with status 200 whether or not it
+# exists. Entities get a title block, which comes before the description;
+# unknown usernames only get a description ("you can contact @name right away").
+TITLE_MARKER = b'class="tgme_page_title'
+DESCRIPTION_MARKER = b'class="tgme_page_description'
+PAGE_MARKER = b'tgme_page'
+
+@dataclass
+class ProbeConfig:
+    """Timeouts, retries and connection settings for existence probes."""
+    # Timeout of a host's first probe, before any round trip was measured
+    initial_timeout: float = 2.0
+    # Bounds of the adaptive timeout derived from measured round trips
+    min_timeout: float = 0.5
+    max_timeout: float = 10.0
+    # Attempts per probe; timeouts, 429 and 5xx answers are retried
+    attempts: int = 3
+    # Retry delays are drawn from [0, retry_backoff * 2^retry] ("full jitter")
+    retry_backoff: float = 0.2
+    # Only this much of a page is inspected to classify it
+    body_prefix_bytes: int = 16 * 1024
+    # Pages up to this size are read to the end so their connection is reused
+    drain_max_bytes: int = 64 * 1024
+    # Connections kept open per client; httpcore scans the whole pool for
+    # every request, so a modest pool of busy connections is fastest
+    max_connections: int = 20
+    # Multiplex probes over HTTP/2 when the h2 package is installed
+    http2: bool = False
+
+class ProbeError(Exception):
+    """A probe that ended without a verdict."""
+    
+    def __init__(self, message: str, retryable: bool = False):
+        """Initialize error with its message and whether another attempt may help."""
+        super().__init__(message)
+        self.retryable = retryable
+
+class ProbeTimeout(ProbeError):
+    """A probe whose attempts all timed out."""
+
+class PageClassifier:
+    """Decides from a bounded prefix of a t.me page whether its entity exists."""
+    
+    def __init__(self, limit: int):
+        """Initialize classifier reading at most limit bytes."""
+        self.limit = limit
+        self.verdict: Optional[bool] = None
+        self.truncated = False
+        self._head = bytearray()
+    
+    def feed(self, chunk: bytes) -> bool:
+        """Add body bytes, returning True once the rest of the body is not needed."""
+        if self.verdict is not None or self.truncated:
+            return True
+        room = self.limit - len(self._head)
+        self._head += chunk[:room]
+        if self._head.find(TITLE_MARKER) != -1:
+            self.verdict = True
+        elif self._head.find(DESCRIPTION_MARKER) != -1:
+            self.verdict = False
+        elif len(chunk) >= room:
+            self.truncated = True
+        return self.verdict is not None or self.truncated
+    
+    def result(self) -> Optional[bool]:
+        """Return the verdict, or None if the prefix did not settle it."""
+        if self.verdict is not None or self.truncated:
+            return self.verdict
+        # The whole page was read: a t.me page without a title has no entity,
+        # any other page (e.g. a stand-in server) exists by its status alone
+        return self._head.find(PAGE_MARKER) == -1
+
+def status_verdict(status: int) -> Optional[bool]:
+    """Classify a response by status: False if missing, None if the page decides."""
+    if status == 200:
+        return None
+    # Without redirects followed, t.me sends paths that are no entity elsewhere
+    if status in (404, 410) or 300 <= status < 400:
+        return False
+    if status == 429 or status >= 500:
+        raise ProbeError(f"HTTP {status}", retryable=True)
+    raise ProbeError(f"Unexpected HTTP {status}")
+
+def http2_available() -> bool:
+    """Return whether httpx can speak HTTP/2 (the optional h2 package is installed)."""
+    return find_spec("h2") is not None
+
+class Prober:
+    """Checks whether t.me pages exist, sync or async, over pooled connections.
+    
+    Each host's timeout follows its measured round trips (smoothed RTT plus
+    four deviations, as TCP computes retransmission timeouts), so a slow
+    moment does not turn into false "missing" verdicts while a dead host is
+    still given up on quickly. Failed attempts are retried after a jittered
+    exponential delay. Pages are read only as far as needed to classify them.
+    """
+    
+    def __init__(self, config: Optional[ProbeConfig] = None,
+                 host_limiter: Optional[KeyedRateLimiter] = None):
+        """Initialize prober with its settings and an optional per-host rate limiter."""
+        self.config = config or ProbeConfig()
+        self.host_limiter = host_limiter
+        # host -> (smoothed RTT, RTT deviation)
+        self._rtt: Dict[str, Tuple[float, float]] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+    
+    def _client_options(self) -> Dict:
+        """Return the connection settings shared by the sync and async clients."""
+        http2 = self.config.http2
+        if http2 and not http2_available():
+            logger.warning("HTTP/2 probes need the h2 package (httpx[http2]); using HTTP/1.1")
+            http2 = False
+        return {
+            "http2": http2,
+            "follow_redirects": False,
+            "limits": httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_connections
+            )
+        }
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled async client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(**self._client_options())
+        return self._client
+    
+    def _get_sync_client(self) -> httpx.Client:
+        """Return the pooled sync client, creating it on first use."""
+        if self._sync_client is None or self._sync_client.is_closed:
+            self._sync_client = httpx.Client(**self._client_options())
+        return self._sync_client
+    
+    def timeout_for(self, host: str, attempt: int = 0) -> httpx.Timeout:
+        """Return the timeout of an attempt, doubled for every retry."""
+        estimate = self._rtt.get(host)
+        if estimate is None:
+            timeout = self.config.initial_timeout
+        else:
+            srtt, rttvar = estimate
+            timeout = max(srtt + 4 * rttvar, self.config.min_timeout)
+        timeout = min(timeout * 2 ** attempt, self.config.max_timeout)
+        # A full pool makes probes queue for a connection rather than fail
+        return httpx.Timeout(timeout, pool=self.config.max_timeout)
+    
+    def observe_rtt(self, host: str, rtt: float):
+        """Fold a measured round trip into the host's estimate (RFC 6298)."""
+        PROBE_RTT.observe(rtt)
+        estimate = self._rtt.get(host)
+        if estimate is None:
+            self._rtt[host] = (rtt, rtt / 2)
+            return
+        srtt, rttvar = estimate
+        rttvar = 0.75 * rttvar + 0.25 * abs(srtt - rtt)
+        self._rtt[host] = (0.875 * srtt + 0.125 * rtt, rttvar)
+    
+    def retry_delay(self, retry: int) -> float:
+        """Return a random delay before the given retry (1 for the first)."""
+        return random.uniform(0, self.config.retry_backoff * 2 ** retry)
+    
+    def _should_drain(self, response: httpx.Response) -> bool:
+        """Return whether reading the whole body is cheap enough to keep the connection."""
+        if response.http_version == "HTTP/2":
+            return False  # Abandoning a stream does not cost the connection
+        length = response.headers.get("content-length", "")
+        return length.isdigit() and int(length) <= self.config.drain_max_bytes
+    
+    @staticmethod
+    def _verdict(classifier: PageClassifier) -> bool:
+        """Return the classifier's verdict, failing if the prefix did not settle it."""
+        exists = classifier.result()
+        if exists is None:
+            raise ProbeError("Unrecognized page")
+        return exists
+    
+    async def _attempt(self, url: str, host: str, attempt: int) -> bool:
+        """Make one probe request."""
+        started = time.monotonic()
+        try:
+            async with self._get_client().stream(
+                "GET", url, timeout=self.timeout_for(host, attempt)
+            ) as response:
+                self.observe_rtt(host, time.monotonic() - started)
+                drain = self._should_drain(response)
+                try:
+                    exists = status_verdict(response.status_code)
+                    if exists is None:
+                        classifier = PageClassifier(self.config.body_prefix_bytes)
+                        async for chunk in response.aiter_bytes():
+                            if classifier.feed(chunk) and not drain:
+                                break
+                        exists = self._verdict(classifier)
+                finally:
+                    # An unread body would cost the keep-alive connection
+                    if drain and not response.is_stream_consumed:
+                        await response.aread()
+                return exists
+        except httpx.TimeoutException:
+            raise ProbeTimeout("Request timed out", retryable=True)
+        except httpx.HTTPError as e:
+            raise ProbeError(str(e), retryable=True)
+    
+    async def probe(self, url: str) -> bool:
+        """Return whether the page at url shows an existing entity.
+        
+        Raises ProbeTimeout or ProbeError once every attempt failed.
+        """
+        host = urlsplit(url).hostname
+        for attempt in range(self.config.attempts):
+            if attempt:
+                PROBE_RETRIES.inc()
+                await asyncio.sleep(self.retry_delay(attempt))
+            if self.host_limiter is not None:
+                await self.host_limiter.acquire(host)
+            try:
+                return await self._attempt(url, host, attempt)
+            except ProbeError as e:
+                if not e.retryable or attempt + 1 >= self.config.attempts:
+                    raise
+                logger.debug("Probe of %s failed, retrying: %s", url, e)
+    
+    def _attempt_sync(self, url: str, host: str, attempt: int) -> bool:
+        """Make one blocking probe request."""
+        started = time.monotonic()
+        try:
+            with self._get_sync_client().stream(
+                "GET", url, timeout=self.timeout_for(host, attempt)
+            ) as response:
+                self.observe_rtt(host, time.monotonic() - started)
+                drain = self._should_drain(response)
+                try:
+                    exists = status_verdict(response.status_code)
+                    if exists is None:
+                        classifier = PageClassifier(self.config.body_prefix_bytes)
+                        for chunk in response.iter_bytes():
+                            if classifier.feed(chunk) and not drain:
+                                break
+                        exists = self._verdict(classifier)
+                finally:
+                    # An unread body would cost the keep-alive connection
+                    if drain and not response.is_stream_consumed:
+                        response.read()
+                return exists
+        except httpx.TimeoutException:
+            raise ProbeTimeout("Request timed out", retryable=True)
+        except httpx.HTTPError as e:
+            raise ProbeError(str(e), retryable=True)
+    
+    def probe_sync(self, url: str) -> bool:
+        """Blocking probe(); the per-host rate limiter only applies to async probes."""
+        host = urlsplit(url).hostname
+        for attempt in range(self.config.attempts):
+            if attempt:
+                PROBE_RETRIES.inc()
+                time.sleep(self.retry_delay(attempt))
+            try:
+                return self._attempt_sync(url, host, attempt)
+            except ProbeError as e:
+                if not e.retryable or attempt + 1 >= self.config.attempts:
+                    raise
+                logger.debug("Probe of %s failed, retrying: %s", url, e)
+    
+    async def aclose(self):
+        """Close both pooled clients."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
@@ -0,0 +1,160 @@
+"""TTL + LRU cache of channel existence verdicts."""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from dataclasses import dataclass, asdict
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CacheStats:
+    """Counters describing cache effectiveness."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+class VerdictCache:
+    """Bounded LRU cache of channel verdicts with separate positive/negative TTLs."""
+    
+    def __init__(self,
+                 max_size: int = 10000,
+                 positive_ttl: float = 6 * 60 * 60,
+                 negative_ttl: float = 10 * 60,
+                 persist_path: Optional[str] = None):
+        """Initialize cache limits and optionally load persisted verdicts."""
+        self.max_size = max_size
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.persist_path = persist_path
+        self.stats = CacheStats()
+        self.lock = Lock()
+        # username -> (exists, expires_at as a wall-clock timestamp)
+        self._entries: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+        
+        if persist_path:
+            self.load()
+    
+    @staticmethod
+    def make_key(username: str) -> str:
+        """Build the cache key for a username (Telegram usernames ignore case)."""
+        return username.lower()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, username: str) -> Optional[bool]:
+        """Return the cached verdict for a username, or None on a miss."""
+        key = self.make_key(username)
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            
+            exists, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return exists
+    
+    def set(self, username: str, exists: bool):
+        """Store a verdict using the TTL matching its outcome."""
+        ttl = self.positive_ttl if exists else self.negative_ttl
+        key = self.make_key(username)
+        with self.lock:
+            self._entries[key] = (exists, time.time() + ttl)
+            self._entries.move_to_end(key)
+            self._evict()
+    
+    async def aget(self, username: str) -> Optional[bool]:
+        """Like get(), for the event loop; the in-memory lookup never blocks."""
+        return self.get(username)
+    
+    async def aset(self, username: str, exists: bool):
+        """Like set(), for the event loop."""
+        self.set(username, exists)
+    
+    def clear(self):
+        """Drop all cached verdicts."""
+        with self.lock:
+            self._entries.clear()
+    
+    def _evict(self):
+        """Evict least recently used entries until the cache fits its bound."""
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Return cache counters together with the current size."""
+        with self.lock:
+            return {**asdict(self.stats), "size": len(self._entries)}
+    
+    def load(self) -> int:
+        """Load unexpired verdicts from disk, returning how many were restored."""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return 0
+        
+        try:
+            with open(self.persist_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error loading verdict cache: {e}")
+            return 0
+        
+        now = time.time()
+        with self.lock:
+            # Entries are persisted in LRU order, oldest first
+            for key, (exists, expires_at) in data.get("entries", {}).items():
+                if expires_at > now:
+                    self._entries[key] = (bool(exists), float(expires_at))
+            self._evict()
+            restored = len(self._entries)
+        
+        logger.info(f"Restored {restored} cached channel verdicts")
+        return restored
+    
+    def save(self):
+        """Atomically persist unexpired verdicts to disk."""
+        if not self.persist_path:
+            return
+        
+        now = time.time()
+        with self.lock:
+            entries = {
+                key: [exists, expires_at]
+                for key, (exists, expires_at) in self._entries.items()
+                if expires_at > now
+            }
+        
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Unique per process: several workers may save the same cache at shutdown
+        tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({"entries": entries}, f)
+                # On disk before the rename, so a crash never leaves an empty cache file
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logger.error(f"Error saving verdict cache: {e}")
+        finally:
+            # Only left behind if the write or the rename failed
+            with suppress(OSError):
+                os.remove(tmp_path)